@@ -19,7 +19,8 @@ except ModuleNotFoundError:
 
     _is_pws = True
 
-if "constants" not in pws.__dict__.keys():
+# pywatershed loads its attributes lazily, hasattr imports constants
+if not hasattr(pws, "constants"):
     del pws
     import pywatershed as pws
 
@@ -1,17 +1,61 @@
 from . import _is_pws
 
+pkg = "pywatershed" if _is_pws else "pynhm"
+
 
 class Import:
     """Benchmark importing pywatershed"""
 
     def timeraw_import_pywatershed(self):
-        if _is_pws:
-            return "import pywatershed"
-        else:
-            return "import pynhm"
+        return f"import {pkg}"
 
     def timeraw_import_pywatershed_only(self):
-        if _is_pws:
-            return "import pywatershed", "import numpy"
-        else:
-            return "import pynhm", "import numpy"
+        return f"import {pkg}", "import numpy"
+
+
+class ImportLazy:
+    """Benchmark the first access of lazily imported attributes
+
+    pywatershed imports the modules of its attributes on their first access.
+    These are the costs deferred from importing pywatershed.
+    """
+
+    params = [
+        "Control",
+        "Parameters",
+        "Model",
+        "PRMSSnow",
+        "PRMSChannel",
+        "prms_channel_flow_graph_to_model_dict",
+        "DomainPlot",
+    ]
+    param_names = ["attribute"]
+
+    def setup(self, attribute):
+        if not _is_pws:
+            raise NotImplementedError()
+
+    def timeraw_import_attribute(self, attribute):
+        return f"pywatershed.{attribute}", "import pywatershed"
+
+
+class ImportModules:
+    """Track the modules loaded by importing pywatershed"""
+
+    def track_import_n_modules(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys; n_modules = len(sys.modules); "
+            f"import {pkg}; print(len(sys.modules) - n_modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        return int(result.stdout.strip().split()[-1])
+
+    track_import_n_modules.unit = "modules"
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+from pywatershed.utils.cache_utils import ArrayCache
+
+
+@pytest.mark.domainless
+def test_array_cache(tmp_path):
+    cache = ArrayCache(tmp_path / "cache", max_bytes=3000)
+
+    data = np.arange(100, dtype="float64")
+    key = cache.key("a", {"x": data}, 3)
+    assert key == cache.key("a", {"x": data.copy()}, 3)
+    assert key != cache.key("a", {"x": data + 1}, 3)
+    assert key != cache.key("a", {"x": data.astype("float32")}, 3)
+    assert key != cache.key("a", {"x": data}, 4)
+
+    # files are identified by name, size and modification time
+    file = tmp_path / "input.txt"
+    file.write_text("input")
+    file_key = cache.key(file)
+    assert file_key == cache.key(file)
+    os.utime(file, ns=(0, 0))
+    assert file_key != cache.key(file)
+
+    assert cache.load(key) is None
+    cache.save(key, {"x": data})
+    np.testing.assert_array_equal(cache.load(key)["x"], data)
+
+    # each entry is > 800 bytes, the least recently used are evicted
+    keys = [key] + [cache.key(ii) for ii in range(3)]
+    for ii, kk in enumerate(keys[1:]):
+        os.utime(cache.cache_dir / f"{keys[ii]}.npz", ns=(ii, ii))
+        cache.save(kk, {"x": data})
+    assert cache.n_bytes <= 3000
+    assert cache.load(keys[0]) is None
+    assert cache.load(keys[-1]) is not None
+
+    cache.clear()
+    assert cache.n_bytes == 0
+    return
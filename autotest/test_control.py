@@ -7,6 +7,14 @@ import pytest
 from pywatershed.base.control import Control
 from pywatershed.hydrology.prms_canopy import PRMSCanopy
 from pywatershed.parameters import PrmsParameters  # # TODO: too specific
+from pywatershed.utils.time_utils import (
+    datetime_day_of_month,
+    datetime_dowy,
+    datetime_doy,
+    datetime_epiweek,
+    datetime_month,
+    datetime_year,
+)
 
 time_dict = {
     "start_time": np.datetime64("1979-01-03T00:00:00.00"),
@@ -90,6 +98,41 @@ def test_control_simple(control_simple):
         control_simple.advance()
 
 
+@pytest.mark.domainless
+def test_control_calendar():
+    # sub-daily across a year and a water year boundary
+    control = Control(
+        start_time=np.datetime64("1979-09-28T00:00:00"),
+        end_time=np.datetime64("1981-01-05T00:00:00"),
+        time_step=np.timedelta64(6, "h"),
+    )
+    control.edit_n_time_steps(control.n_times - 100)
+    assert len(control.calendar["time"]) == control.n_times
+    assert control.calendar["time"][-1] == control.end_time
+
+    # at the init_time
+    assert control.current_doy == datetime_doy(control.init_time)
+
+    calendar_fns = {
+        "year": datetime_year,
+        "month": datetime_month,
+        "doy": datetime_doy,
+        "dowy": datetime_dowy,
+        "epiweek": datetime_epiweek,
+    }
+    for ii in range(control.n_times):
+        control.advance()
+        current_time = control.current_time
+        assert control.calendar["time"][ii] == current_time
+        for key, fn in calendar_fns.items():
+            assert getattr(control, f"current_{key}") == fn(current_time)
+        assert control.calendar["day"][ii] == datetime_day_of_month(
+            current_time
+        )
+
+    return
+
+
 @pytest.mark.domainless
 def test_control_advance(control_simple, params_simple):
     # common inputs for 2 canopies
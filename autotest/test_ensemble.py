@@ -0,0 +1,172 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+from utils import nhm_control, nhm_process_list
+
+import pywatershed as pws
+from pywatershed.base.parameters import _set_dict_read_write
+
+n_time_steps = 10
+perturb_param = "soil_moist_max"
+perturb_factors = [1.0, 0.5, 1.5]
+
+
+@pytest.fixture(scope="function")
+def control(simulation):
+    return nhm_control(simulation, n_time_steps)
+
+
+@pytest.fixture(scope="function")
+def process_list(control):
+    return nhm_process_list(control)
+
+
+def perturbed_params(params, factor):
+    data = _set_dict_read_write(params.data)
+    data["data_vars"][perturb_param] = (
+        data["data_vars"][perturb_param] * factor
+    )
+    return pws.parameters.PrmsParameters(**data)
+
+
+def ensemble_params(params):
+    data = _set_dict_read_write(params.data)
+    data["dims"]["nens"] = len(perturb_factors)
+    data["data_vars"][perturb_param] = np.stack(
+        [data["data_vars"][perturb_param] * ff for ff in perturb_factors]
+    )
+    data["metadata"][perturb_param]["dims"] = ("nens", "nhru")
+    return pws.parameters.PrmsParameters(**data)
+
+
+def test_flatten_ensemble(simulation, control):
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+    nhru = params.dims["nhru"]
+    n_ens = len(perturb_factors)
+
+    data = _set_dict_read_write(params.data)
+    data["dims"]["nens"] = n_ens
+    data["data_vars"][perturb_param] = np.stack(
+        [data["data_vars"][perturb_param] * ff for ff in perturb_factors]
+    )
+    data["metadata"][perturb_param]["dims"] = ("nens", "nhru")
+    params_ens = pws.parameters.PrmsParameters(**data)
+
+    flat = params_ens.flatten_ensemble()
+    assert "nens" not in flat.dims.keys()
+    assert flat.dims["nhru"] == n_ens * nhru
+    for ii, ff in enumerate(perturb_factors):
+        member = slice(ii * nhru, (ii + 1) * nhru)
+        np.testing.assert_array_equal(
+            flat.parameters[perturb_param][member],
+            params.parameters[perturb_param] * ff,
+        )
+        # parameters without the ensemble dimension are repeated
+        np.testing.assert_array_equal(
+            flat.parameters["hru_area"][member],
+            params.parameters["hru_area"],
+        )
+        np.testing.assert_array_equal(
+            flat.parameters["tmax_allsnow"][:, member],
+            params.parameters["tmax_allsnow"],
+        )
+
+    data["metadata"][perturb_param]["dims"] = ("nhru", "nens")
+    data["data_vars"][perturb_param] = data["data_vars"][perturb_param].T
+    with pytest.raises(ValueError):
+        pws.parameters.PrmsParameters(**data).flatten_ensemble()
+
+    return
+
+
+def test_ensemble_model(simulation, control, process_list):
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+    nhru = params.dims["nhru"]
+    params_ens = ensemble_params(params)
+
+    model_ens = pws.Model(
+        process_list, control=deepcopy(control), parameters=params_ens
+    )
+    model_ens.run(finalize=True)
+
+    for ii, ff in enumerate(perturb_factors):
+        model = pws.Model(
+            process_list,
+            control=deepcopy(control),
+            parameters=perturbed_params(params, ff),
+        )
+        model.run(finalize=True)
+
+        member = slice(ii * nhru, (ii + 1) * nhru)
+        for proc_name, proc in model.processes.items():
+            proc_ens = model_ens.processes[proc_name]
+            for vv in proc.get_variables():
+                if isinstance(proc[vv], pws.base.timeseries.TimeseriesArray):
+                    answer = proc[vv].current
+                    result = proc_ens[vv].current
+                else:
+                    answer = proc[vv]
+                    result = proc_ens[vv]
+                assert result.shape[-1] == len(perturb_factors) * nhru
+                np.testing.assert_array_equal(result[..., member], answer)
+
+    return
+
+
+def test_ensemble_unfoldable_dims(simulation, control, process_list):
+    if control.options["streamflow_module"] == "strmflow":
+        pytest.skip(
+            f"PRMSChannel not present in simulation {simulation['name']}"
+        )
+
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params_ens = ensemble_params(
+        pws.parameters.PrmsParameters.load(param_file)
+    )
+
+    # segments can not be folded in to the ensemble
+    with pytest.raises(ValueError, match="nsegment"):
+        _ = pws.Model(
+            process_list + [pws.PRMSChannel],
+            control=control,
+            parameters=params_ens,
+        )
+
+    return
+
+
+@pytest.mark.parametrize("shared_inputs", [True, False])
+def test_model_ensemble(simulation, control, process_list, shared_inputs):
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+    return_vars = ["soil_moist", "pkwater_equiv", "gwres_stor"]
+
+    ensemble = pws.ModelEnsemble(
+        process_list,
+        control=deepcopy(control),
+        parameters=[perturbed_params(params, ff) for ff in perturb_factors],
+        n_workers=2,
+        shared_inputs=shared_inputs,
+    )
+    results = ensemble.run(return_vars=return_vars)
+    assert len(results) == len(perturb_factors)
+
+    for ii, ff in enumerate(perturb_factors):
+        model = pws.Model(
+            process_list,
+            control=deepcopy(control),
+            parameters=perturbed_params(params, ff),
+        )
+        model.run(finalize=True)
+        for proc_name, proc in model.processes.items():
+            for vv in return_vars:
+                if vv not in proc.get_variables():
+                    continue
+                np.testing.assert_array_equal(
+                    results[ii][proc_name][vv], proc[vv]
+                )
+
+    return
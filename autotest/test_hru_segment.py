@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from pywatershed.utils.hru_segment import HruSegmentMap
+
+nhru = 1000
+nsegment = 120
+
+
+@pytest.fixture(scope="function")
+def hru_segment():
+    rng = np.random.default_rng(seed=42)
+    # some HRUs are not connected to any segment
+    return rng.integers(-1, nsegment - 5, size=nhru)
+
+
+@pytest.mark.domainless
+def test_hru_segment_map_aggregate(hru_segment):
+    rng = np.random.default_rng(seed=11)
+    hru_values = rng.random(nhru) * 1.0e3
+
+    answer = np.zeros(nsegment)
+    answer_sinks = np.zeros(nhru)
+    for ihru in range(nhru):
+        iseg = hru_segment[ihru]
+        if iseg < 0:
+            answer_sinks[ihru] += hru_values[ihru]
+        else:
+            answer[iseg] += hru_values[ihru]
+
+    hru_seg_map = HruSegmentMap(hru_segment, nsegment)
+    np.testing.assert_array_equal(hru_seg_map.aggregate(hru_values), answer)
+    np.testing.assert_array_equal(
+        hru_seg_map.disconnected_values(hru_values), answer_sinks
+    )
+
+    out = np.full(nsegment, np.nan)
+    result = hru_seg_map.aggregate(hru_values, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, answer)
+
+    # time-varying values
+    ntime = 7
+    hru_values_2d = rng.random((ntime, nhru))
+    answer_2d = np.zeros((ntime, nsegment))
+    for ihru in range(nhru):
+        iseg = hru_segment[ihru]
+        if iseg < 0:
+            continue
+        answer_2d[:, iseg] += hru_values_2d[:, ihru]
+
+    np.testing.assert_array_equal(
+        hru_seg_map.aggregate(hru_values_2d), answer_2d
+    )
+
+    return
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+import pytest
+
+import pywatershed as pws
+
+
+def run_python(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return result.stdout
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys; import pywatershed; "
+        "print(sorted(set(sys.modules) & {'numba', 'xarray', "
+        "'pywatershed.base.control', 'pywatershed.hydrology.prms_snow'}))"
+    )
+    assert run_python(code).strip() == "[]"
+
+
+@pytest.mark.parametrize("name", sorted(pws.__all__))
+def test_all_attributes(name):
+    assert getattr(pws, name) is not None
+    assert name in dir(pws)
+
+
+def test_attributes():
+    from pywatershed import Control, PRMSSnow
+    from pywatershed.base.control import Control as BaseControl
+    from pywatershed.hydrology.prms_snow import PRMSSnow as HydrologyPRMSSnow
+
+    assert Control is BaseControl
+    assert pws.Control is BaseControl
+    assert PRMSSnow is HydrologyPRMSSnow
+    assert pws.hydrology.PRMSSnow is HydrologyPRMSSnow
+
+    # modules and subpackages
+    assert pws.meta.__name__ == "pywatershed.base.meta"
+    assert pws.constants.__name__ == "pywatershed.constants"
+    assert pws.parameters.PrmsParameters is not None
+
+    with pytest.raises(AttributeError):
+        pws.not_an_attribute
@@ -0,0 +1,96 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+from utils import assert_model_variables_equal, nhm_control, nhm_process_list
+
+import pywatershed as pws
+from pywatershed.base.adapter import AdapterMemmap, adapter_factory
+from pywatershed.utils.memmap_utils import netcdf_to_npy, read_npy_header
+
+forcing_vars = ["prcp", "tmax", "tmin"]
+n_time_steps = 10
+
+
+@pytest.fixture(scope="function")
+def control(simulation):
+    return nhm_control(simulation, n_time_steps)
+
+
+@pytest.fixture(scope="function")
+def npy_dir(simulation, tmp_path):
+    for var in forcing_vars:
+        npy_files = netcdf_to_npy(simulation["dir"] / f"{var}.nc", tmp_path)
+        assert npy_files == [tmp_path / f"{var}.npy"]
+    return tmp_path
+
+
+def test_netcdf_to_npy(simulation, npy_dir):
+    nc_read = pws.NetCdfRead(simulation["dir"] / "prcp.nc")
+    header = read_npy_header(npy_dir / "prcp.npy")
+    assert header["variable"] == "prcp"
+    assert header["dims"][0] == "time"
+    np.testing.assert_array_equal(header["time"], nc_read.times)
+    np.testing.assert_array_equal(
+        header["nhm_id"], nc_read._spatial_ids["nhm_id"]
+    )
+    np.testing.assert_array_equal(
+        np.load(npy_dir / "prcp.npy"), nc_read.get_data("prcp")
+    )
+    return
+
+
+def test_adapter_memmap(control, simulation, npy_dir):
+    for var in forcing_vars:
+        memmap = adapter_factory(
+            npy_dir / f"{var}.npy", variable_name=var, control=control
+        )
+        assert isinstance(memmap, AdapterMemmap)
+        netcdf = adapter_factory(
+            simulation["dir"] / f"{var}.nc",
+            variable_name=var,
+            control=control,
+        )
+        np.testing.assert_array_equal(memmap.time, netcdf.time)
+        np.testing.assert_array_equal(memmap.data, netcdf.data)
+
+    control_run = deepcopy(control)
+    memmap = adapter_factory(
+        npy_dir / "prcp.npy", variable_name="prcp", control=control_run
+    )
+    netcdf = adapter_factory(
+        simulation["dir"] / "prcp.nc",
+        variable_name="prcp",
+        control=control_run,
+    )
+    for istep in range(n_time_steps):
+        control_run.advance()
+        memmap.advance()
+        netcdf.advance()
+        np.testing.assert_array_equal(memmap.current, netcdf.current)
+
+    with pytest.raises(ValueError):
+        AdapterMemmap(npy_dir / "prcp.npy", variable="tmax", control=control)
+
+    return
+
+
+def test_model_memmap(control, simulation, npy_dir):
+    process_list = nhm_process_list(control)
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+
+    model_nc = pws.Model(
+        process_list, control=deepcopy(control), parameters=params
+    )
+    model_nc.run(finalize=True)
+
+    control_npy = deepcopy(control)
+    control_npy.options["input_dir"] = npy_dir
+    control_npy.options["input_file_suffix"] = ".npy"
+    model_npy = pws.Model(process_list, control=control_npy, parameters=params)
+    model_npy.run(finalize=True)
+
+    assert_model_variables_equal(model_nc, model_npy)
+
+    return
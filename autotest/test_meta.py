@@ -32,3 +32,52 @@ def test_get_in_list():
     # assert set(gw_param_meta.keys()) == set(gw_params)
 
     return
+
+
+@pytest.mark.domainless
+def test_load_metadata(tmp_path, monkeypatch):
+    cache_file = tmp_path / "metadata.pickle"
+    monkeypatch.setattr(meta, "metadata_cache_files", (cache_file,))
+
+    # compiled on first use
+    metadata = meta.load_metadata()
+    assert cache_file.exists()
+    for name in meta.metadata_files.keys():
+        assert metadata[name] == getattr(meta, name)
+        assert metadata[name] == meta._dims_to_tuples(
+            meta.load_yaml_file(meta.metadata_files[name])
+        )
+
+    # loaded after
+    monkeypatch.setattr(meta, "load_yaml_file", None)
+    assert meta.load_metadata() == metadata
+
+    # recompiled for another version
+    monkeypatch.setattr(meta, "__version__", "0.0.0")
+    with pytest.raises(TypeError):
+        meta.load_metadata()
+
+    return
+
+
+@pytest.mark.domainless
+def test_lookups():
+    # a name is not matched as a substring of a string argument
+    assert list(meta.get_vars("snowcov_area")) == ["snowcov_area"]
+    assert meta.get_params("not_a_param") == {}
+
+    # the order of the metadata, not of the argument
+    names = ["tmaxf", "pkwater_equiv", "not_a_var", "hru_ppt"]
+    order = [name for name in meta.variables.keys() if name in names]
+    assert list(meta.get_vars(names)) == order
+    assert list(meta.get_vars(names[::-1])) == order
+
+    # find_variables in variables, dimensions, control, then parameters
+    found = meta.find_variables(["pkwater_equiv", "nhru", "hru_area"])
+    assert found["pkwater_equiv"] is meta.variables["pkwater_equiv"]
+    assert found["nhru"] is meta.dimensions["nhru"]
+    assert found["hru_area"] is meta.parameters["hru_area"]
+    assert meta.is_available("nhru")
+    assert not meta.is_available("not_a_var")
+
+    return
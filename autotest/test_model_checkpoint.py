@@ -0,0 +1,170 @@
+import numpy as np
+import pytest
+from utils import assert_model_variables_equal, nhm_control, nhm_process_list
+
+import pywatershed as pws
+from pywatershed.base.checkpoint import load_state, save_state
+from pywatershed.hydrology.prms_channel_flow_graph import (
+    prms_channel_flow_graph_to_model_dict,
+)
+
+n_time_steps = 20
+n_time_steps_checkpoint = 8
+
+
+@pytest.fixture(scope="function")
+def process_list(simulation):
+    control = nhm_control(simulation, n_time_steps)
+    process_list = nhm_process_list(control)
+    if control.options["streamflow_module"] != "strmflow":
+        process_list += [pws.PRMSChannel]
+    return process_list
+
+
+def get_model_args(simulation, process_list):
+    control = nhm_control(simulation, n_time_steps)
+    control.options["budget_type"] = "error"
+
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+
+    return (process_list,), {"control": control, "parameters": params}
+
+
+def test_checkpoint_restart(simulation, process_list, tmp_path):
+    args, kwargs = get_model_args(simulation, process_list)
+    model = pws.Model(*args, **kwargs)
+    model.run(finalize=True)
+
+    args, kwargs = get_model_args(simulation, process_list)
+    model_ckpt = pws.Model(*args, **kwargs)
+    model_ckpt.run(n_time_steps=n_time_steps_checkpoint, finalize=False)
+    checkpoint_file = tmp_path / "checkpoint.npz"
+    model_ckpt.checkpoint(checkpoint_file)
+    assert checkpoint_file.exists()
+
+    # continue from the checkpoint in a new model
+    args, kwargs = get_model_args(simulation, process_list)
+    model_restart = pws.Model.from_checkpoint(checkpoint_file, *args, **kwargs)
+    assert model_restart.control.itime_step == n_time_steps_checkpoint - 1
+    assert (
+        model_restart.control.current_time == model_ckpt.control.current_time
+    )
+    model_restart.run(finalize=True)
+    assert model_restart.control.current_time == model.control.current_time
+
+    assert_model_variables_equal(model, model_restart)
+    for proc_name, proc in model.processes.items():
+        proc_restart = model_restart.processes[proc_name]
+        if getattr(proc, "budget", None) is not None:
+            for kk, vv in proc.budget._accumulations_sum.items():
+                np.testing.assert_array_equal(
+                    vv, proc_restart.budget._accumulations_sum[kk]
+                )
+
+    return
+
+
+def test_checkpoint_mismatch(simulation, process_list, tmp_path):
+    args, kwargs = get_model_args(simulation, process_list)
+    model = pws.Model(*args, **kwargs)
+    model.run(n_time_steps=2, finalize=False)
+    checkpoint_file = tmp_path / "checkpoint.npz"
+    model.checkpoint(checkpoint_file)
+
+    args, kwargs = get_model_args(simulation, process_list[0:2])
+    with pytest.raises(ValueError):
+        _ = pws.Model.from_checkpoint(checkpoint_file, *args, **kwargs)
+
+    return
+
+
+def get_flow_graph_model_args(simulation):
+    control = pws.Control.load_prms(
+        simulation["control_file"], warn_unused_options=False
+    )
+    if control.options["streamflow_module"] == "strmflow":
+        pytest.skip(
+            f"PRMSChannel not present in simulation {simulation['name']}"
+        )
+    control.edit_n_time_steps(n_time_steps)
+    control.options["budget_type"] = "error"
+    control.options["input_dir"] = simulation["output_dir"]
+    del control.options["netcdf_output_var_names"]
+    del control.options["netcdf_output_dir"]
+
+    discretization = pws.Parameters.merge(
+        pws.Parameters.from_netcdf(
+            simulation["dir"] / "parameters_dis_hru.nc", encoding=False
+        ),
+        pws.Parameters.from_netcdf(
+            simulation["dir"] / "parameters_dis_seg.nc", encoding=False
+        ),
+    )
+    parameters = pws.parameters.PrmsParameters.from_netcdf(
+        simulation["dir"] / "parameters_PRMSChannel.nc"
+    )
+
+    model_dict = {
+        "control": control,
+        "dis_both": discretization,
+        "model_order": [],
+    }
+    model_dict = prms_channel_flow_graph_to_model_dict(
+        model_dict=model_dict,
+        prms_channel_dis=discretization,
+        prms_channel_dis_name="dis_both",
+        prms_channel_params=parameters,
+        new_nodes_maker_dict={"pass_throughs": pws.PassThroughNodeMaker()},
+        new_nodes_maker_names=["pass_throughs"],
+        new_nodes_maker_indices=[0],
+        new_nodes_flow_to_nhm_seg=[1829],
+        graph_budget_type="error",
+    )
+    return (model_dict,), {}
+
+
+def test_checkpoint_flow_graph(simulation, tmp_path):
+    args, kwargs = get_flow_graph_model_args(simulation)
+    model = pws.Model(*args, **kwargs)
+    model.run(finalize=True)
+
+    args, kwargs = get_flow_graph_model_args(simulation)
+    model_ckpt = pws.Model(*args, **kwargs)
+    model_ckpt.run(n_time_steps=n_time_steps_checkpoint, finalize=False)
+    checkpoint_file = tmp_path / "checkpoint.npz"
+    model_ckpt.checkpoint(checkpoint_file)
+
+    args, kwargs = get_flow_graph_model_args(simulation)
+    model_restart = pws.Model.from_checkpoint(checkpoint_file, *args, **kwargs)
+    model_restart.run(finalize=True)
+
+    graph = model.processes["prms_channel_flow_graph"]
+    graph_restart = model_restart.processes["prms_channel_flow_graph"]
+    for vv in graph.get_variables():
+        np.testing.assert_array_equal(graph[vv], graph_restart[vv])
+
+    for kk, vv in graph.budget._accumulations_sum.items():
+        np.testing.assert_array_equal(
+            vv, graph_restart.budget._accumulations_sum[kk]
+        )
+
+    return
+
+
+def test_checkpoint_version(simulation, process_list, tmp_path):
+    args, kwargs = get_model_args(simulation, process_list)
+    model = pws.Model(*args, **kwargs)
+    model.run(n_time_steps=2, finalize=False)
+    checkpoint_file = tmp_path / "checkpoint.npz"
+    model.checkpoint(checkpoint_file)
+
+    state = load_state(checkpoint_file)
+    state["model/pywatershed_version"] = np.array("0.0.0")
+    save_state(state, checkpoint_file)
+
+    args, kwargs = get_model_args(simulation, process_list)
+    with pytest.warns(UserWarning, match="version 0.0.0"):
+        _ = pws.Model.from_checkpoint(checkpoint_file, *args, **kwargs)
+
+    return
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import xarray as xr
+from utils import assert_model_variables_equal, nhm_control, nhm_process_list
+
+import pywatershed as pws
+
+n_time_steps = 20
+fuse_n_time_steps = 7
+
+
+@pytest.fixture(scope="function")
+def process_list(simulation):
+    control = nhm_control(simulation, n_time_steps)
+    process_list = nhm_process_list(control)
+    if control.options["streamflow_module"] != "strmflow":
+        process_list += [pws.PRMSChannel]
+    return process_list
+
+
+def get_model(simulation, process_list, fuse, calc_method="numba"):
+    control = nhm_control(simulation, n_time_steps)
+    control.options["budget_type"] = "error"
+    control.options["calc_method"] = calc_method
+    if fuse:
+        control.options["fuse_n_time_steps"] = fuse_n_time_steps
+
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+    return pws.Model(process_list, control=control, parameters=params)
+
+
+def test_model_fused(simulation, process_list, tmp_path):
+    model = get_model(simulation, process_list, fuse=False)
+    model.initialize_netcdf(tmp_path / "step")
+    model.run(finalize=True)
+
+    model_fused = get_model(simulation, process_list, fuse=True)
+    model_fused.initialize_netcdf(tmp_path / "fused")
+    # blocks of fuse_n_time_steps time steps and remainders
+    model_fused.run(n_time_steps=3, finalize=False)
+    model_fused.run(finalize=True)
+    assert model_fused.control.current_time == model.control.current_time
+
+    assert_model_variables_equal(model, model_fused)
+    for proc_name, proc in model.processes.items():
+        proc_fused = model_fused.processes[proc_name]
+        if getattr(proc, "budget", None) is not None:
+            for kk, vv in proc.budget._accumulations_sum.items():
+                np.testing.assert_array_equal(
+                    vv, proc_fused.budget._accumulations_sum[kk]
+                )
+
+    nc_files = sorted((tmp_path / "step").glob("*.nc"))
+    assert len(nc_files)
+    for nc_file in nc_files:
+        with (
+            xr.open_dataset(nc_file) as ds,
+            xr.open_dataset(tmp_path / "fused" / nc_file.name) as ds_fused,
+        ):
+            xr.testing.assert_equal(ds, ds_fused)
+
+    return
+
+
+def test_model_fused_numpy(simulation, process_list):
+    model = get_model(simulation, process_list, fuse=True, calc_method="numpy")
+    with pytest.raises(ValueError):
+        model.run(n_time_steps=2, finalize=False)
+
+    return
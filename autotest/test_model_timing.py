@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from utils import nhm_control, nhm_process_list
+
+import pywatershed as pws
+from pywatershed.utils.timing import PhaseTimer
+
+n_time_steps = 5
+
+
+@pytest.mark.domainless
+def test_phase_timer():
+    timer = PhaseTimer()
+    for ii in range(3):
+        with timer.time("a", "calculate"):
+            pass
+    timer.add("b", "read", 2.0, count=4)
+
+    result = timer.to_dict()
+    assert result["a"]["calculate"]["count"] == 3
+    assert result["a"]["calculate"]["seconds"] >= 0.0
+    assert result["b"]["read"] == {"seconds": 2.0, "count": 4}
+
+    df = timer.to_dataframe()
+    assert df.index.names == ["component", "phase"]
+    assert df.loc[("b", "read"), "seconds_per_call"] == 0.5
+    # sorted by descending time
+    assert df.index[0] == ("b", "read")
+
+    timer.reset()
+    assert timer.to_dict() == {}
+    return
+
+
+def test_model_timing(simulation, tmp_path):
+    control = nhm_control(simulation, n_time_steps)
+    control.options["budget_type"] = "error"
+    timing_file = tmp_path / "timing.json"
+    control.options["timing_file"] = timing_file
+
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+
+    process_list = nhm_process_list(control)
+
+    model = pws.Model(process_list, control=control, parameters=params)
+    model.run(finalize=True)
+
+    timing = model.timer.to_dict()
+    assert timing["Model"]["time_step"]["count"] == n_time_steps
+    for proc_name, proc in model.processes.items():
+        for phase in ["advance", "calculate", "output"]:
+            assert timing[proc_name][phase]["count"] == n_time_steps
+        if getattr(proc, "budget", None) is not None:
+            for phase in ["budget_calculate", "budget_output"]:
+                assert timing[proc_name][phase]["count"] == n_time_steps
+                # phases are inclusive
+                assert (
+                    timing[proc_name][phase]["seconds"]
+                    <= timing[proc_name][phase.split("_")[1]]["seconds"]
+                )
+        for input_name in proc.get_inputs():
+            adapter_timing = timing[f"{proc.name}.{input_name}"]
+            assert adapter_timing["adapter"]["count"] == n_time_steps
+
+    # file inputs read by NetCdfRead
+    assert timing["prcp.nc"]["read"]["count"] > 0
+
+    with open(timing_file) as file:
+        assert json.load(file) == timing
+
+    return
@@ -3,6 +3,7 @@ import shutil
 from copy import deepcopy
 from itertools import product
 
+import netCDF4 as nc4
 import numpy as np
 import pytest
 import xarray as xr
@@ -357,3 +358,126 @@ def test_separate_together_var_list(
 
             del ds
     return
+
+
+@pytest.mark.parametrize("separate", separate_outputs, ids=["together", "sep"])
+def test_async_output(simulation, control, params, tmp_path, separate):
+    model_procs = [
+        pywatershed.PRMSSolarGeometry,
+        pywatershed.PRMSAtmosphere,
+        pywatershed.PRMSCanopy,
+        pywatershed.PRMSChannel,
+    ]
+
+    if control.options["streamflow_module"] == "strmflow":
+        _ = model_procs.remove(pywatershed.PRMSChannel)
+
+    domain_output_dir = simulation["output_dir"]
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    control.options["input_dir"] = input_dir
+    control.options["netcdf_output_separate_files"] = separate
+
+    for ff in domain_output_dir.resolve().glob("*.nc"):
+        shutil.copy(ff, input_dir / ff.name)
+    for ff in domain_output_dir.parent.resolve().glob("*.nc"):
+        shutil.copy(ff, input_dir / ff.name)
+
+    output_dirs = {}
+    for async_output in [False, True]:
+        output_dir = tmp_path / f"async_{async_output}"
+        output_dirs[async_output] = output_dir
+        control_run = deepcopy(control)
+        control_run.options["netcdf_output_dir"] = output_dir
+        control_run.options["netcdf_output_async"] = async_output
+        model = Model(
+            model_procs,
+            control=control_run,
+            parameters=params,
+        )
+        model.run()
+        if async_output:
+            assert model.processes["PRMSCanopy"]._netcdf_writer is not None
+
+    sync_files = sorted(output_dirs[False].glob("*.nc"))
+    assert len(sync_files)
+    for sync_file in sync_files:
+        async_file = output_dirs[True] / sync_file.name
+        assert async_file.exists()
+        ds_sync = xr.open_dataset(sync_file, decode_timedelta=False)
+        ds_async = xr.open_dataset(async_file, decode_timedelta=False)
+        xr.testing.assert_identical(ds_sync, ds_async)
+        del ds_sync, ds_async
+
+    return
+
+
+def test_output_chunks(simulation, control, params, tmp_path):
+    model_procs = [
+        pywatershed.PRMSSolarGeometry,
+        pywatershed.PRMSAtmosphere,
+        pywatershed.PRMSCanopy,
+        pywatershed.PRMSChannel,
+    ]
+
+    if control.options["streamflow_module"] == "strmflow":
+        _ = model_procs.remove(pywatershed.PRMSChannel)
+
+    domain_output_dir = simulation["output_dir"]
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    control.options["input_dir"] = input_dir
+    control.options["netcdf_output_separate_files"] = True
+
+    for ff in domain_output_dir.resolve().glob("*.nc"):
+        shutil.copy(ff, input_dir / ff.name)
+    for ff in domain_output_dir.parent.resolve().glob("*.nc"):
+        shutil.copy(ff, input_dir / ff.name)
+
+    # time chunks which do not divide n_time_steps check partial buffers
+    chunk_opts = {
+        "netcdf_output_chunks": {"time": 3, "nhm_id": 100, "nhm_seg": 0},
+        "netcdf_output_complevel": 1,
+        "netcdf_output_shuffle": False,
+    }
+
+    output_dirs = {}
+    for chunked in [False, True]:
+        output_dir = tmp_path / f"chunked_{chunked}"
+        output_dirs[chunked] = output_dir
+        control_run = deepcopy(control)
+        control_run.options["netcdf_output_dir"] = output_dir
+        if chunked:
+            for kk, vv in chunk_opts.items():
+                control_run.options[kk] = vv
+        model = Model(
+            model_procs,
+            control=control_run,
+            parameters=params,
+        )
+        model.run()
+
+    files = sorted(output_dirs[False].glob("*.nc"))
+    assert len(files)
+    for default_file in files:
+        chunked_file = output_dirs[True] / default_file.name
+        ds_default = xr.open_dataset(default_file, decode_timedelta=False)
+        ds_chunked = xr.open_dataset(chunked_file, decode_timedelta=False)
+        xr.testing.assert_identical(ds_default, ds_chunked)
+        del ds_default, ds_chunked
+
+    ds = nc4.Dataset(output_dirs[True] / "net_snow.nc")
+    nhru = ds.dimensions["nhm_id"].size
+    assert ds["net_snow"].chunking() == [3, min(100, nhru)]
+    filters = ds["net_snow"].filters()
+    assert filters["complevel"] == 1
+    assert not filters["shuffle"]
+    ds.close()
+
+    if pywatershed.PRMSChannel in model_procs:
+        ds = nc4.Dataset(output_dirs[True] / "seg_upstream_inflow.nc")
+        nseg = ds.dimensions["nhm_seg"].size
+        assert ds["seg_upstream_inflow"].chunking() == [3, nseg]
+        ds.close()
+
+    return
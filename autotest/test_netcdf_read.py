@@ -1,3 +1,6 @@
+import numpy as np
+import pytest
+
 from pywatershed.utils.netcdf_utils import NetCdfRead
 
 
@@ -19,3 +22,39 @@ def test_netcdf(simulation):
     shape = (ntimes, nhru)
     arr = nc_data.get_data(variable)
     assert arr.shape == shape, f"shape is {arr.shape} but should be {shape}"
+
+
+@pytest.mark.parametrize("prefetch_n_time_batches", [0, 1, 3])
+def test_netcdf_prefetch(simulation, prefetch_n_time_batches):
+    variable = "prcp"
+    nc_pth = simulation["dir"] / f"{variable}.nc"
+
+    answer = NetCdfRead(nc_pth).get_data(variable)
+
+    nc_data = NetCdfRead(
+        nc_pth,
+        load_n_time_batches=7,
+        prefetch_n_time_batches=prefetch_n_time_batches,
+    )
+    for idx in range(nc_data.ntimes):
+        arr = nc_data.advance(variable)
+        np.testing.assert_array_equal(arr, answer[idx, :])
+
+    # out of order batches, e.g. from a restored checkpoint
+    for idx in [0, nc_data.ntimes - 1, 1]:
+        arr = nc_data.get_data(variable, itime_step=idx)
+        np.testing.assert_array_equal(arr, answer[idx, :])
+
+    nc_data.close()
+
+    # finalizing with prefetches pending does not wait on the prefetch thread
+    nc_data = NetCdfRead(
+        nc_pth,
+        load_n_time_batches=7,
+        prefetch_n_time_batches=prefetch_n_time_batches,
+    )
+    _ = nc_data.advance(variable)
+    nc_data.__del__()
+    assert nc_data._prefetch_executor is None
+    assert not nc_data.dataset.isopen()
+    return
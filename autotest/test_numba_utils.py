@@ -0,0 +1,46 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+from numba.core.caching import NullCache
+
+from pywatershed.utils.numba_utils import (
+    TimestepState,
+    njit_cached,
+    timestep_state_structref,
+)
+
+
+def _add(aa, bb):
+    return aa + bb
+
+
+@pytest.mark.domainless
+def test_njit_cached():
+    add = njit_cached(_add, fastmath=True)
+    # one dispatcher per function and options for the session
+    assert njit_cached(_add, fastmath=True) is add
+    assert njit_cached(_add) is not add
+    # compiled with numba's on-disk cache
+    assert not isinstance(add._cache, NullCache)
+    np.testing.assert_equal(add(np.arange(3.0), 1.0), np.arange(3.0) + 1.0)
+    return
+
+
+_Values = namedtuple("_Values", ["aa", "bb", "nn"])
+
+
+def _update(state):
+    state.bb[:] = state.aa * state.nn
+    return
+
+
+@pytest.mark.domainless
+def test_timestep_state_structref():
+    values = _Values(np.arange(3.0), np.zeros(3), 2)
+    state = timestep_state_structref(values)
+    assert isinstance(state, TimestepState)
+    # the state refers to the arrays
+    njit_cached(_update)(state)
+    np.testing.assert_equal(values.bb, np.arange(3.0) * 2)
+    return
@@ -1,4 +1,7 @@
+from copy import deepcopy
+
 import numpy as np
+import pandas as pd
 import pytest
 import xarray as xr
 from utils_compare import compare_in_memory
@@ -10,6 +13,7 @@ from pywatershed.base.flow_graph import FlowGraph, inflow_exchange_factory
 from pywatershed.base.model import Model
 from pywatershed.base.parameters import Parameters
 from pywatershed.constants import nan, zero
+from pywatershed.hydrology.obsin_node import ObsInNodeMaker
 from pywatershed.hydrology.pass_through_node import PassThroughNodeMaker
 from pywatershed.hydrology.prms_channel_flow_graph import (
     HruSegmentFlowAdapter,
@@ -389,3 +393,145 @@ def test_inflow_exchange_compare_prms(
             )
 
     model.finalize()
+
+
+def test_calc_method_equivalence(
+    simulation,
+    control,
+    discretization_prms,
+    parameters_prms,
+):
+    """Compiled batch, python batch and individual nodes are identical.
+
+    The graph mixes a PRMSChannel node batch with individual pass through
+    and ObsIn nodes.
+    """
+    n_time_steps = 60
+    control.edit_n_time_steps(n_time_steps)
+
+    nseg = parameters_prms.dims["nsegment"]
+    nnodes = nseg + 2
+    node_maker_name = ["prms_channel"] * nseg + ["pass_throughs", "obsin"]
+    node_maker_index = np.concatenate([np.arange(nseg), [0, 0]])
+    dis_params = discretization_prms.parameters
+    to_graph_index = np.zeros(nnodes, dtype=np.int64)
+    to_graph_index[0:nseg] = dis_params["tosegment"] - 1
+
+    # intervene above a segment by routing the upstream segments through
+    # the new node
+    n_upstream = np.bincount(
+        to_graph_index[0:nseg][to_graph_index[0:nseg] >= 0], minlength=nseg
+    )
+    iseg_pass_through = np.where(dis_params["nhm_seg"] == 1829)[0][0]
+    n_upstream[iseg_pass_through] = 0
+    iseg_obsin = np.argmax(n_upstream)
+    for inode, iseg in zip([nseg, nseg + 1], [iseg_pass_through, iseg_obsin]):
+        wh_upstream = np.where(to_graph_index[0:nseg] == iseg)
+        to_graph_index[wh_upstream] = inode
+        to_graph_index[inode] = iseg
+
+    params_flow_graph = Parameters(
+        dims={"nnodes": nnodes},
+        coords={"node_coord": np.arange(nnodes)},
+        data_vars={
+            "node_maker_name": node_maker_name,
+            "node_maker_index": node_maker_index,
+            "to_graph_index": to_graph_index,
+        },
+        metadata={
+            "node_coord": {"dims": ["nnodes"]},
+            "node_maker_name": {"dims": ["nnodes"]},
+            "node_maker_index": {"dims": ["nnodes"]},
+            "to_graph_index": {"dims": ["nnodes"]},
+        },
+        validate=True,
+    )
+
+    # observations alternate between observed and missing (negative)
+    poi_id = "obs_0"
+    obs_times = pd.date_range(
+        str(control.start_time)[0:10], periods=n_time_steps, freq="D"
+    )
+    obs_values = np.where(np.arange(n_time_steps) % 2, 100.0, -1.0)
+    obs_data = pd.DataFrame({poi_id: obs_values}, index=obs_times)
+    obsin_params = Parameters(
+        dims={"npoigages": 1},
+        coords={"poi_gage_id": np.array([poi_id])},
+        data_vars={},
+        metadata={"poi_gage_id": {"dims": ["npoigages"]}},
+        validate=True,
+    )
+
+    class GraphInflowAdapter(Adapter):
+        def __init__(self, prms_inflows: Adapter, variable="inflows"):
+            self._variable = variable
+            self._prms_inflows = prms_inflows
+            self._current_value = np.zeros(nnodes) * nan
+            return
+
+        def advance(self) -> None:
+            self._prms_inflows.advance()
+            self._current_value[0:nseg] = self._prms_inflows.current
+            self._current_value[nseg:] = zero
+            return
+
+    graph_vars = [
+        "node_outflows",
+        "node_upstream_inflows",
+        "node_storage_changes",
+        "node_sink_source",
+    ]
+    graph_args = {
+        "default": (None, None),
+        "numba": ("numba", None),
+        "numpy": ("numpy", None),
+        "maker_numpy": (None, "numpy"),
+    }
+    results = {}
+    for key, (graph_calc_method, maker_calc_method) in graph_args.items():
+        control_run = deepcopy(control)
+        input_variables = {}
+        for var in PRMSChannel.get_inputs():
+            nc_path = simulation["output_dir"] / f"{var}.nc"
+            input_variables[var] = AdapterNetcdf(nc_path, var, control_run)
+        inflows_prms = HruSegmentFlowAdapter(
+            parameters_prms, **input_variables
+        )
+
+        flow_graph = FlowGraph(
+            control_run,
+            discretization=None,
+            parameters=params_flow_graph,
+            inflows=GraphInflowAdapter(inflows_prms),
+            node_maker_dict={
+                "prms_channel": PRMSChannelFlowNodeMaker(
+                    discretization_prms,
+                    parameters_prms,
+                    calc_method=maker_calc_method,
+                ),
+                "pass_throughs": PassThroughNodeMaker(),
+                "obsin": ObsInNodeMaker(obsin_params, obs_data),
+            },
+            budget_type="error",
+            calc_method=graph_calc_method,
+        )
+
+        results[key] = {var: [] for var in graph_vars}
+        for istep in range(n_time_steps):
+            control_run.advance()
+            flow_graph.advance()
+            flow_graph.calculate(1.0)
+            for var in graph_vars:
+                results[key][var].append(flow_graph[var].copy())
+
+        flow_graph.finalize()
+
+    for key in ["numba", "numpy", "maker_numpy"]:
+        for var in graph_vars:
+            np.testing.assert_array_equal(
+                np.array(results[key][var]),
+                np.array(results["default"][var]),
+                err_msg=f"{key}: {var}",
+            )
+
+    return
@@ -1,13 +1,15 @@
+from copy import deepcopy
 from warnings import warn
 
 import numpy as np
 import pytest
+import xarray as xr
 from utils_compare import compare_in_memory, compare_netcdfs
 
 from pywatershed.atmosphere.prms_atmosphere import PRMSAtmosphere
 from pywatershed.base.adapter import adapter_factory
 from pywatershed.base.control import Control
-from pywatershed.base.parameters import Parameters
+from pywatershed.base.parameters import Parameters, _set_dict_read_write
 from pywatershed.parameters import PrmsParameters
 
 # pptmix is altered by PRMSCanopy
@@ -155,3 +157,116 @@ def test_compare_prms(
         )
 
     return
+
+
+@pytest.mark.parametrize("n_time_chunk", [1, 100])
+def test_time_chunks(
+    simulation, control, discretization, parameters, tmp_path, n_time_chunk
+):
+    input_variables = {}
+    for key in PRMSAtmosphere.get_inputs():
+        if "soltab" in key:
+            input_variables[key] = simulation["output_dir"] / f"{key}.nc"
+        else:
+            input_variables[key] = simulation["dir"] / f"{key}.nc"
+
+    atms = {}
+    controls = {}
+    for chunk in [None, n_time_chunk]:
+        controls[chunk] = deepcopy(control)
+        atms[chunk] = PRMSAtmosphere(
+            control=controls[chunk],
+            discretization=discretization,
+            parameters=parameters,
+            n_time_chunk=chunk,
+            **input_variables,
+        )
+        atms[chunk].initialize_netcdf(output_dir=tmp_path / f"chunk_{chunk}")
+
+    assert atms[n_time_chunk].tmaxf.data.shape[0] == n_time_chunk
+
+    for ii in range(control.n_times):
+        for chunk, atm in atms.items():
+            controls[chunk].advance()
+            atm.advance()
+            atm.output()
+            atm.calculate(1.0)
+
+        for var in PRMSAtmosphere.get_variables():
+            np.testing.assert_array_equal(
+                atms[n_time_chunk][var].current, atms[None][var].current
+            )
+
+    for chunk, atm in atms.items():
+        atm.finalize()
+
+    for var in PRMSAtmosphere.get_variables():
+        with xr.open_dataset(tmp_path / f"chunk_{None}" / f"{var}.nc") as ans:
+            with xr.open_dataset(
+                tmp_path / f"chunk_{n_time_chunk}" / f"{var}.nc"
+            ) as res:
+                xr.testing.assert_equal(res[var], ans[var])
+
+    return
+
+
+def test_cache(simulation, control, discretization, parameters, tmp_path):
+    input_variables = {}
+    for key in PRMSAtmosphere.get_inputs():
+        if "soltab" in key:
+            input_variables[key] = simulation["output_dir"] / f"{key}.nc"
+        else:
+            input_variables[key] = simulation["dir"] / f"{key}.nc"
+
+    n_time_chunk = 100
+    cache_dir = tmp_path / "cache"
+    atms = {}
+    controls = {}
+    # calculate and fill the cache, load from the cache, no cache
+    for run in ["fill", "load", "none"]:
+        controls[run] = deepcopy(control)
+        atms[run] = PRMSAtmosphere(
+            control=controls[run],
+            discretization=discretization,
+            parameters=parameters,
+            n_time_chunk=n_time_chunk,
+            cache_dir=cache_dir if run != "none" else None,
+            **input_variables,
+        )
+
+    n_chunks = int(np.ceil(control.n_times / n_time_chunk))
+    for ii in range(control.n_times):
+        for run, atm in atms.items():
+            controls[run].advance()
+            atm.advance()
+            atm.calculate(1.0)
+            if run == "fill":
+                n_entries = len(list(cache_dir.glob("*.npz")))
+                assert n_entries == ii // n_time_chunk + 1
+
+        for var in PRMSAtmosphere.get_variables():
+            for run in ["fill", "load"]:
+                np.testing.assert_array_equal(
+                    atms[run][var].current, atms["none"][var].current
+                )
+
+    assert len(list(cache_dir.glob("*.npz"))) == n_chunks
+
+    # the parameters are in the key
+    data = _set_dict_read_write(parameters.data)
+    data["data_vars"]["tmax_cbh_adj"] = data["data_vars"]["tmax_cbh_adj"] + 1
+    params = PrmsParameters(**data)
+    control_params = deepcopy(control)
+    atm = PRMSAtmosphere(
+        control=control_params,
+        discretization=discretization,
+        parameters=params,
+        n_time_chunk=n_time_chunk,
+        cache_dir=cache_dir,
+        **input_variables,
+    )
+    control_params.advance()
+    atm.advance()
+    assert len(list(cache_dir.glob("*.npz"))) == n_chunks + 1
+
+    return
@@ -1,5 +1,6 @@
 import pathlib as pl
 
+import numpy as np
 import pytest
 from utils_compare import compare_in_memory, compare_netcdfs
 
@@ -122,3 +123,42 @@ def test_compare_prms(
         )
 
     return
+
+
+@pytest.mark.parametrize("calc_method", ("numpy", "numba"))
+def test_wavefront_routing_order(
+    simulation, control, discretization, parameters, calc_method
+):
+    output_dir = simulation["output_dir"]
+    channels = {}
+    for routing_order in ("serial", "wavefront"):
+        input_variables = {}
+        for key in PRMSChannel.get_inputs():
+            nc_path = output_dir / f"{key}.nc"
+            input_variables[key] = adapter_factory(
+                nc_path, variable_name=key, control=control
+            )
+
+        channels[routing_order] = PRMSChannel(
+            control,
+            discretization,
+            parameters,
+            **input_variables,
+            budget_type="error",
+            calc_method=calc_method,
+            routing_order=routing_order,
+        )
+
+    # the wavefront solution is identical to the serial one
+    for istep in range(control.n_times):
+        control.advance()
+        for channel in channels.values():
+            channel.advance()
+            channel.calculate(float(istep))
+
+        for var in PRMSChannel.get_variables():
+            np.testing.assert_array_equal(
+                channels["serial"][var], channels["wavefront"][var]
+            )
+
+    return
@@ -1,7 +1,10 @@
+import numba as nb
+import numpy as np
 import pytest
 from utils_compare import compare_in_memory, compare_netcdfs
 
 from pywatershed.atmosphere.prms_solar_geometry import PRMSSolarGeometry
+from pywatershed.atmosphere.solar_constants import r1, solar_declination
 from pywatershed.base.adapter import adapter_factory
 from pywatershed.base.control import Control
 from pywatershed.base.parameters import Parameters
@@ -14,6 +17,7 @@ do_compare_in_memory = True
 rtol = atol = 1.0e-10
 
 params = ("params_sep", "params_one")
+calc_methods = ("numpy", "numba")
 
 
 @pytest.fixture(scope="function")
@@ -43,11 +47,18 @@ def parameters(simulation, control, request):
     return params
 
 
+@pytest.mark.parametrize("calc_method", calc_methods)
 @pytest.mark.parametrize(
     "from_prms_file", (True, False), ids=("from_prms_file", "compute")
 )
 def test_compare_prms(
-    simulation, control, discretization, parameters, tmp_path, from_prms_file
+    simulation,
+    control,
+    discretization,
+    parameters,
+    tmp_path,
+    from_prms_file,
+    calc_method,
 ):
     output_dir = simulation["output_dir"]
 
@@ -61,6 +72,7 @@ def test_compare_prms(
         control,
         discretization=discretization,
         parameters=parameters,
+        calc_method=calc_method,
         from_prms_file=from_prms_file,
     )
 
@@ -103,3 +115,50 @@ def test_compare_prms(
         )
 
     return
+
+
+def test_cache(control, discretization, parameters, tmp_path):
+    cache_dir = tmp_path / "cache"
+    solar_geoms = {}
+    for run in ["fill", "load", "none"]:
+        solar_geoms[run] = PRMSSolarGeometry(
+            control,
+            discretization=discretization,
+            parameters=parameters,
+            cache_dir=cache_dir if run != "none" else None,
+        )
+        solar_geoms[run]._calculate_all_time()
+        assert len(list(cache_dir.glob("*.npz"))) == 1
+
+    for var in PRMSSolarGeometry.get_variables():
+        for run in ["fill", "load"]:
+            np.testing.assert_array_equal(
+                solar_geoms[run][var].data, solar_geoms["none"][var].data
+            )
+
+    return
+
+
+def test_calc_method_equivalence():
+    # HRUs with random geometries, including flat HRUs
+    rng = np.random.default_rng(0)
+    nhru = 500
+    slopes = rng.uniform(0.0, 1.5, nhru)
+    slopes[:50] = 0.0
+    aspects = rng.uniform(0.0, 360.0, nhru)
+    lats = rng.uniform(-10.0, 75.0, nhru)
+
+    solt, sunh = PRMSSolarGeometry.compute_soltab(
+        slopes,
+        aspects,
+        lats,
+        PRMSSolarGeometry.compute_t,
+        PRMSSolarGeometry.func3,
+    )
+    solt_hrus, sunh_hrus, _ = nb.njit(PRMSSolarGeometry._compute_soltab_hrus)(
+        slopes, aspects, lats, solar_declination, r1
+    )
+    np.testing.assert_allclose(solt_hrus, solt, rtol=1.0e-12, atol=1.0e-10)
+    np.testing.assert_allclose(sunh_hrus, sunh, rtol=1.0e-12, atol=1.0e-10)
+
+    return
@@ -7,9 +7,11 @@ import numpy as np
 import pytest
 
 from pywatershed.utils.time_utils import (
+    calendar_table,
     datetime_day_of_month,
     datetime_dowy,
     datetime_doy,
+    datetime_epiweek,
     datetime_month,
     datetime_year,
     dt64_to_dt,
@@ -72,3 +74,25 @@ def test_datetime_dowy():
 def test_epiweek():
     dt, dt64 = random_datetime_datetime64()
     assert ew.Week.fromdate(dt) == ew.Week.fromdate(dt64_to_dt(dt64))
+
+
+@pytest.mark.domainless
+def test_calendar_table():
+    times = np.arange(
+        np.datetime64("1979-12-25T00:00:00"),
+        np.datetime64("1990-01-10T00:00:00"),
+        np.timedelta64(1, "D"),
+    )
+    times = np.concatenate([times, [random_datetime_datetime64()[1]]])
+    calendar = calendar_table(times)
+    calendar_fns = {
+        "year": datetime_year,
+        "month": datetime_month,
+        "day": datetime_day_of_month,
+        "doy": datetime_doy,
+        "dowy": datetime_dowy,
+        "epiweek": datetime_epiweek,
+    }
+    for key, fn in calendar_fns.items():
+        assert calendar[key].shape == times.shape
+        assert (calendar[key] == [fn(tt) for tt in times]).all(), key
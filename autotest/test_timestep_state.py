@@ -0,0 +1,52 @@
+import pytest
+from utils import nhm_control, nhm_process_list
+
+import pywatershed as pws
+from pywatershed.utils.numba_utils import TimestepState
+
+n_time_steps = 5
+calc_methods = ("numpy", "numba")
+
+
+@pytest.mark.parametrize("calc_method", calc_methods)
+def test_timestep_state_in_place(simulation, calc_method):
+    control = nhm_control(simulation, n_time_steps)
+    control.options["calc_method"] = calc_method
+    param_file = simulation["dir"] / control.options["parameter_file"]
+    params = pws.parameters.PrmsParameters.load(param_file)
+    model = pws.Model(
+        nhm_process_list(control), control=control, parameters=params
+    )
+
+    procs = [
+        proc
+        for proc in model.processes.values()
+        if proc._timestep_state_attrs is not None
+    ]
+    assert len(procs)
+    variables = {}
+    for proc in procs:
+        state = proc.timestep_state
+        # the state refers to the attributes of the Process and is cached
+        assert proc.timestep_state is state
+        if calc_method == "numba":
+            assert isinstance(state, TimestepState)
+        else:
+            for attr, value in zip(proc._timestep_state_attrs, state):
+                assert value is getattr(proc, attr)
+        variables[proc.name] = {vv: proc[vv] for vv in proc.variables}
+
+    model.run(finalize=True)
+
+    # the timestep functions update the variables in place
+    for proc in procs:
+        for vv, value in variables[proc.name].items():
+            assert proc[vv] is value
+
+    # rebinding an attribute of the state replaces the state
+    proc = procs[0]
+    state = proc.timestep_state
+    attr = proc._timestep_state_attrs[0]
+    setattr(proc, attr, getattr(proc, attr))
+    assert proc.timestep_state is not state
+    return
@@ -2,6 +2,8 @@ from types import MappingProxyType
 
 import numpy as np
 
+import pywatershed as pws
+
 print_ans = False
 
 
@@ -62,3 +64,55 @@ def assert_dicts_equal(dic1, dic2):
             ):
                 continue
             assert dic1[kk] == dic2[kk]
+
+
+def nhm_control(simulation, n_time_steps: int) -> pws.Control:
+    """A short numpy Control of a simulation reading inputs from its dir."""
+    control = pws.Control.load_prms(
+        simulation["control_file"], warn_unused_options=False
+    )
+    control.edit_n_time_steps(n_time_steps)
+    control.options["calc_method"] = "numpy"
+    control.options["input_dir"] = simulation["dir"]
+    del control.options["netcdf_output_var_names"]
+    del control.options["netcdf_output_dir"]
+    return control
+
+
+def nhm_process_list(control: pws.Control) -> list:
+    """The NHM processes (without PRMSChannel) for the dprst_flag option."""
+    if (
+        "dprst_flag" in control.options.keys()
+        and control.options["dprst_flag"]
+    ):
+        Runoff = pws.PRMSRunoff
+        Soilzone = pws.PRMSSoilzone
+        Groundwater = pws.PRMSGroundwater
+    else:
+        Runoff = pws.PRMSRunoffNoDprst
+        Soilzone = pws.PRMSSoilzoneNoDprst
+        Groundwater = pws.PRMSGroundwaterNoDprst
+
+    return [
+        pws.PRMSSolarGeometry,
+        pws.PRMSAtmosphere,
+        pws.PRMSCanopy,
+        pws.PRMSSnow,
+        Runoff,
+        Soilzone,
+        Groundwater,
+    ]
+
+
+def assert_model_variables_equal(model, model_other):
+    """Assert the current variables of all processes of Models are equal."""
+    for proc_name, proc in model.processes.items():
+        proc_other = model_other.processes[proc_name]
+        for vv in proc.get_variables():
+            if isinstance(proc[vv], pws.base.timeseries.TimeseriesArray):
+                np.testing.assert_array_equal(
+                    proc[vv].current, proc_other[vv].current
+                )
+            else:
+                np.testing.assert_array_equal(proc[vv], proc_other[vv])
+    return
@@ -1,50 +1,67 @@
-from .analysis.model_graph import ModelGraph
-from .analysis.utils.colorbrewer import ColorBrewer
-from .atmosphere.prms_atmosphere import PRMSAtmosphere
-from .atmosphere.prms_solar_geometry import PRMSSolarGeometry
-from .base import meta
-from .base.adapter import Adapter, AdapterNetcdf, adapter_factory
-from .base.budget import Budget
-from .base.control import Control
-from .base.flow_graph import FlowGraph, FlowNode, FlowNodeMaker
-from .base.model import Model
-from .base.parameters import Parameters
-from .base.process import Process
-from .base.timeseries import TimeseriesArray
-from .hydrology.obsin_node import ObsInNode, ObsInNodeMaker
-from .hydrology.pass_through_node import PassThroughNode, PassThroughNodeMaker
-from .hydrology.prms_canopy import PRMSCanopy
-from .hydrology.prms_channel import PRMSChannel
-from .hydrology.prms_channel_flow_graph import (
-    HruSegmentFlowAdapter,
-    HruSegmentFlowExchange,
-    PRMSChannelFlowNode,
-    PRMSChannelFlowNodeMaker,
-    prms_channel_flow_graph_postprocess,
-    prms_channel_flow_graph_to_model_dict,
-)
-from .hydrology.prms_et import PRMSEt
-from .hydrology.prms_groundwater import PRMSGroundwater
-from .hydrology.prms_groundwater_no_dprst import PRMSGroundwaterNoDprst
-from .hydrology.prms_runoff import PRMSRunoff
-from .hydrology.prms_runoff_no_dprst import PRMSRunoffNoDprst
-from .hydrology.prms_snow import PRMSSnow
-from .hydrology.prms_soilzone import PRMSSoilzone
-from .hydrology.prms_soilzone_no_dprst import PRMSSoilzoneNoDprst
-from .hydrology.starfit import Starfit, StarfitFlowNode, StarfitFlowNodeMaker
-from .plot.domain_plot import DomainPlot
-from .utils import (
-    ControlVariables,
-    NetCdfRead,
-    NetCdfWrite,
-    Soltab,
-    addtl_domain_files,
-    gis_files,
-)
-from .utils.csv_utils import CsvFile
-from .utils.mmr_to_mf6_dfw import MmrToMf6Dfw
+from .utils.lazy_loader import lazy_attributes
 from .version import __version__
 
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "ModelGraph": ".analysis.model_graph",
+    "ColorBrewer": ".analysis.utils.colorbrewer",
+    "PRMSAtmosphere": ".atmosphere.prms_atmosphere",
+    "PRMSSolarGeometry": ".atmosphere.prms_solar_geometry",
+    "meta": ".base.meta",
+    "Adapter": ".base.adapter",
+    "AdapterMemmap": ".base.adapter",
+    "AdapterNetcdf": ".base.adapter",
+    "adapter_factory": ".base.adapter",
+    "Budget": ".base.budget",
+    "Control": ".base.control",
+    "FlowGraph": ".base.flow_graph",
+    "FlowNode": ".base.flow_graph",
+    "FlowNodeMaker": ".base.flow_graph",
+    "Model": ".base.model",
+    "ModelEnsemble": ".base.model_ensemble",
+    "Parameters": ".base.parameters",
+    "Process": ".base.process",
+    "TimeseriesArray": ".base.timeseries",
+    "ObsInNode": ".hydrology.obsin_node",
+    "ObsInNodeMaker": ".hydrology.obsin_node",
+    "PassThroughNode": ".hydrology.pass_through_node",
+    "PassThroughNodeMaker": ".hydrology.pass_through_node",
+    "PRMSCanopy": ".hydrology.prms_canopy",
+    "PRMSChannel": ".hydrology.prms_channel",
+    "HruSegmentFlowAdapter": ".hydrology.prms_channel_flow_graph",
+    "HruSegmentFlowExchange": ".hydrology.prms_channel_flow_graph",
+    "PRMSChannelFlowNode": ".hydrology.prms_channel_flow_graph",
+    "PRMSChannelFlowNodeMaker": ".hydrology.prms_channel_flow_graph",
+    "prms_channel_flow_graph_postprocess": (
+        ".hydrology.prms_channel_flow_graph"
+    ),
+    "prms_channel_flow_graph_to_model_dict": (
+        ".hydrology.prms_channel_flow_graph"
+    ),
+    "PRMSEt": ".hydrology.prms_et",
+    "PRMSGroundwater": ".hydrology.prms_groundwater",
+    "PRMSGroundwaterNoDprst": ".hydrology.prms_groundwater_no_dprst",
+    "PRMSRunoff": ".hydrology.prms_runoff",
+    "PRMSRunoffNoDprst": ".hydrology.prms_runoff_no_dprst",
+    "PRMSSnow": ".hydrology.prms_snow",
+    "PRMSSoilzone": ".hydrology.prms_soilzone",
+    "PRMSSoilzoneNoDprst": ".hydrology.prms_soilzone_no_dprst",
+    "Starfit": ".hydrology.starfit",
+    "StarfitFlowNode": ".hydrology.starfit",
+    "StarfitFlowNodeMaker": ".hydrology.starfit",
+    "DomainPlot": ".plot.domain_plot",
+    "ControlVariables": ".utils.control",
+    "NetCdfRead": ".utils.netcdf_utils",
+    "NetCdfWrite": ".utils.netcdf_utils",
+    "Soltab": ".utils.prms5util",
+    "addtl_domain_files": ".utils.addtl_domain_files",
+    "gis_files": ".utils.gis_files",
+    "CsvFile": ".utils.csv_utils",
+    "MmrToMf6Dfw": ".utils.mmr_to_mf6_dfw",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
+
 __all__ = (
     "prms_channel_flow_graph_postprocess",
     "prms_channel_flow_graph_to_model_dict",
@@ -58,6 +75,7 @@ __all__ = (
     "PRMSSolarGeometry",
     "meta",
     "Adapter",
+    "AdapterMemmap",
     "AdapterNetcdf",
     "adapter_factory",
     "Budget",
@@ -67,6 +85,7 @@ __all__ = (
     "FlowNodeMaker",
     "HruSegmentFlowAdapter",
     "Model",
+    "ModelEnsemble",
     "Parameters",
     "Process",
     "TimeseriesArray",
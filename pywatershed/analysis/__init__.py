@@ -1,5 +1,12 @@
-from .model_graph import ModelGraph
-from .process_plot import ProcessPlot
+from ..utils.lazy_loader import lazy_attributes
+
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "ModelGraph": ".model_graph",
+    "ProcessPlot": ".process_plot",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
 
 __all__ = (
     "ModelGraph",
@@ -1,5 +1,12 @@
-from .prms_atmosphere import PRMSAtmosphere
-from .prms_solar_geometry import PRMSSolarGeometry
+from ..utils.lazy_loader import lazy_attributes
+
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "PRMSAtmosphere": ".prms_atmosphere",
+    "PRMSSolarGeometry": ".prms_solar_geometry",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
 
 __all__ = (
     "PRMSAtmosphere",
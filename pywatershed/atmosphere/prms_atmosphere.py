@@ -8,8 +8,9 @@ from pywatershed.utils.netcdf_utils import NetCdfWrite
 
 from ..base.adapter import adaptable
 from ..base.control import Control
-from ..constants import inch2cm, nan, nearzero, one, zero
+from ..constants import fileish, inch2cm, nan, nearzero, one, zero
 from ..parameters import Parameters
+from ..utils.cache_utils import ArrayCache
 from ..utils.time_utils import datetime_day_of_month, datetime_month
 from .solar_constants import solf
 
@@ -49,25 +50,37 @@ class PRMSAtmosphere(Process):
     evapotranspiration (Jensen and Haise ,1963) and a temperature based
     transpiration flag (transp_on) are also calculated.
 
-    Note that all variables are calculated for all time upon the first advance
-    and that all calculated variables are written to NetCDF (when netcdf output
-    is requested) the first time output is requested. This is effectively a
-    complete preprocessing of the input CBH files to the fields the model
-    actually uses on initialization. For an example of preprocessing the
-    variables in PRMSAtmosphere, see
+    Note that by default all variables are calculated for all time upon the
+    first advance and that all calculated variables are written to NetCDF
+    (when netcdf output is requested) the first time output is requested.
+    This is effectively a complete preprocessing of the input CBH files to the
+    fields the model actually uses on initialization. For an example of
+    preprocessing the variables in PRMSAtmosphere, see
     `this notebook <https://github.com/EC-USGS/pywatershed/tree/main/examples/04_preprocess_atm.ipynb>`_.
 
-    The full time version of a variable is given by the "private" version of
-    the variable which is named with a single-leading underscore (eg tmaxf for
-    all time is _tmaxf).
+    The full time version of a variable is given by the data of the variable
+    (eg tmaxf for all time is tmaxf.data).
 
     This full-time initialization may not be tractable for large domains and/or
-    long periods of time and require changes to batch the processing of the
-    variables. The benefits of full-time initialization are 1) the code is
-    vectorized and fast for such a large calculation, 2) the initialization of
-    this class effectively preprocess all the inputs to the rest of the model
-    and can then be skipped in subsequent model calls (unless the parameters
-    are changing).
+    long periods of time. The benefits of full-time initialization are 1) the
+    code is vectorized and fast for such a large calculation, 2) the
+    initialization of this class effectively preprocess all the inputs to the
+    rest of the model and can then be skipped in subsequent model calls
+    (unless the parameters are changing). When n_time_chunk is given, the
+    variables are instead calculated for windows of n_time_chunk times, the
+    first window upon the first advance and each subsequent window when the
+    simulation reaches it. Only the current window of the inputs and
+    variables is held in memory and it is written to NetCDF when output is
+    requested in the window. The state of the transpiration switch is carried
+    between windows, so the results do not depend on n_time_chunk.
+
+    When cache_dir is given, the variables of each window are stored in an
+    ArrayCache (see :mod:`pywatershed.utils.cache_utils`) keyed by a hash of
+    the parameters, the input files (name, size and modification time) or
+    input data, and the window of time. Subsequent runs with the same key
+    load the variables from the cache instead of calculating them. This
+    replaces preprocessing the variables by hand for, e.g., parameter sweeps
+    which do not change the parameters of PRMSAtmosphere.
 
     Args:
         control: a Control object
@@ -81,6 +94,14 @@ class PRMSAtmosphere(Process):
         soltab_horad_potsw: the solar table of potential shortwave
             radiation on a horizontal plane
 
+        n_time_chunk: the number of times calculated at once, defaults to
+            the control option "n_time_chunk" or all times if not set or
+            less than 1.
+        cache_dir: a directory caching the calculated variables, defaults
+            to the control option "cache_dir" or no caching if not set.
+        cache_max_bytes: the maximum size of the cache in cache_dir, the
+            least recently used entries are removed to stay below it.
+            Defaults to the control option "cache_max_bytes" or 10 GB.
         verbose: Print extra information or not?
 
     """
@@ -95,18 +116,22 @@ class PRMSAtmosphere(Process):
         tmin: [str, pl.Path],
         soltab_potsw: adaptable,
         soltab_horad_potsw: adaptable,
+        n_time_chunk: int = None,
+        cache_dir: fileish = None,
+        cache_max_bytes: int = None,
         verbose: bool = False,
     ):
-        # Defering handling batch handling of time chunks but self.n_time_chunk
-        # is a dimension used in the metadata/variables dimensions.
-        # TODO: make time chunking options work (esp with output)
-        # if n_time_chunk <= 0:
-        #     self.n_time_chunk = control.n_times
-        # else:
-        #     self.n_time_chunk = n_time_chunk
-
-        # Initialize full time with nans
-        self._time = np.full(control.n_times, nan, dtype="datetime64[s]")
+        # The ntime dimension of the variables is the length of a window of
+        # time, set before the variables are initialized.
+        if n_time_chunk is None:
+            n_time_chunk = control.options.get("n_time_chunk", None)
+        if n_time_chunk is None or n_time_chunk < 1:
+            n_time_chunk = control.n_times
+        n_time_chunk = min(n_time_chunk, control.n_times)
+        self._n_time_chunk = n_time_chunk
+
+        # Initialize the window of time with nans
+        self._time = np.full(n_time_chunk, nan, dtype="datetime64[s]")
 
         metadata_patches = {
             kk: {"dims": ("ntime", "nhru")} for kk in self.variables
@@ -124,47 +149,130 @@ class PRMSAtmosphere(Process):
         self._set_inputs(locals())
         self._set_options(locals())
 
+        # the control time step of the first time of the window
+        self._chunk_start = 0
+        self._chunk_n_times = n_time_chunk
         self._calculated = False
+        self._chunk_written = False
         self._netcdf_initialized = False
+        self._netcdf = {}
+
+        if self._cache_dir is not None:
+            self._cache = ArrayCache(self._cache_dir, self._cache_max_bytes)
+        else:
+            self._cache = None
 
         return
 
-    def _calculate_all_time(self):
-        if self._calculated:
-            return
+    def _chunk_cache_key(self, chunk_start: int, chunk_end: int) -> str:
+        """The cache key of the window of time from chunk_start to chunk_end.
+
+        The state carried between windows is determined by the start time of
+        the control and the same parameters and inputs, so these and the
+        window identify the variables of the window.
+        """
+        if self._cache is None:
+            return None
+        inputs = {}
+        for input, adapter in self._input_variables_dict.items():
+            fname = getattr(adapter, "_fname", None)
+            if fname is not None:
+                inputs[input] = pl.Path(fname)
+            else:
+                inputs[input] = np.asarray(adapter.data)
+        params = {param: self[param] for param in self.get_parameters()}
+        return self._cache.key(
+            self.name,
+            params,
+            inputs,
+            self.control.start_time,
+            chunk_start,
+            chunk_end,
+        )
+
+    def _calculate_chunk(self, chunk_start: int) -> None:
+        """Calculate all variables for the window of time at chunk_start."""
+        chunk_end = min(chunk_start + self._n_time_chunk, self.control.n_times)
+        n_times = chunk_end - chunk_start
+
+        # the last window may be shorter
+        if n_times != self._time.shape[0]:
+            self._time = np.full(n_times, nan, dtype="datetime64[s]")
+        for vv in self.variables:
+            var = self[vv]
+            if n_times != var.data.shape[0]:
+                var.set_window(
+                    chunk_start,
+                    data=np.full(
+                        (n_times,) + var.data.shape[1:],
+                        self.get_init_values()[vv],
+                        dtype=var.data.dtype,
+                    ),
+                )
 
-        # Eventually refactor to work at specific chunks of time
         for input in ["prcp", "tmax", "tmin"]:
-            # # this is a bit of a mess: ._dataset.dataset
-            input_time = self._input_variables_dict[input]._nc_read.times
-            # dont do this...
-            # self[input][:] = ds.dataset[input][:].data
-            if np.isnan(self._time[0]):
-                self._time[:] = input_time
+            # the time of an AdapterNetcdf or a TimeseriesArray
+            input_time = self._input_variables_dict[input].time
+            if input == "prcp":
+                self._time[:] = input_time[chunk_start:chunk_end]
             else:
-                assert (input_time == self._time).all()
+                assert (input_time[chunk_start:chunk_end] == self._time).all()
 
-        start_time_ind = np.where(self._time == self.control._start_time)[0]
-        if not len(start_time_ind):
+        if chunk_start == 0 and self._time[0] != self.control._start_time:
             msg = "Control start_time is not in the input data time"
             raise ValueError(msg)
-        self._init_time_ind = start_time_ind[0]
 
-        # Solve all variables for all time
-        self._month_ind_12 = datetime_month(self._time) - 1  # (time)
-        self._month_ind_1 = np.zeros(self._time.shape, dtype=int)  # (time)
-        self._month = datetime_month(self._time)  # (time)
-        self._dom = datetime_day_of_month(self._time)  # (time)
+        # the state at the end of the window is cached with the variables
+        carry_names = [
+            f"_{carry}_chunk_end"
+            for carry in ("transp_on", "transp_check", "tmax_sum")
+        ]
+        cache_key = self._chunk_cache_key(chunk_start, chunk_end)
+        cached = None
+        if cache_key is not None:
+            cached = self._cache.load(cache_key)
+
+        if cached is not None:
+            for name in self.variables:
+                self[name].data[:] = cached[name]
+            for name in carry_names:
+                getattr(self, name)[:] = cached[name]
+
+        else:
+            self._chunk_inputs = {}
+            for input in ["prcp", "tmax", "tmin"]:
+                self._chunk_inputs[input] = self._input_variables_dict[
+                    input
+                ].data_window(chunk_start, chunk_end)
+
+            # Solve all variables for the window of time
+            self._month_ind_12 = datetime_month(self._time) - 1  # (time)
+            self._month_ind_1 = np.zeros(self._time.shape, dtype=int)
+            self._month = datetime_month(self._time)  # (time)
+            self._dom = datetime_day_of_month(self._time)  # (time)
+
+            self.adjust_temperature()
+            self.adjust_precip()
+            self.calculate_sw_rad_degree_day()
+            self.calculate_potential_et_jh()
+            self.calculate_transp_tindex()
+
+            # only the variables are kept for the window
+            del self._chunk_inputs
+
+            if cache_key is not None:
+                arrays = {name: self[name].data for name in self.variables}
+                for name in carry_names:
+                    arrays[name] = getattr(self, name)
+                self._cache.save(cache_key, arrays)
 
-        self.adjust_temperature()
-        self.adjust_precip()
-        self.calculate_sw_rad_degree_day()
-        self.calculate_potential_et_jh()
-        self.calculate_transp_tindex()
+        for vv in self.variables:
+            self[vv].set_window(chunk_start, time=self._time)
 
-        # JLM todo: delete large variables on self for memory management
+        self._chunk_start = chunk_start
+        self._chunk_n_times = n_times
         self._calculated = True
-
+        self._chunk_written = False
         return
 
     @staticmethod
@@ -272,11 +380,22 @@ class PRMSAtmosphere(Process):
         }
 
     def _set_initial_conditions(self):
+        self._init_transp_tindex()
         return
 
     def _advance_variables(self):
         if not self._calculated:
-            self._calculate_all_time()
+            # the first window, or the window restored from a checkpoint
+            self._calculate_chunk(self._chunk_start)
+        elif (
+            self.control.itime_step >= self._chunk_start + self._chunk_n_times
+        ):
+            # carry the transpiration state to the next window
+            self._transp_on_chunk_start[:] = self._transp_on_chunk_end
+            self._transp_check_chunk_start[:] = self._transp_check_chunk_end
+            self._tmax_sum_chunk_start[:] = self._tmax_sum_chunk_end
+            self._calculate_chunk(self._chunk_start + self._chunk_n_times)
+
         for vv in self.variables:
             self[vv].advance()
         return
@@ -307,9 +426,9 @@ class PRMSAtmosphere(Process):
             raise ValueError(msg)
 
         # (time, space) dimensions on these variables
-        ivd = self._input_variables_dict
-        self.tmaxf.data[:] = ivd["tmax"].data + self.tmax_cbh_adj[month_ind]
-        self.tminf.data[:] = ivd["tmin"].data + self.tmin_cbh_adj[month_ind]
+        inputs = self._chunk_inputs
+        self.tmaxf.data[:] = inputs["tmax"] + self.tmax_cbh_adj[month_ind]
+        self.tminf.data[:] = inputs["tmin"] + self.tmin_cbh_adj[month_ind]
         self.tminc.data[:] = (self["tminf"].data - 32.0) * (5 / 9)
         self.tmaxc.data[:] = (self["tmaxf"].data - 32.0) * (5 / 9)
         self.tavgc.data[:] = (self["tmaxc"].data + self["tminc"].data) / 2.0
@@ -326,7 +445,7 @@ class PRMSAtmosphere(Process):
             None
         """
 
-        ivd = self._input_variables_dict
+        inputs = self._chunk_inputs
 
         # throw an error shapes are inconsistent
         shape_list = np.array(
@@ -386,7 +505,7 @@ class PRMSAtmosphere(Process):
         # This is in climate_hru as a condition of calling climateflow
         # (eye roll)
         self.prmx.data[:] = np.where(
-            ivd["prcp"].data <= zero, zero, self.prmx.data
+            inputs["prcp"] <= zero, zero, self.prmx.data
         )
 
         # Recalculate/redefine these now based on prmx instead of the
@@ -396,14 +515,14 @@ class PRMSAtmosphere(Process):
 
         # Mixed case (everywhere, to be overwritten by the all-snow/rain-fall
         # cases)
-        self.hru_ppt.data[:] = ivd["prcp"].data * self.snow_cbh_adj[month_ind]
+        self.hru_ppt.data[:] = inputs["prcp"] * self.snow_cbh_adj[month_ind]
         self.hru_rain.data[:] = self.prmx.data * self.hru_ppt.data
         self.hru_snow.data[:] = self.hru_ppt.data - self.hru_rain.data
 
         # All precip is snow case
         # The condition to be used later:
         self.hru_ppt.data[wh_all_snow] = (
-            ivd["prcp"].data * self.snow_cbh_adj[month_ind]
+            inputs["prcp"] * self.snow_cbh_adj[month_ind]
         )[wh_all_snow]
         self.hru_snow.data[wh_all_snow] = self.hru_ppt.data[wh_all_snow]
         self.hru_rain.data[wh_all_snow] = zero
@@ -411,7 +530,7 @@ class PRMSAtmosphere(Process):
         # All precip is rain case
         # The condition to be used later:
         self.hru_ppt.data[wh_all_rain] = (
-            ivd["prcp"].data * self.rain_cbh_adj[month_ind]
+            inputs["prcp"] * self.rain_cbh_adj[month_ind]
         )[wh_all_rain]
         self.hru_rain.data[wh_all_rain] = self.hru_ppt.data[wh_all_rain]
         self.hru_snow.data[wh_all_rain] = zero
@@ -677,20 +796,19 @@ class PRMSAtmosphere(Process):
     #     self.pot_et_consumed += et
     #     return et
 
-    def calculate_transp_tindex(self):
+    def _init_transp_tindex(self):
+        """Initialize the transpiration switch and its state at start_time.
+
+        The state at the start of the current window of time (transp_on of
+        the previous time, the check switch and the tmax sum) is carried
+        between windows by calculate_transp_tindex.
+        """
         # INIT: Process_flag==INIT
         # transp_on inited to 0 everywhere above
+        self._transp_on_chunk_start = np.zeros(self.nhru, dtype="int64")
+        self._transp_check_chunk_start = np.zeros(self.nhru, dtype="int64")
+        self._tmax_sum_chunk_start = np.zeros(self.nhru, dtype="float64")
 
-        # candidate for worst code lines
-        if self._params.parameters["temp_units"] == 0:
-            transp_tmax_f = self.transp_tmax
-        else:
-            transp_tmax_f = (self.transp_tmax * (9.0 / 5.0)) + 32.0
-
-        transp_check = self.transp_on.current.copy()  # dim nhrus only
-        tmax_sum = self.transp_on.current.copy().astype(
-            "float64"
-        )  # dim nhrus only
         start_day = self.control.start_doy
         start_month = self.control.start_month
 
@@ -700,26 +818,38 @@ class PRMSAtmosphere(Process):
             if start_month == self.transp_beg[hh]:
                 # rsr, why 10? if transp_tmax < 300, should be < 10
                 if start_day > 10:
-                    self.transp_on.data[0, hh] = 1
+                    self._transp_on_chunk_start[hh] = 1
                 else:
-                    transp_check[hh] = 1
+                    self._transp_check_chunk_start[hh] = 1
 
             elif self.transp_end[hh] > self.transp_beg[hh]:
                 if (start_month > self.transp_beg[hh]) and (
                     start_month < self.transp_end[hh]
                 ):
-                    self.transp_on.data[0, hh] = 1
+                    self._transp_on_chunk_start[hh] = 1
             else:
                 if (start_month > self.transp_beg[hh]) or (
                     motmp < self.transp_end[hh] + self.nmonth
                 ):
-                    self.transp_on.data[0, hh] = 1
+                    self._transp_on_chunk_start[hh] = 1
+
+        self._transp_on_chunk_end = self._transp_on_chunk_start.copy()
+        self._transp_check_chunk_end = self._transp_check_chunk_start.copy()
+        self._tmax_sum_chunk_end = self._tmax_sum_chunk_start.copy()
+        return
+
+    def calculate_transp_tindex(self):
+        # candidate for worst code lines
+        if self._params.parameters["temp_units"] == 0:
+            transp_tmax_f = self.transp_tmax
+        else:
+            transp_tmax_f = (self.transp_tmax * (9.0 / 5.0)) + 32.0
+
+        # the state at the start of the window
+        transp_check = self._transp_check_chunk_start.copy()
+        tmax_sum = self._tmax_sum_chunk_start.copy()
 
-        # vectorize
         ntime = self.transp_on.data.shape[0]
-        # _transp_check = self.transp_on.data.copy()
-        # self._transp_beg = tile_space_to_time(self.transp_beg, ntime)
-        # self._transp_end = tile_space_to_time(self.transp_end, ntime)
 
         # RUN: Process_flag == RUN
         # Set switch for active transpiration period
@@ -729,6 +859,10 @@ class PRMSAtmosphere(Process):
                     self.transp_on.data[tt, hh] = self.transp_on.data[
                         tt - 1, hh
                     ]
+                else:
+                    self.transp_on.data[tt, hh] = self._transp_on_chunk_start[
+                        hh
+                    ]
 
                 # check for month to turn check switch on or
                 # transpiration switch off
@@ -762,55 +896,49 @@ class PRMSAtmosphere(Process):
                         tmax_sum[hh] = 0.0
 
         # <<<
+        # the state at the end of the window
+        self._transp_on_chunk_end[:] = self.transp_on.data[ntime - 1, :]
+        self._transp_check_chunk_end[:] = transp_check
+        self._tmax_sum_chunk_end[:] = tmax_sum
         return
 
     def _write_netcdf_timeseries(self) -> None:
+        """Write the current window of time of all output variables."""
         if not self._netcdf_initialized:
             return
 
-        if self._netcdf_separate:
-            for var in self.variables:
-                if var not in self._netcdf_output_vars:
-                    continue
-                nc_path = self._netcdf_output_dir / f"{var}.nc"
-
+        if not len(self._netcdf):
+            if self._netcdf_separate:
+                for var in self._netcdf_output_vars:
+                    self._netcdf[var] = NetCdfWrite(
+                        self._netcdf_output_dir / f"{var}.nc",
+                        self._params.coords,
+                        [var],
+                        {var: self.meta[var]},
+                        **self._netcdf_write_kwargs(),
+                    )
+            else:
                 nc = NetCdfWrite(
-                    nc_path,
+                    self._netcdf_output_dir / f"{self.name}.nc",
                     self._params.coords,
-                    [var],
-                    {var: self.meta[var]},
-                )
-                nc.add_all_data(
-                    var,
-                    self[var].data,
-                    self._time,
+                    self._netcdf_output_vars,
+                    self.meta,
+                    **self._netcdf_write_kwargs(),
                 )
-                nc.close()
-                assert nc_path.exists()
-                print(f"Wrote file: {nc_path}")
-
-        else:
-            nc_path = self._netcdf_output_dir / f"{self.name}.nc"
-            nc = NetCdfWrite(
-                nc_path,
-                self._params.coords,
-                self._netcdf_output_vars,
-                self.meta,
+                for var in self._netcdf_output_vars:
+                    self._netcdf[var] = nc
+
+        for nc in {id(nc): nc for nc in self._netcdf.values()}.values():
+            nc.add_simulation_times(self._chunk_start, self._time)
+        for var in self._netcdf_output_vars:
+            self._netcdf[var].add_data_block(
+                var, self._chunk_start, self[var].data
             )
-            for var in self.variables:
-                if var not in self._netcdf_output_vars:
-                    continue
-                nc.add_all_data(
-                    var,
-                    self[var].data,
-                    self._time,
-                )
 
-            nc.close()
-            assert nc_path.exists()
-            print(f"Wrote file: {nc_path}")
+        self._chunk_written = True
+        if self._chunk_start + self._chunk_n_times == self.control.n_times:
+            self._finalize_netcdf()
 
-        self._finalize_netcdf()
         return
 
     def initialize_netcdf(
@@ -861,6 +989,7 @@ class PRMSAtmosphere(Process):
 
         self._netcdf_initialized = True
         self._netcdf_output_dir = pl.Path(output_dir)
+        self._netcdf_output_dir.mkdir(parents=True, exist_ok=True)
 
         if output_vars is None:
             self._netcdf_output_vars = self.variables
@@ -874,14 +1003,19 @@ class PRMSAtmosphere(Process):
         return
 
     def _finalize_netcdf(self) -> None:
+        for nc in {id(nc): nc for nc in self._netcdf.values()}.values():
+            nc_path = nc.dataset.filepath()
+            nc.close()
+            print(f"Wrote file: {nc_path}")
+        self._netcdf = {}
         self._netcdf_initialized = False
         return
 
     def output(self):
-        if self._netcdf_initialized:
+        if self._netcdf_initialized and not self._chunk_written:
             if self._verbose:
                 print(
-                    f"Writing FULL timeseries output for: {self.name}",
+                    f"Writing timeseries output for: {self.name}",
                     flush=True,
                 )
             self._write_netcdf_timeseries()
@@ -3,13 +3,16 @@ import warnings
 from typing import Tuple
 
 import numpy as np
+from numba import prange
 
 from pywatershed.base.process import Process
 from pywatershed.utils.netcdf_utils import NetCdfWrite
 
 from ..base.control import Control
-from ..constants import dnearzero, nan, one, zero
+from ..constants import dnearzero, fileish, nan, numba_num_threads, one, zero
 from ..parameters import Parameters
+from ..utils.cache_utils import ArrayCache
+from ..utils.numba_utils import njit_cached, print_jit_message
 from ..utils.prms5util import load_soltab_debug
 from .solar_constants import ndoy, pi, pi_12, r1, solar_declination, two_pi
 
@@ -47,13 +50,25 @@ class PRMSSolarGeometry(Process):
     Primary reference: Appendix E of Dingman, S. L., 1994, Physical Hydrology.
     Englewood Cliffs, NJ: Prentice Hall, 575 p.
 
+    When cache_dir is given, the calculated solar tables are stored in an
+    ArrayCache (see :mod:`pywatershed.utils.cache_utils`) keyed by a hash of
+    the HRU latitudes, slopes and aspects and loaded from it in subsequent
+    runs on the same HRUs.
+
     Args:
         control: a Control object
         discretization: a discretization of class Parameters
         parameters: a parameter object of class Parameters
+        calc_method: one of ["numba", "numpy"] (default "numba"). The numba
+            method computes the tables of each HRU in a compiled loop, in
+            parallel when NUMBA_NUM_THREADS > 1.
         verbose: Print extra information or not?
         from_prms_file: Load from a PRMS output file?
         from_nc_files_dir: [str, pl.Path] = None,
+        cache_dir: a directory caching the calculated variables, defaults
+            to the control option "cache_dir" or no caching if not set.
+        cache_max_bytes: the maximum size of the cache in cache_dir.
+            Defaults to the control option "cache_max_bytes" or 10 GB.
 
     """
 
@@ -62,9 +77,12 @@ class PRMSSolarGeometry(Process):
         control: Control,
         discretization: Parameters,
         parameters: Parameters,
+        calc_method: str = None,
         verbose: bool = False,
         from_prms_file: [str, pl.Path] = None,
         from_nc_files_dir: [str, pl.Path] = None,
+        cache_dir: fileish = None,
+        cache_max_bytes: int = None,
     ):
         # self._time is needed by Process for timeseries arrays
         # TODO: this is redundant because the parameter doy is set
@@ -94,6 +112,13 @@ class PRMSSolarGeometry(Process):
         self._netcdf_initialized = False
         self._calculated = False
 
+        if self._cache_dir is not None:
+            self._cache = ArrayCache(self._cache_dir, self._cache_max_bytes)
+        else:
+            self._cache = None
+
+        self._init_calc_method()
+
         return
 
     @staticmethod
@@ -135,29 +160,96 @@ class PRMSSolarGeometry(Process):
     def _set_initial_conditions(self):
         return
 
+    def _init_calc_method(self):
+        if self._calc_method is None:
+            self._calc_method = "numba"
+
+        if self._calc_method.lower() not in ["numpy", "numba"]:
+            msg = (
+                f"Invalid calc_method={self._calc_method} for {self.name}. "
+                f"Setting calc_method to 'numba' for {self.name}"
+            )
+            warnings.warn(msg, UserWarning)
+            self._calc_method = "numba"
+
+        if self._calc_method.lower() == "numba":
+            nb_parallel = (numba_num_threads is not None) and (
+                numba_num_threads > 1
+            )
+            print_jit_message(self.name, nb_parallel)
+
+            # no fastmath so the tables match the numpy calculation
+            self._compute_soltab_hrus = njit_cached(
+                self._compute_soltab_hrus, parallel=nb_parallel
+            )
+
+        return
+
+    def _soltab(
+        self, slopes: np.ndarray, aspects: np.ndarray, lats: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate the solar table with calc_method, see compute_soltab"""
+        if self._calc_method.lower() == "numpy":
+            return self.compute_soltab(
+                slopes, aspects, lats, self.compute_t, self.func3
+            )
+
+        solt, sunh, n_negative = self._compute_soltab_hrus(
+            np.asarray(slopes, dtype="float64"),
+            np.asarray(aspects, dtype="float64"),
+            np.asarray(lats, dtype="float64"),
+            solar_declination,
+            r1,
+        )
+        if n_negative:
+            warnings.warn(
+                f"{n_negative}/{solt.size} "
+                f"locations-times with negative "
+                f"potential solar radiation."
+            )
+        return solt, sunh
+
     def _calculate_all_time(self):
         self._hru_cossl = np.cos(np.arctan(self["hru_slope"]))
+        cache_key = None
+        if self._cache is not None:
+            # the tables only depend on the geometry of the HRUs
+            cache_key = self._cache.key(
+                self.name,
+                self._calc_method,
+                self["hru_lat"],
+                self["hru_slope"],
+                self["hru_aspect"],
+            )
+            cached = self._cache.load(cache_key)
+            if cached is not None:
+                for name in self.variables:
+                    self[name].data[:] = cached[name]
+                self._calculated = True
+                return
+
         # The potential radiation on horizontal surfce
-        self.soltab_horad_potsw.data[:], _ = self.compute_soltab(
+        self.soltab_horad_potsw.data[:], _ = self._soltab(
             np.zeros(self["nhru"]),
             np.zeros(self["nhru"]),
             self["hru_lat"],
-            self.compute_t,
-            self.func3,
         )
 
         # The potential radiaton given slope and aspect
         (
             self.soltab_potsw.data[:],
             self.soltab_sunhrs.data[:],
-        ) = self.compute_soltab(
+        ) = self._soltab(
             self["hru_slope"],
             self["hru_aspect"],
             self["hru_lat"],
-            self.compute_t,
-            self.func3,
         )
 
+        if cache_key is not None:
+            self._cache.save(
+                cache_key, {name: self[name].data for name in self.variables}
+            )
+
         self._calculated = True
         return
 
@@ -308,13 +400,161 @@ class PRMSSolarGeometry(Process):
         if len(wh_solt_lt_zero[0]):
             solt[wh_solt_lt_zero] = zero
             warnings.warn(
-                f"{len(wh_solt_lt_zero[0])}/{np.product(solt.shape)} "
+                f"{len(wh_solt_lt_zero[0])}/{solt.size} "
                 f"locations-times with negative "
                 f"potential solar radiation."
             )
 
         return solt, sunh
 
+    @staticmethod
+    def _compute_soltab_hrus(
+        slopes: np.ndarray,
+        aspects: np.ndarray,
+        lats: np.ndarray,
+        solar_declination: np.ndarray,
+        r1: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Calculate the solar table looping over HRUs and days
+
+        The loop version of compute_soltab (with compute_t and func3 inlined)
+        for compilation with numba. The HRUs are independent and are looped
+        with prange.
+
+        Returns: (solt, sunh, n_negative)
+          solt, sunh: as in compute_soltab, [ndoy, nhru]
+          n_negative: the number of negative potential solar radiation values
+            set to zero
+        """
+        nhru = len(slopes)
+        ndoy = len(solar_declination)
+        solt = np.zeros((ndoy, nhru))
+        sunh = np.zeros((ndoy, nhru))
+        n_negative = 0
+
+        for hh in prange(nhru):
+            # Slope derived quantities
+            sl = np.arctan(slopes[hh])
+            sl_sin = np.sin(sl)
+            sl_cos = np.cos(sl)
+
+            # Aspect derived quantities
+            aspect_rad = np.radians(aspects[hh])
+            aspect_cos = np.cos(aspect_rad)
+
+            # Latitude derived quantities
+            x0 = np.radians(lats[hh])
+            x0_sin = np.sin(x0)
+            x0_cos = np.cos(x0)
+
+            # x1 latitude of equivalent slope, Lee, 1963 equation 13
+            x1 = np.arcsin(sl_cos * x0_sin + sl_sin * x0_cos * aspect_cos)
+
+            # d1 is the denominator of Lee, 1963 equation 12
+            d1 = sl_cos * x0_cos - sl_sin * x0_sin * aspect_cos
+            if np.abs(d1) < dnearzero:
+                d1 = dnearzero
+
+            # x2 is the difference in longitude between the HRU and the
+            # equivalent horizontal surface, Lee, 1963 equation 12
+            x2 = np.arctan(sl_sin * np.sin(aspect_rad) / d1)
+            if d1 < zero:
+                x2 = x2 + pi
+
+            x1_sin = np.sin(x1)
+            x1_cos = np.cos(x1)
+            x0_tan = -1 * np.tan(x0)
+            x1_tan = -1 * np.tan(x1)
+
+            for dd in range(ndoy):
+                dec_tan = np.tan(solar_declination[dd])
+                dec_sin = np.sin(solar_declination[dd])
+                dec_cos = np.cos(solar_declination[dd])
+                r_pi_12 = r1[dd] * pi_12
+
+                # compute_t on the equivalent slope and horizontal surface
+                tx = x1_tan * dec_tan
+                if tx < -1 * one:
+                    tt = pi
+                elif tx > one:
+                    tt = zero
+                else:
+                    tt = np.arccos(tx)
+                t6 = (-1 * tt) - x2
+                t7 = tt - x2
+
+                tx = x0_tan * dec_tan
+                if tx < -1 * one:
+                    tt = pi
+                elif tx > one:
+                    tt = zero
+                else:
+                    tt = np.arccos(tx)
+                t0 = -1 * tt
+                t1 = tt
+
+                # see compute_soltab: t3 and t2 are the sunset and sunrise on
+                # the slope, limited by those on the horizontal surface.
+                if t7 > t1:
+                    t7 = t1
+                t3 = t7
+                if t6 < t0:
+                    t6 = t0
+                t2 = t6
+
+                t6 = t6 + two_pi
+                t7 = t7 - two_pi
+                if t3 < t2:
+                    t2 = zero
+                    t3 = zero
+
+                # func3
+                f3_32 = r_pi_12 * (
+                    dec_sin * x1_sin * (t3 - t2)
+                    + dec_cos * x1_cos * (np.sin(t3 + x2) - np.sin(t2 + x2))
+                )
+                solt_dd = f3_32
+                sunh_dd = (t3 - t2) * pi_12
+
+                if t7 > t0:
+                    solt_dd = f3_32 + r_pi_12 * (
+                        dec_sin * x1_sin * (t7 - t0)
+                        + dec_cos
+                        * x1_cos
+                        * (np.sin(t7 + x2) - np.sin(t0 + x2))
+                    )
+                    sunh_dd = (t3 - t2 + t7 - t0) * pi_12
+
+                if t6 < t1:
+                    solt_dd = f3_32 + r_pi_12 * (
+                        dec_sin * x1_sin * (t1 - t6)
+                        + dec_cos
+                        * x1_cos
+                        * (np.sin(t1 + x2) - np.sin(t6 + x2))
+                    )
+                    sunh_dd = (t3 - t2 + t1 - t6) * pi_12
+
+                if np.abs(sl) < dnearzero:
+                    solt_dd = r_pi_12 * (
+                        dec_sin * x0_sin * (t1 - t0)
+                        + dec_cos
+                        * x0_cos
+                        * (np.sin(t1 + zero) - np.sin(t0 + zero))
+                    )
+                    sunh_dd = (t1 - t0) * pi_12
+
+                if sunh_dd < dnearzero:
+                    sunh_dd = zero
+
+                if solt_dd < zero:
+                    solt_dd = zero
+                    n_negative += 1
+
+                solt[dd, hh] = solt_dd
+                sunh[dd, hh] = sunh_dd
+
+        return solt, sunh, n_negative
+
     @staticmethod
     def compute_t(
         lats: np.ndarray, solar_declination: np.ndarray
@@ -422,6 +662,7 @@ class PRMSSolarGeometry(Process):
                     self._params.coords,
                     [var],
                     {var: self.meta[var]},
+                    **self._netcdf_write_kwargs(),
                 )
                 nc.add_all_data(
                     var,
@@ -440,6 +681,7 @@ class PRMSSolarGeometry(Process):
                 self._params.coords,
                 self._netcdf_output_vars,
                 self.meta,
+                **self._netcdf_write_kwargs(),
             )
             for var in self.variables:
                 if var not in self._netcdf_output_vars:
@@ -1,13 +1,21 @@
-from .accessor import Accessor
-from .adapter import Adapter
-from .budget import Budget
-from .conservative_process import ConservativeProcess
-from .control import Control
-from .data_model import DatasetDict
-from .model import Model
-from .parameters import Parameters
-from .process import Process
-from .timeseries import TimeseriesArray
+from ..utils.lazy_loader import lazy_attributes
+
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "Accessor": ".accessor",
+    "Adapter": ".adapter",
+    "Budget": ".budget",
+    "ConservativeProcess": ".conservative_process",
+    "Control": ".control",
+    "DatasetDict": ".data_model",
+    "Model": ".model",
+    "ModelEnsemble": ".model_ensemble",
+    "Parameters": ".parameters",
+    "Process": ".process",
+    "TimeseriesArray": ".timeseries",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
 
 __all__ = (
     "Accessor",
@@ -17,6 +25,7 @@ __all__ = (
     "Control",
     "DatasetDict",
     "Model",
+    "ModelEnsemble",
     "Parameters",
     "Process",
     "TimeseriesArray",
@@ -13,6 +13,7 @@ import numpy as np
 from ..base.control import Control
 from ..base.timeseries import TimeseriesArray
 from ..constants import fileish
+from ..utils.memmap_utils import read_npy_header
 from ..utils.netcdf_utils import NetCdfRead
 
 
@@ -40,6 +41,14 @@ class Adapter:
         """Current time of the Adapter instance."""
         return self._current_value
 
+    def data_window(self, start: int, end: int) -> np.ndarray:
+        """The data for the time steps start to end (exclusive).
+
+        Time steps are relative to the first time of the data property.
+        Subclasses reading from file override this to read only the window.
+        """
+        return self.data[start:end]
+
 
 class AdapterNetcdf(Adapter):
     """Adapter subclass for a NetCDF file
@@ -53,7 +62,11 @@ class AdapterNetcdf(Adapter):
         dim_sizes: a tuple of dimension sizes
         type: a variable dtype
         control: a Control object
-        load_n_time_batches: number of times to read from file.
+        load_n_time_batches: number of times to read from file. Defaults to
+            the control option "load_n_time_batches" or 1 if not set.
+        prefetch_n_time_batches: number of time batches to read ahead on a
+            background thread, see NetCdfRead. Defaults to the control option
+            "prefetch_n_time_batches" or 0 if not set.
 
     """
 
@@ -62,7 +75,8 @@ class AdapterNetcdf(Adapter):
         fname: fileish,
         variable: str,
         control: Control,
-        load_n_time_batches: int = 1,
+        load_n_time_batches: int = None,
+        prefetch_n_time_batches: int = None,
     ) -> None:
         super().__init__(variable)
         self.name = "AdapterNetcdf"
@@ -72,11 +86,21 @@ class AdapterNetcdf(Adapter):
         self._start_time = self.control.start_time
         self._end_time = self.control.end_time
 
+        if load_n_time_batches is None:
+            load_n_time_batches = self.control.options.get(
+                "load_n_time_batches", 1
+            )
+        if prefetch_n_time_batches is None:
+            prefetch_n_time_batches = self.control.options.get(
+                "prefetch_n_time_batches", 0
+            )
+
         self._nc_read = NetCdfRead(
             fname,
             start_time=self._start_time,
             end_time=self._end_time,
             load_n_time_batches=load_n_time_batches,
+            prefetch_n_time_batches=prefetch_n_time_batches,
         )
 
         # would like to make this a check if dim_sizes and type are available
@@ -106,6 +130,10 @@ class AdapterNetcdf(Adapter):
         # TODO JLM: seems like we'd want to cache this data if we invoke once
         return self._nc_read.all_time(self._variable).data
 
+    def data_window(self, start: int, end: int) -> np.ndarray:
+        """Read the data for the time steps start to end (exclusive)."""
+        return self._nc_read.get_data_window(self._variable, start, end).data
+
 
 class AdapterOnedarray(Adapter):
     """Adapter subclass for an invariant 1-D numpy.array
@@ -132,6 +160,140 @@ class AdapterOnedarray(Adapter):
         return None
 
 
+class AdapterMemmap(Adapter):
+    """Adapter subclass for a memory-mapped .npy input file
+
+    The .npy files and their headers are written from NetCDF input files by
+    :func:`pywatershed.utils.memmap_utils.netcdf_to_npy`. The data are
+    memory mapped and not decompressed, each advance copies the current time
+    from the map (and so from the operating system's page cache for
+    repeated runs on the same inputs).
+
+    Args:
+        fname: filename of the .npy file as string or Path
+        variable: variable name string
+        control: a Control object
+    """
+
+    def __init__(
+        self,
+        fname: fileish,
+        variable: str,
+        control: Control,
+    ) -> None:
+        super().__init__(variable)
+        self.name = "AdapterMemmap"
+
+        self._fname = fname
+        self.control = control
+
+        header = read_npy_header(fname)
+        if header["variable"] != variable:
+            msg = (
+                f"File {fname} contains variable {header['variable']} not "
+                f"{variable}"
+            )
+            raise ValueError(msg)
+
+        self._data = np.load(fname, mmap_mode="r")
+        if "time" in header.keys():
+            self._doy = False
+            self.time = header["time"]
+            start_ind = np.where(self.time == self.control.start_time)[0]
+            end_ind = np.where(self.time == self.control.end_time)[0]
+            if not len(start_ind) or not len(end_ind):
+                msg = f"Control times are not in the times of file {fname}"
+                raise ValueError(msg)
+            self._start_index = start_ind[0]
+            self._end_index = end_ind[0]
+            self.time = self.time[self._start_index : (self._end_index + 1)]
+        else:
+            self._doy = True
+            self.time = header["doy"]
+            self._start_index = 0
+            self._end_index = self.time.shape[0] - 1
+
+        self._current_value = np.full(
+            self._data.shape[1:], np.nan, self._data.dtype
+        )
+        return
+
+    def advance(self) -> None:
+        if self._doy:
+            time_ind = self.control.current_doy - 1
+        else:
+            time_ind = self._start_index + self.control.itime_step
+        self._current_value[:] = self._data[time_ind]
+        return None
+
+    @property
+    def data(self) -> np.array:
+        """Return a read-only view of the data for all time."""
+        return self._data[self._start_index : (self._end_index + 1)]
+
+
+class AdapterEnsemble(Adapter):
+    """Adapter subclass repeating the data of an adapter for each member
+
+    For Processes with parameters with an ensemble dimension (see
+    :meth:`Parameters.flatten_ensemble`), inputs common to all members (e.g.
+    forcings from file) are repeated for each member along the last (spatial)
+    dimension.
+
+    Args:
+        adapter: the Adapter whose data are repeated
+        n_ensemble: the number of members
+    """
+
+    def __init__(
+        self,
+        adapter: Adapter,
+        n_ensemble: int,
+    ) -> None:
+        super().__init__(adapter._variable)
+        self.name = "AdapterEnsemble"
+        self._adapter = adapter
+        self._n_ensemble = n_ensemble
+        # the source file, as for AdapterNetcdf and AdapterMemmap
+        self._fname = getattr(adapter, "_fname", None)
+        current = adapter.current
+        self._current_value = np.full(
+            current.shape[:-1] + (n_ensemble * current.shape[-1],),
+            np.nan,
+            current.dtype,
+        )
+        self._set_current()
+        return
+
+    def _set_current(self) -> None:
+        member_view = self._current_value.reshape(
+            self._current_value.shape[:-1] + (self._n_ensemble, -1)
+        )
+        member_view[:] = self._adapter.current[..., np.newaxis, :]
+        return
+
+    def advance(self, *args) -> None:
+        self._adapter.advance(*args)
+        self._set_current()
+        return None
+
+    @property
+    def time(self) -> np.ndarray:
+        """The times of the adapted data."""
+        return self._adapter.time
+
+    @property
+    def data(self) -> np.array:
+        """Return the data for all time, repeated for each member."""
+        data = self._adapter.data
+        return np.concatenate([data] * self._n_ensemble, axis=-1)
+
+    def data_window(self, start: int, end: int) -> np.ndarray:
+        """The data for a window of time, repeated for each member."""
+        data = self._adapter.data_window(start, end)
+        return np.concatenate([data] * self._n_ensemble, axis=-1)
+
+
 adaptable = Union[str, pl.Path, np.ndarray, Adapter]
 
 
@@ -139,7 +301,8 @@ def adapter_factory(
     var: adaptable,
     variable_name: str = None,
     control: Control = None,
-    load_n_time_batches: int = 1,
+    load_n_time_batches: int = None,
+    prefetch_n_time_batches: int = None,
 ) -> "Adapter":
     """A function to return the appropriate subclass of Adapter
 
@@ -150,6 +313,7 @@ def adapter_factory(
        variable_dim_sizes: for an AdapterNetcdf
        variable_type: for an AdapterNetcdf
        load_n_time_batches: for an AdapterNetcdf
+       prefetch_n_time_batches: for an AdapterNetcdf
 
     """
     if isinstance(var, Adapter):
@@ -157,14 +321,18 @@ def adapter_factory(
         return var
 
     elif isinstance(var, (str, pl.Path)):
-        # Paths and strings are considered paths to netcdf files
+        # Paths and strings are considered paths to netcdf or npy files
         if pl.Path(var).suffix == ".nc":
             return AdapterNetcdf(
                 var,
                 variable=variable_name,
                 control=control,
                 load_n_time_batches=load_n_time_batches,
+                prefetch_n_time_batches=prefetch_n_time_batches,
             )
+        elif pl.Path(var).suffix == ".npy":
+            # Uncompressed .npy files with headers are memory mapped
+            return AdapterMemmap(var, variable=variable_name, control=control)
 
     elif isinstance(var, np.ndarray) and len(var.shape) == 1:
         # Adapt 1-D np.ndarrays
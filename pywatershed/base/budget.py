@@ -10,7 +10,7 @@ from pywatershed.base.control import Control
 
 from ..constants import zero
 from ..utils.formatting import pretty_print
-from ..utils.netcdf_utils import NetCdfWrite
+from ..utils.netcdf_utils import NetCdfWrite, nc4_lock
 from .accessor import Accessor
 from .parameters import Parameters
 
@@ -738,6 +738,8 @@ class Budget(Accessor):
             self._netcdf_output_var_dict,
             meta,
             global_attrs=global_attrs,
+            # budget output is written to the dataset each time step
+            chunk_sizes={"time": 1},
         )
 
         # todo jlm: put terms in to metadata
@@ -751,24 +753,31 @@ class Budget(Accessor):
 
         """
         if self._output_netcdf:
-            self._netcdf.time[self.control.itime_step] = nc4.date2num(
-                self.control.current_datetime, self._netcdf.time.units
-            )
-            for nc_group, group_vars in self._netcdf_output_var_dict.items():
-                for nc_var in group_vars:
-                    var_self_name = nc_var
-
-                    if nc_group is None:
-                        var_path = nc_var
-                        self._netcdf.dataset[var_path][
-                            self.control.itime_step, :
-                        ] = self[var_self_name]
-
-                    else:
-                        var_path = f"{nc_group}/{nc_var}"
-                        self._netcdf.dataset[var_path][
-                            self.control.itime_step, :
-                        ] = self[nc_group][var_self_name]
+            # serialize with any asynchronous output writers
+            with nc4_lock:
+                self._write_netcdf_time_step()
+
+        return
+
+    def _write_netcdf_time_step(self) -> None:
+        self._netcdf.time[self.control.itime_step] = nc4.date2num(
+            self.control.current_datetime, self._netcdf.time.units
+        )
+        for nc_group, group_vars in self._netcdf_output_var_dict.items():
+            for nc_var in group_vars:
+                var_self_name = nc_var
+
+                if nc_group is None:
+                    var_path = nc_var
+                    self._netcdf.dataset[var_path][
+                        self.control.itime_step, :
+                    ] = self[var_self_name]
+
+                else:
+                    var_path = f"{nc_group}/{nc_var}"
+                    self._netcdf.dataset[var_path][
+                        self.control.itime_step, :
+                    ] = self[nc_group][var_self_name]
 
         return
 
@@ -0,0 +1,212 @@
+"""Capture and restore the in-memory state of pywatershed objects.
+
+State is collected by walking the attributes of stateful objects
+(Processes, Budgets, Adapters, FlowNodes, ...) and the dicts and lists they
+hold, recording numpy arrays and scalars under "/"-separated key paths. State
+is restored by walking the same paths on an equivalently constructed object.
+Arrays are restored in place so that references shared between objects (e.g.
+inputs connected to the variables of other Processes) are preserved.
+"""
+
+import numpy as np
+
+from ..constants import fileish
+from .accessor import Accessor
+
+_sep = "/"
+
+# Attributes that are not state: references to shared or static objects,
+# data which are read or computed on initialization, and the timestep state
+# of Processes, which refers to their other attributes.
+_skip_attrs_all = (
+    "control",
+    "meta",
+    "name",
+    "_params",
+    "parameters",
+    "_timestep_state",
+)
+_skip_attrs_class_names = {
+    # the full time series are recomputed on the first advance
+    "PRMSAtmosphere": ("_calculated",),
+    "PRMSSolarGeometry": ("_calculated",),
+    "TimeseriesArray": ("data", "time"),
+    "AdapterNetcdf": ("time",),
+    "AdapterMemmap": ("_data", "time"),
+    "NetCdfRead": (
+        "dataset",
+        "_data_loaded",
+        "_data_loaded_batch",
+        "_time",
+        "_doy",
+        "_spatial_ids",
+    ),
+}
+
+_scalar_types = (bool, int, float, np.number, np.bool_, np.datetime64)
+
+
+def _state_classes() -> tuple:
+    # avoid circular imports
+    from ..utils.netcdf_utils import NetCdfRead
+    from .adapter import Adapter
+    from .budget import Budget
+    from .flow_graph import FlowNode, FlowNodeBatch
+    from .process import Process
+    from .timeseries import TimeseriesArray
+
+    return (
+        Process,
+        Budget,
+        Adapter,
+        NetCdfRead,
+        TimeseriesArray,
+        FlowNode,
+        FlowNodeBatch,
+    )
+
+
+def _skip_attrs(obj) -> set:
+    skip = set(_skip_attrs_all)
+    for cls in type(obj).__mro__:
+        skip.update(_skip_attrs_class_names.get(cls.__name__, ()))
+    if hasattr(obj, "get_parameters"):
+        try:
+            skip.update(obj.get_parameters())
+        except Exception:
+            pass
+    return skip
+
+
+def _children(obj, state_classes: tuple):
+    """Iterate (key, child) pairs of an object, dict, list or tuple."""
+    if isinstance(obj, dict):
+        if all(isinstance(kk, str) for kk in obj.keys()):
+            yield from obj.items()
+    elif isinstance(obj, (list, tuple)):
+        yield from ((str(ii), vv) for ii, vv in enumerate(obj))
+    elif isinstance(obj, state_classes):
+        skip = _skip_attrs(obj)
+        for kk, vv in vars(obj).items():
+            if kk not in skip and not kk.startswith("__"):
+                yield kk, vv
+    return
+
+
+def get_state(obj, prefix: str = "") -> dict:
+    """Get the state of an object.
+
+    Args:
+        obj: a stateful object (e.g. a Process), or a dict or list of them.
+        prefix: a prefix for all keys in the returned dictionary.
+
+    Returns:
+        A flat dictionary of copied numpy arrays and 0-d arrays (for
+        scalars) keyed by "/"-separated attribute paths.
+    """
+    state = {}
+    _get_state(obj, prefix, state, set(), _state_classes())
+    return state
+
+
+def _get_state(obj, prefix, state, seen, state_classes) -> None:
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    for key, val in _children(obj, state_classes):
+        path = f"{prefix}{_sep}{key}" if prefix else key
+        if isinstance(val, np.ndarray):
+            if val.dtype.hasobject:
+                continue
+            state[path] = np.array(val, copy=True)
+        elif isinstance(val, _scalar_types):
+            state[path] = np.array(val)
+        elif isinstance(val, (dict, list, tuple) + state_classes):
+            _get_state(val, path, state, seen, state_classes)
+
+    return
+
+
+def set_state(obj, state: dict, prefix: str = "") -> None:
+    """Restore the state of an object from get_state().
+
+    Args:
+        obj: the object passed to get_state() or an equivalently
+            constructed one.
+        state: a dictionary returned by get_state().
+        prefix: only keys in state starting with this prefix are restored,
+            and the prefix is removed before traversing obj.
+    """
+    for path, value in state.items():
+        if prefix:
+            if not path.startswith(prefix + _sep):
+                continue
+            path = path[len(prefix) + len(_sep) :]
+        _set_path(obj, path.split(_sep), value)
+
+    return
+
+
+def _get_child(parent, key: str):
+    if isinstance(parent, dict):
+        return parent.get(key, None)
+    elif isinstance(parent, (list, tuple)):
+        return parent[int(key)]
+    else:
+        return getattr(parent, key, None)
+
+
+def _set_child(parent, key: str, value) -> None:
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent[int(key)] = value
+    elif isinstance(parent, tuple):
+        raise TypeError("Can not set an item of a tuple")
+    elif isinstance(parent, Accessor):
+        parent[key] = value
+    else:
+        setattr(parent, key, value)
+    return
+
+
+def _set_path(obj, keys: list, value: np.ndarray) -> None:
+    parent = obj
+    for key in keys[:-1]:
+        child = _get_child(parent, key)
+        if child is None:
+            # e.g. dicts of arrays which are None until the first timestep
+            child = {}
+            _set_child(parent, key, child)
+        parent = child
+
+    key = keys[-1]
+    current = _get_child(parent, key)
+    if value.ndim == 0 and not isinstance(current, np.ndarray):
+        scalar = value[()]
+        if isinstance(current, (bool, int, float)):
+            scalar = type(current)(scalar)
+        _set_child(parent, key, scalar)
+    elif (
+        isinstance(current, np.ndarray)
+        and current.shape == value.shape
+        and current.flags.writeable
+    ):
+        current[...] = value
+    else:
+        _set_child(parent, key, np.array(value, copy=True))
+
+    return
+
+
+def save_state(state: dict, file: fileish) -> None:
+    """Save a state dictionary to an uncompressed numpy .npz file."""
+    with open(file, "wb") as file_stream:
+        np.savez(file_stream, **state)
+    return
+
+
+def load_state(file: fileish) -> dict:
+    """Load a state dictionary saved by save_state()."""
+    with np.load(file, allow_pickle=False) as data:
+        return {kk: data[kk] for kk in data.files}
@@ -88,7 +88,11 @@ class ConservativeProcess(Process):
     def output(self) -> None:
         super().output()
         if self.budget is not None:
-            self.budget.output()
+            if self._timer is None:
+                self.budget.output()
+            else:
+                with self._timer.time(self.name, "budget_output"):
+                    self.budget.output()
 
         return
 
@@ -204,8 +208,13 @@ class ConservativeProcess(Process):
 
         # move to a timestep finalization method at some future date.
         if self.budget is not None:
-            self.budget.advance()
-            self.budget.calculate()
+            if self._timer is None:
+                self.budget.advance()
+                self.budget.calculate()
+            else:
+                with self._timer.time(self.name, "budget_calculate"):
+                    self.budget.advance()
+                    self.budget.calculate()
 
         return
 
@@ -12,6 +12,7 @@ from ..constants import fileish
 from ..utils import ControlVariables
 from ..utils.path import assert_exists, dict_pl_to_str, path_rel_to_yaml
 from ..utils.time_utils import (
+    calendar_table,
     datetime_dowy,
     datetime_doy,
     datetime_epiweek,
@@ -29,18 +30,30 @@ from .accessor import Accessor
 # docstring needs updated whenever any of these change.
 pws_control_options_avail = [
     "budget_type",
+    "cache_dir",
+    "cache_max_bytes",
     "calc_method",
     "dprst_flag",
+    "fuse_n_time_steps",
     # "restart",
     "input_dir",
-    # "load_n_time_batches",
+    "input_file_suffix",
+    "load_n_time_batches",
+    "n_time_chunk",
+    "netcdf_output_async",
+    "netcdf_output_chunks",
+    "netcdf_output_complevel",
     "netcdf_output_dir",
     "netcdf_output_var_names",
     "netcdf_output_separate_files",
+    "netcdf_output_shuffle",
     "parameter_file",
+    "prefetch_n_time_batches",
     "start_time",
     "streamflow_module",
     "time_step_units",
+    "timing",
+    "timing_file",
     "verbosity",
 ]
 
@@ -89,19 +102,55 @@ class Control(Accessor):
 
     Available pywatershed options:
       * budget_type: one of [None, "warn", "error"]
+      * cache_dir: str or pathlib.Path directory in which PRMSAtmosphere and
+        PRMSSolarGeometry cache their calculated variables for subsequent
+        runs with the same parameters, inputs and times (default no cache)
+      * cache_max_bytes: int maximum total size of the cache in cache_dir,
+        least recently used entries are removed (default 10 GB)
       * calc_method: one of ["numpy", "numba", "fortran"]
       * dprst_flag: boolean if depression storage is included (true) or not.
+      * fuse_n_time_steps: int number of time steps for which Model runs its
+        consecutive numba Processes with timestep functions (see Process) in
+        one compiled call (default None, one Process time step at a time).
+        The fused Processes are compiled together once per Python session,
+        which takes much longer than compiling them separately.
       * input_dir: str or pathlib.path directory to search for input data
+      * input_file_suffix: str suffix of the input files in input_dir, ".nc"
+        (default) for NetCDF or ".npy" for memory-mapped files written by
+        pywatershed.utils.memmap_utils.netcdf_to_npy()
+      * load_n_time_batches: int number of batches (time partitions) in
+        which input files are read in to memory (default 1, all times at
+        once)
+      * n_time_chunk: int number of times PRMSAtmosphere calculates and
+        holds in memory at once (default all times)
+      * netcdf_output_async: bool if NetCDF output is written by a background
+        thread from a bounded buffer of copied values (default False). Output
+        files are complete after finalize().
+      * netcdf_output_chunks: dict of NetCDF output chunk sizes by dimension
+        name, e.g. {"time": 30, "nhm_id": 0} where 0 is the full dimension.
+        Output is buffered in memory for one time chunk. Unspecified
+        dimensions use defaults based on the output size.
+      * netcdf_output_complevel: int NetCDF output compression level, 0 for
+        no compression (default 4)
       * netcdf_output_dir: str or pathlib.Path directory for output
       * netcdf_output_var_names: a list of variable names to output
       * netcdf_output_separate_files: bool if output is grouped by Process or
         if each variable is written to an individual file
+      * netcdf_output_shuffle: bool if the shuffle filter is applied to NetCDF
+        output (default True)
       * parameter_file: the name of a parameter file to use
+      * prefetch_n_time_batches: int number of input file time batches read
+        ahead on a background thread when load_n_time_batches > 1 (default 0)
       * streamflow_module: the selected streamflow module in PRMS.
       * start_time: np.datetime64
       * end_time: np.datetime64
       * time_step_units: str containing single character code for
         np.timedelta64
+      * timing: bool if Model records wall times and call counts of the
+        phases of its Processes, their input adapters, and input file reads
+        in Model.timer (default False)
+      * timing_file: str or pathlib.Path of a JSON file to which the timing
+        records are written by Model.finalize(). Implies timing.
       * verbosity: 0-10
 
     Available PRMS legacy options:
@@ -200,6 +249,7 @@ class Control(Accessor):
         self._current_time = self._init_time
         self._previous_time = None
         self._itime_step = -1
+        self._set_calendar()
 
         self._only_warn_invalid = only_warn_invalid
 
@@ -347,6 +397,17 @@ class Control(Accessor):
         result.meta = meta
         return result
 
+    def __getstate__(self):
+        # the meta module can not be pickled, e.g. to send to other processes
+        state = self.__dict__.copy()
+        del state["meta"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__["meta"] = meta
+        return
+
     @property
     def current_time(self) -> np.datetime64:
         """Get the current time."""
@@ -357,30 +418,56 @@ class Control(Accessor):
         """Get the current time as a datetime.datetime object"""
         return self._current_time.astype(datetime.datetime)
 
+    def _set_calendar(self) -> None:
+        # the calendar of the times taken by advance(), the current times
+        # of itime_step in [0, n_times-1]
+        times = (
+            self._init_time + np.arange(1, self._n_times + 1) * self._time_step
+        )
+        self._calendar = calendar_table(times)
+        self._calendar["time"] = times
+        return None
+
+    @property
+    def calendar(self) -> dict:
+        """The calendar of all the times of the simulation.
+
+        A dictionary of arrays of length n_times: "time" and the "year",
+        "month", "day" of month, "doy", "dowy" and "epiweek" of each time.
+        Index with itime_step for the values of the current_* properties.
+        """
+        return self._calendar
+
+    def _current_calendar(self, key: str, datetime_fn) -> int:
+        if 0 <= self._itime_step < self._n_times:
+            return self._calendar[key][self._itime_step]
+        # e.g. at the init_time
+        return datetime_fn(self._current_time)
+
     @property
     def current_year(self) -> int:
         """Get the current year."""
-        return datetime_year(self._current_time)
+        return self._current_calendar("year", datetime_year)
 
     @property
     def current_month(self) -> int:
         """Get the current month in 1-12 (unless zero based)."""
-        return datetime_month(self._current_time)
+        return self._current_calendar("month", datetime_month)
 
     @property
     def current_doy(self) -> int:
         """Get the current day of year in 1-366 (unless zero based)."""
-        return datetime_doy(self._current_time)
+        return self._current_calendar("doy", datetime_doy)
 
     @property
     def current_dowy(self) -> int:
         """Get the current day of water year in 1-366 (unless zero-based)."""
-        return datetime_dowy(self._current_time)
+        return self._current_calendar("dowy", datetime_dowy)
 
     @property
     def current_epiweek(self) -> int:
         """Get the current epiweek [1, 53]."""
-        return datetime_epiweek(self._current_time)
+        return self._current_calendar("epiweek", datetime_epiweek)
 
     @property
     def previous_time(self) -> np.datetime64:
@@ -460,6 +547,7 @@ class Control(Accessor):
         self._n_times = (
             int((self._end_time - self._start_time) / self._time_step) + 1
         )
+        self._set_calendar()
         return None
 
     def edit_n_time_steps(self, new_n_time_steps: int) -> None:
@@ -472,6 +560,7 @@ class Control(Accessor):
         self._end_time = (
             self._start_time + (self._n_times - 1) * self._time_step
         )
+        self._set_calendar()
         return None
 
     def __str__(self):
@@ -1,6 +1,8 @@
 from typing import Literal
+from warnings import warn
 
 import networkx as nx
+import numba as nb
 import numpy as np
 
 from pywatershed.base.accessor import Accessor
@@ -84,6 +86,120 @@ class FlowNode(Accessor):
         raise Exception("This must be overridden")
 
 
+class FlowNodeBatch(Accessor):
+    """The FlowNodeBatch base class.
+
+    A FlowNodeBatch represents a collection of :class:`FlowNode`\ s of a
+    single kind whose data are stored contiguously in arrays indexed by node
+    (struct-of-arrays). It is an optional alternative to instantiating
+    individual FlowNodes which avoids creating a Python object per node and
+    allows :class:`FlowGraph` to calculate subtimesteps of many nodes in a
+    single compiled (numba) kernel.
+
+    A FlowNodeBatch provides the same methods as a FlowNode but these act on
+    all nodes in the batch at once and its properties return arrays. The
+    subtimestep calculation is provided by the numba-jitted function given by
+    the `calculate_subtimestep_numba` property and, for non-compiled
+    calculation, by the `calculate_subtimestep` method on a single node.
+
+    See :class:`FlowGraph` for related examples and discussion.
+    """
+
+    def __init__(self, control: Control, indices: np.ndarray):
+        """Initialize the FlowNodeBatch.
+
+        Args:
+          control: A Control object.
+          indices: The indices in the discretization and parameter data of
+            the FlowNodeMaker for the nodes in the batch.
+        """
+        raise Exception("This must be overridden")
+
+    def prepare_timestep(self):
+        "Prepare the batch for subtimestep calculations."
+        raise Exception("This must be overridden")
+
+    def calculate_subtimestep(
+        self,
+        isubstep: int,
+        index: int,
+        inflow_upstream: float,
+        inflow_lateral: float,
+    ) -> float:
+        """Calculate the subtimestep of a single node in the batch.
+
+        Args:
+          isubstep: Zero-based integer indicating the index of the current
+            substep.
+          index: The index of the node in the batch.
+          inflow_upstream: The in-channel flows to the node on the current
+            substep.
+          inflow_lateral: The later flows to the node on the current
+            substep.
+
+        Returns:
+          The outflow of the node on the subtimestep.
+        """
+        raise Exception("This must be overridden")
+
+    @property
+    def calculate_subtimestep_numba(self) -> callable:
+        """The numba-jitted function calculating a subtimestep of one node.
+
+        The function has the signature
+
+        `(isubstep, index, inflow_upstream, inflow_lateral, state) -> outflow`
+
+        where the arguments are
+
+        * isubstep: Zero-based integer indicating the index of the current
+          substep.
+        * index: The index of the node in the batch.
+        * inflow_upstream: The in-channel flows to the node on the current
+          substep.
+        * inflow_lateral: The later flows to the node on the current substep.
+        * state: The tuple of arrays given by the state property, updated in
+          place.
+
+        and the returned value is the outflow of the node on the subtimestep.
+        When None, the batch is calculated using calculate_subtimestep.
+        """
+        raise Exception("This must be overridden")
+
+    def advance(self):
+        "Advance the batch to the next timestep."
+        raise Exception("This must be overridden")
+
+    def finalize_timestep(self):
+        "Finalize the current timestep for the batch."
+        raise Exception("This must be overridden")
+
+    @property
+    def state(self) -> tuple:
+        """The tuple of arrays passed to calculate_subtimestep_numba."""
+        raise Exception("This must be overridden")
+
+    @property
+    def outflow(self):
+        "The average outflows of the nodes over the current timestep."
+        raise Exception("This must be overridden")
+
+    @property
+    def storage_change(self):
+        "The storage changes of the nodes at the current subtimestep."
+        raise Exception("This must be overridden")
+
+    @property
+    def storage(self):
+        "The storages of the nodes at the current subtimestep."
+        raise Exception("This must be overridden")
+
+    @property
+    def sink_source(self):
+        "The sink or source amounts of the nodes at the current subtimestep."
+        raise Exception("This must be overridden")
+
+
 class FlowNodeMaker(Accessor):
     """FlowNodeMaker instantiates FlowNodes with their data.
 
@@ -114,6 +230,22 @@ class FlowNodeMaker(Accessor):
         """
         raise Exception("This must be overridden")
 
+    def get_node_batch(
+        self, control: Control, indices: np.ndarray
+    ) -> FlowNodeBatch:
+        """Optionally, instantiate a FlowNodeBatch at the given indices.
+
+        FlowNodeMakers which do not support batches of nodes return None
+        (the default) and their nodes are instantiated individually with
+        get_node().
+
+        Args:
+          control: A Control object.
+          indices: The indices in the discretization and parameter data to
+            use when instantiating the FlowNodeBatch.
+        """
+        return None
+
 
 class FlowGraph(ConservativeProcess):
     """FlowGraph manages and computes FlowNodes given by FlowNodeMakers.
@@ -155,6 +287,15 @@ class FlowGraph(ConservativeProcess):
     FlowGraph recieves instantiated :class:`FlowNodeMaker`\ s and calls them,
     in turn, to instantiate the :class:`FlowNode`\ s in the FlowGraph.
 
+    FlowGraph first asks each :class:`FlowNodeMaker` for a
+    :class:`FlowNodeBatch` of all its nodes, which keeps the data of the nodes
+    in contiguous arrays. With calc_method="numba" (the default), the
+    subtimesteps of consecutive nodes (in the execution order) belonging
+    to a batch are calculated in a single compiled kernel instead of
+    looping over the nodes in Python. FlowNodeMakers which do not
+    provide batches fall back to individual :class:`FlowNode`\ s which may be
+    mixed arbitrarily with batched nodes in the graph.
+
     Note that users generally do not create types of :class:`FlowNode`\ s or
     :class:`FlowNodeMaker`\ s themselves, this is typically the work of code
     developers. But users pass parameters, an inflow Adapter, and instantiated
@@ -320,6 +461,7 @@ class FlowGraph(ConservativeProcess):
         inflows: adaptable,
         node_maker_dict: dict,
         budget_type: Literal["defer", None, "warn", "error"] = "defer",
+        calc_method: Literal["numba", "numpy"] = None,
         verbose: bool = None,
     ):
         """Initialize a FlowGraph.
@@ -340,6 +482,9 @@ class FlowGraph(ConservativeProcess):
               control.options["budget_type"] when
               available. When control.options["budget_type"] is not avaiable,
               budget_type is set to "warn".
+            calc_method: one of ["numba", "numpy"]. None defaults to "numba"
+              which calculates nodes supplied as FlowNodeBatches in compiled
+              kernels. "numpy" loops over all nodes in python.
 
         The `parameters` argument is a :class:`Parameters` object which
         contains the following data:
@@ -371,6 +516,7 @@ class FlowGraph(ConservativeProcess):
         for fnm in self._node_maker_dict.values():
             assert isinstance(fnm, FlowNodeMaker)
 
+        self._init_calc_method()
         self._init_graph()
 
         # If/when FlowGraph handles nodes which dont tautologically balance
@@ -480,30 +626,113 @@ class FlowGraph(ConservativeProcess):
 
         # any performance for doing a hash table up front?
         # a hash {to_seg: [from_seg_0, ..., from_seg_n]}
+        self._to_graph_index = np.array(
+            params["to_graph_index"], dtype="int64"
+        )
+
+        node_maker_name = np.array(params["node_maker_name"])
+        node_maker_index = np.array(params["node_maker_index"], dtype="int64")
 
-        # instatiate the nodes
-        self._nodes = []
+        # instantiate batches of nodes from the makers which provide them
+        self._batches = {}
+        self._batch_name = np.full(self.nnodes, None, dtype=object)
+        self._batch_index = np.full(self.nnodes, -1, dtype="int64")
+        for maker_name, maker in self._node_maker_dict.items():
+            wh_maker = np.where(node_maker_name == maker_name)[0]
+            if not len(wh_maker):
+                continue
+            batch = maker.get_node_batch(
+                self.control, node_maker_index[wh_maker]
+            )
+            if batch is None:
+                continue
+            self._batches[maker_name] = batch
+            self._batch_name[wh_maker] = maker_name
+            self._batch_index[wh_maker] = np.arange(len(wh_maker))
+
+        self._batch_compiled = {
+            name: (
+                self._calc_method == "numba"
+                and batch.calculate_subtimestep_numba is not None
+            )
+            for name, batch in self._batches.items()
+        }
+
+        # instatiate the remaining nodes individually
+        self._nodes = [None] * self.nnodes
         for ii, (maker_name, maker_index) in enumerate(
             zip(params["node_maker_name"], params["node_maker_index"])
         ):
-            self._nodes += [
-                self._node_maker_dict[maker_name].get_node(
-                    self.control, maker_index
-                )
-            ]
+            if self._batch_name[ii] is not None:
+                continue
+            self._nodes[ii] = self._node_maker_dict[maker_name].get_node(
+                self.control, maker_index
+            )
+
+        # Split the execution order into runs of consecutive nodes from the
+        # same batch, individual nodes are in runs of their own.
+        self._node_runs = []
+        for inode in self._node_order:
+            name = self._batch_name[inode]
+            if (
+                name is not None
+                and len(self._node_runs)
+                and self._node_runs[-1][0] == name
+            ):
+                self._node_runs[-1][1].append(inode)
+            else:
+                self._node_runs.append((name, [inode]))
+
+        self._node_runs = [
+            (
+                name,
+                np.array(inodes, dtype="int64"),
+                self._batch_index[inodes],
+            )
+            for name, inodes in self._node_runs
+        ]
+
+        # for gathering batch results to the graph
+        self._batch_graph_index = {
+            name: np.where(self._batch_name == name)[0]
+            for name in self._batches.keys()
+        }
+        return
+
+    def _init_calc_method(self):
+        if self._calc_method is None:
+            self._calc_method = "numba"
+
+        avail_methods = ["numpy", "numba"]
+        if self._calc_method.lower() not in avail_methods:
+            msg = (
+                f"Invalid calc_method={self._calc_method} for {self.name}. "
+                f"Setting calc_method to 'numba' for {self.name}"
+            )
+            warn(msg)
+            self._calc_method = "numba"
+
+        self._calc_method = self._calc_method.lower()
+        return
 
     def _advance_variables(self) -> None:
+        for batch in self._batches.values():
+            batch.advance()
+
         for node in self._nodes:
-            node.advance()
+            if node is not None:
+                node.advance()
 
         # no prognostic variables on the graph
         return
 
     def calculate(self, time_length: float, n_substeps: int = 24) -> None:
-        params = self._params.parameters
+        for batch in self._batches.values():
+            batch.prepare_timestep()
 
         for node in self._nodes:
-            node.prepare_timestep()
+            if node is not None:
+                node.prepare_timestep()
 
         self._node_upstream_inflow_acc[:] = zero
 
@@ -512,41 +741,90 @@ class FlowGraph(ConservativeProcess):
             # not have upstream reaches
             self._node_upstream_inflow_sub[:] = zero
 
-            for inode in self._node_order:
-                # The first nodes calculated dont have upstream inflows
-                # Eventually pass timestep length and n_substems to nodes
-                # Calculate
-                self._nodes[inode].calculate_subtimestep(
-                    istep,
-                    self._node_upstream_inflow_sub[inode],
-                    self.inflows[inode],
-                )
-                # Get the outflows back
-                self._node_outflow_substep[inode] = self._nodes[
-                    inode
-                ].outflow_substep
-                # Add this node's outflow its downstream node's inflow
-                if params["to_graph_index"][inode] >= 0:
-                    self._node_upstream_inflow_sub[
-                        params["to_graph_index"][inode]
-                    ] += self._node_outflow_substep[inode]
+            for batch_name, inodes, ibatch in self._node_runs:
+                if (
+                    batch_name is not None
+                    and not self._batch_compiled[batch_name]
+                ):
+                    batch = self._batches[batch_name]
+                    for inode, ii in zip(inodes, ibatch):
+                        self._node_outflow_substep[inode] = (
+                            batch.calculate_subtimestep(
+                                istep,
+                                ii,
+                                self._node_upstream_inflow_sub[inode],
+                                self.inflows[inode],
+                            )
+                        )
+                        if self._to_graph_index[inode] >= 0:
+                            self._node_upstream_inflow_sub[
+                                self._to_graph_index[inode]
+                            ] += self._node_outflow_substep[inode]
+                    continue
+
+                elif batch_name is not None:
+                    batch = self._batches[batch_name]
+                    _calculate_batch_subtimestep(
+                        batch.calculate_subtimestep_numba,
+                        istep,
+                        inodes,
+                        ibatch,
+                        batch.state,
+                        self._to_graph_index,
+                        self.inflows,
+                        self._node_upstream_inflow_sub,
+                        self._node_outflow_substep,
+                    )
+                    continue
+
+                for inode in inodes:
+                    # The first nodes calculated dont have upstream inflows
+                    # Eventually pass timestep length and n_substems to nodes
+                    # Calculate
+                    self._nodes[inode].calculate_subtimestep(
+                        istep,
+                        self._node_upstream_inflow_sub[inode],
+                        self.inflows[inode],
+                    )
+                    # Get the outflows back
+                    self._node_outflow_substep[inode] = self._nodes[
+                        inode
+                    ].outflow_substep
+                    # Add this node's outflow its downstream node's inflow
+                    if self._to_graph_index[inode] >= 0:
+                        self._node_upstream_inflow_sub[
+                            self._to_graph_index[inode]
+                        ] += self._node_outflow_substep[inode]
 
             # <
             # not sure how PRMS-specific this is
             self._node_upstream_inflow_acc += self._node_upstream_inflow_sub
 
+        for batch in self._batches.values():
+            batch.finalize_timestep()
+
         for node in self._nodes:
-            node.finalize_timestep()
+            if node is not None:
+                node.finalize_timestep()
 
         self.node_upstream_inflows[:] = (
             self._node_upstream_inflow_acc / n_substeps
         )
 
-        for ii in range(self.nnodes):
-            self.node_outflows[ii] = self._nodes[ii].outflow
-            self.node_storage_changes[ii] = self._nodes[ii].storage_change
-            self.node_storages[ii] = self._nodes[ii].storage
-            self.node_sink_source[ii] = self._nodes[ii].sink_source
+        for name, batch in self._batches.items():
+            wh_graph = self._batch_graph_index[name]
+            self.node_outflows[wh_graph] = batch.outflow
+            self.node_storage_changes[wh_graph] = batch.storage_change
+            self.node_storages[wh_graph] = batch.storage
+            self.node_sink_source[wh_graph] = batch.sink_source
+
+        for ii, node in enumerate(self._nodes):
+            if node is None:
+                continue
+            self.node_outflows[ii] = node.outflow
+            self.node_storage_changes[ii] = node.storage_change
+            self.node_storages[ii] = node.storage
+            self.node_sink_source[ii] = node.sink_source
 
         self.node_negative_sink_source[:] = -1 * self.node_sink_source
 
@@ -562,6 +840,40 @@ class FlowGraph(ConservativeProcess):
         return
 
 
+@nb.njit(parallel=False)
+def _calculate_batch_subtimestep(
+    calculate_subtimestep,
+    isubstep,
+    graph_indices,
+    batch_indices,
+    state,
+    to_graph_index,
+    inflows,
+    node_upstream_inflow_sub,
+    node_outflow_substep,
+):
+    """Calculate a subtimestep on a run of nodes from a FlowNodeBatch.
+
+    The nodes are calculated in the supplied (execution) order and their
+    outflows are added to the upstream inflows of their downstream nodes,
+    exactly as done for individual FlowNodes in FlowGraph.calculate.
+    """
+    for ii in range(len(graph_indices)):
+        inode = graph_indices[ii]
+        node_outflow_substep[inode] = calculate_subtimestep(
+            isubstep,
+            batch_indices[ii],
+            node_upstream_inflow_sub[inode],
+            inflows[inode],
+            state,
+        )
+        to_node = to_graph_index[inode]
+        if to_node >= 0:
+            node_upstream_inflow_sub[to_node] += node_outflow_substep[inode]
+
+    return
+
+
 def inflow_exchange_factory(
     dimension_names: tuple,
     parameter_names: tuple,
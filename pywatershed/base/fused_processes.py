@@ -0,0 +1,203 @@
+"""Run consecutive Processes for blocks of time steps in one compiled call.
+
+Processes implementing timestep functions (see Process.timestep_state) with
+calc_method "numba" expose their compiled advance and calculate as
+Process.timestep_numba. FusedProcesses chains these for several Processes in
+a generated, numba compiled loop over a block of time steps. Per time step,
+the inputs of the Processes from outside the block (input files and
+Processes before them) are set from arrays staged before the call and the
+variables needed after the call (by output, budgets and later Processes) are
+gathered into arrays. See the Model "fuse_n_time_steps" control option.
+
+numba links the compiled timestep functions into the loop and optimizes
+them again, so compiling a loop takes several times longer than compiling
+the Processes and is not cached on disk (the loop is generated).
+"""
+
+from typing import Callable
+
+import numpy as np
+
+from .process import Process
+
+_block_kernels = {}
+
+
+def block_kernel(
+    timestep_fns: tuple, n_inputs: int, n_outputs: int
+) -> Callable:
+    """The compiled loop over time steps of chained timestep functions.
+
+    Args:
+        timestep_fns: a tuple of the (advance, calculate) numba dispatchers
+            of each Process, in order.
+        n_inputs: the number of staged input arrays.
+        n_outputs: the number of gathered output arrays.
+
+    Returns:
+        The numba dispatcher of kernel(states, inputs, outputs, itime_step,
+        month, doy, dowy, time_length), where states is the tuple of the
+        timestep states of the Processes, inputs and outputs are tuples of
+        (array, block) pairs, with block[tt] the values of array at time step
+        tt, and the remaining arguments give the time steps of the block (see
+        Control.calendar). The dispatcher is the same object for the same
+        arguments throughout the Python session.
+    """
+    key = (timestep_fns, n_inputs, n_outputs)
+    if key in _block_kernels.keys():
+        return _block_kernels[key]
+
+    import numba as nb
+
+    from ..utils.numba_utils import copy_to
+
+    time_args = "itime_step[tt], month[tt], doy[tt], dowy[tt], time_length"
+    lines = [
+        "def kernel(states, inputs, outputs, itime_step, month, doy, dowy, "
+        "time_length):",
+        "    for tt in range(itime_step.shape[0]):",
+    ]
+    lines += [
+        f"        copy_to(inputs[{ii}][0], inputs[{ii}][1][tt])"
+        for ii in range(n_inputs)
+    ]
+    lines += [
+        f"        advance_{ii}(states[{ii}])"
+        for ii in range(len(timestep_fns))
+    ]
+    lines += [
+        f"        calculate_{ii}(states[{ii}], {time_args})"
+        for ii in range(len(timestep_fns))
+    ]
+    lines += [
+        f"        copy_to(outputs[{ii}][1][tt], outputs[{ii}][0])"
+        for ii in range(n_outputs)
+    ]
+    lines += ["    return"]
+
+    # the timestep functions are globals of the kernel, not arguments
+    kernel_globals = {"copy_to": copy_to}
+    for ii, (advance, calculate) in enumerate(timestep_fns):
+        kernel_globals[f"advance_{ii}"] = advance
+        kernel_globals[f"calculate_{ii}"] = calculate
+    exec("\n".join(lines), kernel_globals)
+
+    # generated source can not be cached on disk, the timestep functions are
+    _block_kernels[key] = nb.njit(kernel_globals["kernel"])
+    return _block_kernels[key]
+
+
+def _flat(array: np.ndarray) -> np.ndarray:
+    """A 1-D view of an array."""
+    flat = array.reshape(-1)
+    if not np.shares_memory(flat, array):
+        raise ValueError("Arrays of fused Processes must be contiguous")
+    return flat
+
+
+class FusedProcesses:
+    """Run consecutive Processes for blocks of time steps in one call.
+
+    For a block of time steps, the values of the inputs are first staged
+    with stage() at each time step, then run() calculates the Processes for
+    all the time steps of the block, then restore() sets the inputs and the
+    gathered outputs of the Processes to their values at each time step,
+    for output and subsequent Processes.
+
+    Args:
+        processes: the Processes, in order, each with timestep_numba.
+        inputs: the input arrays of the Processes which are set from outside
+            the Processes at each time step, by staging.
+        outputs: the arrays of the Processes gathered at each time step.
+        n_time_steps: the maximum number of time steps in a block.
+        held: other arrays which are staged and restored with the inputs but
+            not used by the Processes, e.g. inputs of subsequent Processes
+            from preceding ones.
+    """
+
+    def __init__(
+        self,
+        processes: list[Process],
+        inputs: list[np.ndarray],
+        outputs: list[np.ndarray],
+        n_time_steps: int,
+        held: list[np.ndarray] = None,
+    ) -> None:
+        for proc in processes:
+            if proc.timestep_numba is None:
+                msg = (
+                    f"{proc.name} does not have numba timestep functions "
+                    "to fuse"
+                )
+                raise ValueError(msg)
+
+        if held is None:
+            held = []
+
+        self.processes = processes
+        self.n_time_steps = n_time_steps
+        self._inputs = [
+            (_flat(arr), np.zeros((n_time_steps, arr.size), arr.dtype))
+            for arr in inputs
+        ]
+        self._outputs = [
+            (_flat(arr), np.zeros((n_time_steps, arr.size), arr.dtype))
+            for arr in outputs
+        ]
+        self._held = [
+            (_flat(arr), np.zeros((n_time_steps, arr.size), arr.dtype))
+            for arr in held
+        ]
+        self._kernel = block_kernel(
+            tuple(proc.timestep_numba for proc in processes),
+            len(self._inputs),
+            len(self._outputs),
+        )
+        return
+
+    def stage(self, itime: int) -> None:
+        """Stage the current values of the inputs for a time of the block.
+
+        Args:
+            itime: the index of the time step in the block.
+        """
+        for arr, block in self._inputs + self._held:
+            block[itime] = arr
+        return
+
+    def run(self, itime_step: int, n_time_steps: int, control) -> None:
+        """Calculate the Processes for a block of time steps.
+
+        Args:
+            itime_step: the index (Control.itime_step) of the first time step.
+            n_time_steps: the number of time steps of the block, for which
+                the inputs are staged.
+            control: the Control of the Processes.
+        """
+        if n_time_steps > self.n_time_steps:
+            msg = f"Blocks are limited to {self.n_time_steps} time steps"
+            raise ValueError(msg)
+
+        times = slice(itime_step, itime_step + n_time_steps)
+        calendar = control.calendar
+        self._kernel(
+            tuple(proc.timestep_state for proc in self.processes),
+            tuple((arr, block[:n_time_steps]) for arr, block in self._inputs),
+            tuple((arr, block[:n_time_steps]) for arr, block in self._outputs),
+            np.arange(times.start, times.stop, dtype=np.int64),
+            calendar["month"][times],
+            calendar["doy"][times],
+            calendar["dowy"][times],
+            1.0,
+        )
+        return
+
+    def restore(self, itime: int) -> None:
+        """Set the inputs and outputs to their values at a time of the block.
+
+        Args:
+            itime: the index of the time step in the block.
+        """
+        for arr, block in self._inputs + self._outputs + self._held:
+            arr[:] = block[itime]
+        return
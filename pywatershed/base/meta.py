@@ -6,15 +6,25 @@ in this module.
 The metadata are static (pywatershed/static/metadata) so this is a module and
 not a class.
 
+Parsing the metadata yaml files takes most of a second, so the parsed
+metadata are compiled to a pickle file on first use. Later imports load the
+pickle, which is recompiled when the pywatershed version or the yaml files
+change. The pickle is written to the __pycache__ directory of the metadata
+or, if that is not writable, to ~/.cache/pywatershed.
+
 """
 
+import os
 import pathlib as pl
+import pickle
+import tempfile
 from typing import Iterable, Union
 
 import numpy as np
 import yaml
 
 from ..constants import __pywatershed_root__
+from ..version import __version__
 
 varoptions = Union[str, list, tuple]
 
@@ -53,10 +63,88 @@ def _dims_to_tuples(dd):
     return result
 
 
-dimensions = _dims_to_tuples(load_yaml_file(dims_file))
-control = _dims_to_tuples(load_yaml_file(control_file))
-parameters = _dims_to_tuples(load_yaml_file(params_file))
-variables = _dims_to_tuples(load_yaml_file(vars_file))
+metadata_files = {
+    "dimensions": dims_file,
+    "control": control_file,
+    "parameters": params_file,
+    "variables": vars_file,
+}
+
+metadata_cache_files = (
+    __pywatershed_root__ / "static/metadata/__pycache__/metadata.pickle",
+    pl.Path.home() / ".cache/pywatershed/metadata.pickle",
+)
+
+
+def _metadata_key() -> tuple:
+    key = (__version__,)
+    for name, the_file in metadata_files.items():
+        stat = the_file.stat()
+        key += (name, stat.st_size, stat.st_mtime_ns)
+    return key
+
+
+def load_metadata() -> dict:
+    """Load the compiled metadata, compiling them if necessary
+
+    Returns:
+        metadata: dictionary of the metadata in each of metadata_files
+            with dimensions as tuples.
+
+    """
+    key = _metadata_key()
+    for cache_file in metadata_cache_files:
+        try:
+            with cache_file.open("rb") as file_stream:
+                cached = pickle.load(file_stream)
+        except Exception:
+            # missing, incomplete or from another python
+            continue
+        if isinstance(cached, dict) and cached.get("key") == key:
+            return cached["metadata"]
+
+    metadata = {
+        name: _dims_to_tuples(load_yaml_file(the_file))
+        for name, the_file in metadata_files.items()
+    }
+
+    for cache_file in metadata_cache_files:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # write and move so other processes never load a partial file
+            fd, tmp_file = tempfile.mkstemp(
+                dir=cache_file.parent, suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "wb") as file_stream:
+                    pickle.dump(
+                        {"key": key, "metadata": metadata}, file_stream
+                    )
+                os.replace(tmp_file, cache_file)
+            except BaseException:
+                pl.Path(tmp_file).unlink(missing_ok=True)
+                raise
+        except OSError:
+            continue
+        break
+
+    return metadata
+
+
+_metadata = load_metadata()
+dimensions = _metadata["dimensions"]
+control = _metadata["control"]
+parameters = _metadata["parameters"]
+variables = _metadata["variables"]
+
+# the position of each name in its metadata and, for find_variables, the
+# metadata of each name with variables taking precedence over dimensions,
+# control and parameters, in that order
+_positions = {
+    id(meta_dict): {name: ii for ii, name in enumerate(meta_dict.keys())}
+    for meta_dict in _metadata.values()
+}
+_all_meta = {**parameters, **control, **dimensions, **variables}
 
 
 def meta_netcdf_type(meta_item: dict) -> str:
@@ -143,20 +231,21 @@ def is_available(variable_name: str) -> bool:
         avail: boolean indicating of the variable name is available
 
     """
-    if (
-        variable_name in variables.keys()
-        or variable_name in dimensions.keys()
-        or variable_name in control.keys()
-        or variable_name in parameters.keys()
-    ):
-        avail = True
-    else:
-        avail = False
-    return avail
+    return variable_name in _all_meta.keys()
 
 
 def _get_meta_in_list(meta_dict: dict, the_list: Iterable) -> dict:
-    return {key: value for key, value in meta_dict.items() if key in the_list}
+    if isinstance(the_list, str):
+        the_list = [the_list]
+    positions = _positions.get(id(meta_dict))
+    if positions is None:
+        return {kk: vv for kk, vv in meta_dict.items() if kk in the_list}
+    # in the order of the metadata, not of the_list
+    keys = sorted(
+        {key for key in the_list if key in positions.keys()},
+        key=positions.__getitem__,
+    )
+    return {key: meta_dict[key] for key in keys}
 
 
 def get_dims(var_list: Iterable) -> dict:
@@ -233,17 +322,11 @@ def find_variables(vars: varoptions) -> dict:
     """
     if isinstance(vars, str):
         vars = [vars]
-    variable_dict = {}
-    for variable_name in vars:
-        if variable_name in variables.keys():
-            variable_dict[variable_name] = variables[variable_name]
-        elif variable_name in dimensions.keys():
-            variable_dict[variable_name] = dimensions[variable_name]
-        elif variable_name in control.keys():
-            variable_dict[variable_name] = control[variable_name]
-        elif variable_name in parameters.keys():
-            variable_dict[variable_name] = parameters[variable_name]
-    return variable_dict
+    return {
+        variable_name: _all_meta[variable_name]
+        for variable_name in vars
+        if variable_name in _all_meta.keys()
+    }
 
 
 def get_units(vars: varoptions, to_pint: bool = False) -> dict:
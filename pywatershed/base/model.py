@@ -1,15 +1,22 @@
 import pathlib as pl
+from contextlib import nullcontext
 from copy import deepcopy
 from datetime import datetime
 from typing import Union
+from warnings import warn
 
+import numpy as np
 from tqdm.auto import tqdm
 
 from ..base.adapter import adapter_factory
+from ..base.checkpoint import get_state, load_state, save_state, set_state
 from ..base.control import Control
+from ..base.fused_processes import FusedProcesses
 from ..constants import fileish
 from ..parameters import Parameters, PrmsParameters
 from ..utils.path import path_rel_to_yaml
+from ..utils.timing import PhaseTimer
+from ..version import __version__
 
 # This is a convenience
 process_order_nhm = [
@@ -52,6 +59,14 @@ class Model:
            passing to the model. The output file name has the form
            %Y-%m-%dT%H:%M:%S.model_control.yaml
 
+    When the control option "timing" (or "timing_file") is set, the wall
+    time and call counts of the advance, calculate, budget_calculate,
+    output, and budget_output phases of each Process, of the advance of each
+    input adapter, and of input file reads are recorded in the PhaseTimer
+    Model.timer. Phases are inclusive, e.g. calculate includes
+    budget_calculate. See PhaseTimer.to_dict() and
+    PhaseTimer.to_dataframe().
+
     PRMS-legacy instantiation
     -----------------------------
 
@@ -331,12 +346,19 @@ class Model:
         self._init_procs()
         self._connect_procs()
 
+        opts = self.control.options
+        self.timer = None
+        if opts.get("timing", False) or opts.get("timing_file", None):
+            self.timer = PhaseTimer()
+            self._set_timer()
+
         self._found_input_files = False
         if find_input_files:
             self._find_input_files()
 
+        self._fused = None
+
         self._netcdf_initialized = False
-        opts = self.control.options
         if "netcdf_output_dir" in opts.keys():
             self._default_nc_out_dir = opts["netcdf_output_dir"]
         else:
@@ -517,25 +539,52 @@ class Model:
 
         return
 
-    def _find_input_files(self) -> None:
+    def _find_input_files(self, input_adapters: dict = None) -> None:
+        """Adapt the inputs not supplied by other processes.
+
+        Args:
+            input_adapters: optional dictionary of Adapters (or
+                TimeseriesArrays) by input name to use instead of the
+                corresponding files in input_dir, e.g. data in shared memory.
+        """
+        if input_adapters is None:
+            input_adapters = {}
+        suffix = self.control.options.get("input_file_suffix", ".nc")
         file_inputs = {}
         for name in self._file_input_names:
-            nc_path = self._input_dir / f"{name}.nc"
+            if name in input_adapters.keys():
+                file_inputs[name] = input_adapters[name]
+                continue
+            input_path = self._input_dir / f"{name}{suffix}"
             file_inputs[name] = adapter_factory(
-                nc_path,
+                input_path,
                 name,
                 control=self.control,
             )
         for process in self.process_order:
             for input, frm in self._inputs_from[process].items():
                 if not frm:
-                    fname = file_inputs[input]._fname
-                    self.process_input_from[process][input] = fname
+                    if hasattr(file_inputs[input], "_fname"):
+                        fname = file_inputs[input]._fname
+                        self.process_input_from[process][input] = fname
                     self.processes[process].set_input_to_adapter(
                         input, file_inputs[input]
                     )
 
         self._found_input_files = True
+        self._set_timer()
+        return
+
+    def _set_timer(self) -> None:
+        """Share the Model's timer with its Processes and input files."""
+        if self.timer is None:
+            return
+        for proc in self.processes.values():
+            proc._timer = self.timer
+            for adapter in proc._input_variables_dict.values():
+                nc_read = getattr(adapter, "_nc_read", None)
+                if nc_read is not None:
+                    nc_read.timer = self.timer
         return
 
     @staticmethod
@@ -673,6 +722,8 @@ class Model:
                 output_vars=output_vars,
             )
         self._netcdf_initialized = True
+        # the output variables are gathered by fused processes
+        self._fused = None
         return
 
     def run(
@@ -697,7 +748,8 @@ class Model:
                netcdf and outputs at each timestep).
             finalize: option to not finalize at the end of the time loop.
                Default is to finalize.
-            n_time_steps: the number of timesteps to run
+            n_time_steps: the number of timesteps to run. Defaults to the
+               remaining time steps in the control.
             output_vars: the vars to output to the netcdf_dir
         """
         if netcdf_dir or (
@@ -707,12 +759,23 @@ class Model:
             self.initialize_netcdf(netcdf_dir, output_vars=output_vars)
 
         if not n_time_steps:
-            n_time_steps = self.control.n_times
+            # the remaining time steps, e.g. after restore_checkpoint()
+            n_time_steps = self.control.n_times - (self.control.itime_step + 1)
 
-        for istep in tqdm(range(n_time_steps)):
-            self.advance()
-            self.calculate()
-            self.output()
+        n_fuse = self.control.options.get("fuse_n_time_steps", None)
+        if n_fuse:
+            self._run_fused(n_time_steps, n_fuse)
+        else:
+            for istep in tqdm(range(n_time_steps)):
+                if self.timer is None:
+                    self.advance()
+                    self.calculate()
+                    self.output()
+                else:
+                    with self.timer.time("Model", "time_step"):
+                        self.advance()
+                        self.calculate()
+                        self.output()
 
         if finalize:
             print("model.run(): finalizing")
@@ -720,6 +783,193 @@ class Model:
 
         return
 
+    def _phase(self, cls: str, phase: str):
+        """A context timing a phase of a Process, when the Model is timed."""
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.time(cls, phase)
+
+    def _init_fused(self, n_fuse: int) -> None:
+        """Fuse the longest run of consecutive Processes which can be fused.
+
+        The processes before (pre), in (fused), and after (post) the run are
+        kept in _fused_order. The inputs of the fused processes from files
+        and pre processes are staged and their variables used by output,
+        budgets and post processes are gathered, see FusedProcesses.
+        """
+        order = list(self.process_order)
+        can_fuse = [
+            self.processes[cls].timestep_numba is not None for cls in order
+        ]
+        start, end = 0, 0
+        run_start = None
+        for ii, ok in enumerate(can_fuse + [False]):
+            if ok and run_start is None:
+                run_start = ii
+            elif not ok and run_start is not None:
+                if ii - run_start > end - start:
+                    start, end = run_start, ii
+                run_start = None
+
+        if end == start:
+            msg = (
+                "The fuse_n_time_steps option requires Processes with "
+                "timestep functions and calc_method 'numba'"
+            )
+            raise ValueError(msg)
+
+        pre, fused, post = order[:start], order[start:end], order[end:]
+
+        def inputs_from(procs, others):
+            return [
+                (cls, input, frm[0])
+                for cls in procs
+                for input, frm in self._inputs_from[cls].items()
+                if frm and frm[0] in others
+            ]
+
+        for cls, input, frm in inputs_from(pre, fused + post) + inputs_from(
+            fused, post
+        ):
+            msg = (
+                f"Can not fuse time steps: {cls} takes {input} from {frm} "
+                "which is calculated after it"
+            )
+            raise ValueError(msg)
+
+        # dedupe the arrays by identity, the inputs are pointers
+        def unique(arrays, exclude=()):
+            ids = set(id(arr) for arr in exclude)
+            result = []
+            for arr in arrays:
+                if id(arr) not in ids:
+                    ids.add(id(arr))
+                    result.append(arr)
+            return result
+
+        inputs = unique(
+            self.processes[cls][input]
+            for cls in fused
+            for input, frm in self._inputs_from[cls].items()
+            if not frm or frm[0] in pre
+        )
+        held = unique(
+            (
+                self.processes[cls][input]
+                for cls, input, _ in inputs_from(post, pre)
+            ),
+            exclude=inputs,
+        )
+
+        outputs = [
+            self.processes[frm][input]
+            for _, input, frm in inputs_from(post, fused)
+        ]
+        for cls in fused:
+            proc = self.processes[cls]
+            if proc._netcdf_initialized:
+                outputs += [
+                    getattr(proc, var) for var in proc._netcdf_output_vars
+                ]
+            budget = getattr(proc, "budget", None)
+            if budget is not None:
+                outputs += [
+                    arr
+                    for comp in budget.components
+                    for arr in budget[comp].values()
+                ]
+
+        self._fused = FusedProcesses(
+            [self.processes[cls] for cls in fused],
+            inputs,
+            unique(outputs, exclude=inputs + held),
+            n_fuse,
+            held=held,
+        )
+        self._fused_order = (pre, fused, post)
+        return
+
+    def _run_fused(self, n_time_steps: int, n_fuse: int) -> None:
+        """Run the model with its fused Processes in blocks of time steps.
+
+        For each block, the pre processes are run and the inputs of the
+        fused processes staged at each time step. Then the fused processes
+        are calculated for the block in one compiled call. Finally, at each
+        time step of the block, the fused processes are restored to their
+        values, output and accumulate their budgets, and the post processes
+        are run.
+        """
+        if not self._found_input_files:
+            self._find_input_files()
+
+        if (
+            not self._netcdf_initialized
+            and self._default_nc_out_dir is not None
+        ):
+            self.initialize_netcdf()
+
+        if self._fused is None or self._fused.n_time_steps != n_fuse:
+            self._init_fused(n_fuse)
+
+        pre, fused, post = self._fused_order
+        control = self.control
+        with tqdm(total=n_time_steps) as progress:
+            while n_time_steps > 0:
+                n_block = min(n_fuse, n_time_steps)
+                time = (
+                    control._itime_step,
+                    control._current_time,
+                    control._previous_time,
+                )
+
+                for itime in range(n_block):
+                    control.advance()
+                    for cls in pre:
+                        with self._phase(cls, "advance"):
+                            self.processes[cls].advance()
+                        with self._phase(cls, "calculate"):
+                            self.processes[cls].calculate(1.0)
+                        with self._phase(cls, "output"):
+                            self.processes[cls].output()
+                    for cls in fused:
+                        with self._phase(cls, "advance"):
+                            self.processes[cls]._advance_inputs()
+                    self._fused.stage(itime)
+
+                # rewind the control to calculate and replay the block
+                (
+                    control._itime_step,
+                    control._current_time,
+                    control._previous_time,
+                ) = time
+                with self._phase("Model", "fused_calculate"):
+                    self._fused.run(control.itime_step + 1, n_block, control)
+
+                for itime in range(n_block):
+                    control.advance()
+                    self._fused.restore(itime)
+                    for cls in fused:
+                        proc = self.processes[cls]
+                        proc._itime_step = control.itime_step
+                        if getattr(proc, "budget", None) is not None:
+                            with self._phase(cls, "budget_calculate"):
+                                proc.budget.advance()
+                                proc.budget.calculate()
+                        with self._phase(cls, "output"):
+                            proc.output()
+                    for cls in post:
+                        with self._phase(cls, "advance"):
+                            self.processes[cls].advance()
+                        with self._phase(cls, "calculate"):
+                            self.processes[cls].calculate(1.0)
+                        with self._phase(cls, "output"):
+                            self.processes[cls].output()
+                    progress.update()
+
+                n_time_steps -= n_block
+
+        return
+
     def advance(self):
         """Advance the model in time."""
         if not self._found_input_files:
@@ -733,23 +983,135 @@ class Model:
 
         self.control.advance()
         for cls in self.process_order:
-            self.processes[cls].advance()
+            if self.timer is None:
+                self.processes[cls].advance()
+            else:
+                with self.timer.time(cls, "advance"):
+                    self.processes[cls].advance()
         return
 
     def calculate(self):
         """Calculate the model."""
         for cls in self.process_order:
-            self.processes[cls].calculate(1.0)
+            if self.timer is None:
+                self.processes[cls].calculate(1.0)
+            else:
+                with self.timer.time(cls, "calculate"):
+                    self.processes[cls].calculate(1.0)
         return
 
     def output(self):
         """Output the model at the current time."""
         for cls in self.process_order:
-            self.processes[cls].output()
+            if self.timer is None:
+                self.processes[cls].output()
+            else:
+                with self.timer.time(cls, "output"):
+                    self.processes[cls].output()
         return
 
     def finalize(self):
         """Finalize the model."""
         for cls in self.process_order:
             self.processes[cls].finalize()
+
+        timing_file = self.control.options.get("timing_file", None)
+        if timing_file is not None and self.timer is not None:
+            self.timer.to_json(timing_file)
         return
+
+    def checkpoint(self, checkpoint_file: fileish) -> None:
+        """Save the current state of the model to a checkpoint file.
+
+        The state of all processes is saved, including restart variables and
+        all other public and private variables, budget accumulations, flow
+        graph node states, and input adapter positions, along with the time of
+        the control. Parameters and input data are not saved. See
+        :meth:`from_checkpoint` and :meth:`restore_checkpoint`.
+
+        Checkpoints are tied to the exact version of pywatershed which wrote
+        them. State is collected from the attributes of the processes, so
+        private arrays derived from parameters on initialization (e.g.
+        routing coefficients) are saved and restored along with the
+        time-varying state. A different version may name, derive or use
+        these differently, so restoring its checkpoints is not supported and
+        warns.
+
+        Args:
+            checkpoint_file: the file to write (numpy .npz format).
+        """
+        state = {
+            "model/pywatershed_version": np.array(__version__),
+            "model/process_order": np.array(list(self.process_order)),
+            "control/_itime_step": np.array(self.control._itime_step),
+            "control/_current_time": np.array(self.control._current_time),
+        }
+        if self.control._previous_time is not None:
+            state["control/_previous_time"] = np.array(
+                self.control._previous_time
+            )
+        for cls in self.process_order:
+            state.update(
+                get_state(self.processes[cls], prefix=f"processes/{cls}")
+            )
+
+        save_state(state, checkpoint_file)
+        return
+
+    def restore_checkpoint(self, checkpoint_file: fileish) -> None:
+        """Restore the state of the model from a checkpoint file.
+
+        The model must be constructed in the same way as the model which was
+        checkpointed. Running the model continues from the time following
+        the checkpoint.
+
+        Args:
+            checkpoint_file: a file written by :meth:`checkpoint`.
+        """
+        state = load_state(checkpoint_file)
+        process_order = state["model/process_order"].tolist()
+        if process_order != list(self.process_order):
+            msg = (
+                f"Checkpoint process order {process_order} does not match "
+                f"the model process order {list(self.process_order)}"
+            )
+            raise ValueError(msg)
+
+        version = str(state.get("model/pywatershed_version", "unknown"))
+        if version != __version__:
+            msg = (
+                f"Checkpoint written by pywatershed version {version} is "
+                f"being restored with version {__version__}"
+            )
+            warn(msg, UserWarning)
+
+        if not self._found_input_files:
+            self._find_input_files()
+
+        self.control._itime_step = int(state["control/_itime_step"])
+        self.control._current_time = state["control/_current_time"][()]
+        if "control/_previous_time" in state.keys():
+            self.control._previous_time = state["control/_previous_time"][()]
+
+        for cls in self.process_order:
+            set_state(self.processes[cls], state, prefix=f"processes/{cls}")
+
+        return
+
+    @staticmethod
+    def from_checkpoint(checkpoint_file: fileish, *args, **kwargs) -> "Model":
+        """Instantiate a Model and restore its state from a checkpoint file.
+
+        Args:
+            checkpoint_file: a file written by :meth:`checkpoint`.
+            *args: arguments to Model, as used to construct the checkpointed
+                model.
+            **kwargs: keyword arguments to Model, as used to construct the
+                checkpointed model.
+
+        Returns:
+            A Model which continues from the time following the checkpoint.
+        """
+        model = Model(*args, **kwargs)
+        model.restore_checkpoint(checkpoint_file)
+        return model
@@ -0,0 +1,256 @@
+import multiprocessing as mp
+import pathlib as pl
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from ..base.control import Control
+from ..base.timeseries import TimeseriesArray
+from ..constants import fileish
+from ..parameters import Parameters
+from ..utils.netcdf_utils import NetCdfRead
+from .model import Model
+
+# Shared memory blocks attached by a worker process, by block name. These are
+# attached once per worker and remain open for the life of the worker since
+# the Models of its members hold views of them.
+_attached_blocks = {}
+
+
+class ModelEnsemble:
+    """Run an ensemble of Models in a pool of processes.
+
+    Each ensemble member is a :class:`Model` of the same processes and
+    control with its own parameters. Members are run in parallel in a pool
+    of worker processes.
+
+    The inputs to the Models which are read from file (e.g. prcp, tmax, and
+    tmin or the outputs of PRMSAtmosphere when it is not in the process list)
+    are read once for the control's time period and placed in shared memory.
+    Every member adapts the same shared data (without copying) using
+    :class:`TimeseriesArray`, so memory use for these inputs does not grow
+    with the number of members or workers.
+
+    Args:
+        process_list: a list of Process classes, as for :class:`Model`.
+        control: a Control object, copied for each member.
+        parameters: a list of Parameters, one per ensemble member.
+        n_workers: the number of worker processes. Defaults to the number
+            of CPUs (or the number of members, if fewer).
+        shared_inputs: share the file inputs between the members in shared
+            memory. If False, each member reads its files from input_dir.
+        mp_context: the multiprocessing start method, e.g. "spawn" or
+            "fork". Defaults to the platform default.
+
+    Examples:
+    ---------
+
+    >>> import pywatershed as pws
+    >>> control = pws.Control.load_prms("nhm.control")
+    >>> control.options["input_dir"] = "."
+    >>> params = pws.parameters.PrmsParameters.load("myparam.param")
+    >>> ensemble = pws.ModelEnsemble(
+    ...     [pws.PRMSSolarGeometry, pws.PRMSAtmosphere, pws.PRMSCanopy],
+    ...     control=control,
+    ...     parameters=[params, params],
+    ...     n_workers=2,
+    ... )
+    >>> results = ensemble.run(return_vars=["net_ppt"])
+    >>> results[1]["PRMSCanopy"]["net_ppt"]
+
+    """
+
+    def __init__(
+        self,
+        process_list: list,
+        control: Control,
+        parameters: list[Parameters],
+        n_workers: int = None,
+        shared_inputs: bool = True,
+        mp_context: str = None,
+    ):
+        if not len(parameters):
+            raise ValueError("At least one ensemble member is required")
+
+        self.process_list = process_list
+        self.control = control
+        self.parameters = parameters
+        self.n_members = len(parameters)
+
+        if n_workers is None:
+            n_workers = min(mp.cpu_count(), self.n_members)
+        self.n_workers = n_workers
+        self.shared_inputs = shared_inputs
+        self._mp_context = mp.get_context(mp_context)
+
+        if "input_dir" not in self.control.options.keys():
+            msg = "Required control option 'input_dir' not found"
+            raise ValueError(msg)
+        self._input_dir = pl.Path(self.control.options["input_dir"]).resolve()
+
+        self._file_input_names = self._get_file_input_names()
+        return
+
+    def _get_file_input_names(self) -> list:
+        # The inputs not supplied by any process, as in Model._solve_inputs
+        inputs = set()
+        variables = set()
+        for proc in self.process_list:
+            inputs = inputs.union(proc.get_inputs())
+            variables = variables.union(proc.get_variables())
+        return sorted(inputs.difference(variables))
+
+    def _share_inputs(self) -> tuple[list, dict]:
+        """Read the file inputs in to shared memory.
+
+        Returns:
+            The SharedMemory blocks created and a picklable description of
+            each input for the workers.
+        """
+        blocks = []
+        specs = {}
+        try:
+            for name in self._file_input_names:
+                nc_read = NetCdfRead(
+                    self._input_dir / f"{name}.nc",
+                    start_time=self.control.start_time,
+                    end_time=self.control.end_time,
+                )
+                data = np.asarray(nc_read.all_time(name).data)
+                time = nc_read.times
+                nc_read.close()
+
+                block = SharedMemory(create=True, size=max(data.nbytes, 1))
+                blocks += [block]
+                shared = np.ndarray(data.shape, data.dtype, buffer=block.buf)
+                shared[:] = data
+                del shared
+                specs[name] = {
+                    "block_name": block.name,
+                    "shape": data.shape,
+                    "dtype": data.dtype.str,
+                    "time": time,
+                }
+
+        except Exception:
+            _release_blocks(blocks)
+            raise
+
+        return blocks, specs
+
+    def run(
+        self,
+        output_dir: fileish = None,
+        output_vars: list = None,
+        return_vars: list = None,
+    ) -> list[dict]:
+        """Run all the ensemble members.
+
+        Args:
+            output_dir: optional directory for NetCDF output. Each member
+                writes to its own subdirectory "member_<index>".
+            output_vars: the variables to output to output_dir, defaults to
+                all variables.
+            return_vars: optional variable names whose final values are
+                returned for each member.
+
+        Returns:
+            A list with a dictionary for each member of the final values of
+            return_vars by process name and variable name.
+        """
+        if return_vars is None:
+            return_vars = []
+
+        blocks = []
+        specs = {}
+        if self.shared_inputs:
+            blocks, specs = self._share_inputs()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.n_workers, mp_context=self._mp_context
+            ) as executor:
+                futures = []
+                for imember, member_params in enumerate(self.parameters):
+                    member_dir = None
+                    if output_dir is not None:
+                        member_dir = (
+                            pl.Path(output_dir) / f"member_{imember:03d}"
+                        )
+                    futures += [
+                        executor.submit(
+                            _run_member,
+                            self.process_list,
+                            self.control,
+                            member_params,
+                            specs,
+                            member_dir,
+                            output_vars,
+                            return_vars,
+                        )
+                    ]
+
+                results = [future.result() for future in futures]
+
+        finally:
+            _release_blocks(blocks)
+
+        return results
+
+
+def _release_blocks(blocks: list) -> None:
+    for block in blocks:
+        block.close()
+        block.unlink()
+    return
+
+
+def _attach_block(block_name: str) -> SharedMemory:
+    if block_name not in _attached_blocks.keys():
+        # Workers share the resource tracker of the ensemble's process,
+        # which unlinks the blocks after the run.
+        _attached_blocks[block_name] = SharedMemory(name=block_name)
+
+    return _attached_blocks[block_name]
+
+
+def _run_member(
+    process_list: list,
+    control: Control,
+    parameters: Parameters,
+    specs: dict,
+    output_dir: pl.Path,
+    output_vars: list,
+    return_vars: list,
+) -> dict:
+    """Run a single ensemble member in a worker process."""
+    input_adapters = {}
+    for name, spec in specs.items():
+        block = _attach_block(spec["block_name"])
+        data = np.ndarray(spec["shape"], spec["dtype"], buffer=block.buf)
+        data.flags.writeable = False
+        input_adapters[name] = TimeseriesArray(
+            control, name, data, time=spec["time"]
+        )
+
+    model = Model(
+        process_list,
+        control=control,
+        parameters=parameters,
+        find_input_files=False,
+    )
+    model._find_input_files(input_adapters)
+    model.run(netcdf_dir=output_dir, output_vars=output_vars, finalize=True)
+
+    result = {}
+    for proc_name, proc in model.processes.items():
+        for var in return_vars:
+            if var not in proc.get_variables():
+                continue
+            value = proc[var]
+            if isinstance(value, TimeseriesArray):
+                value = value.current
+            result.setdefault(proc_name, {})[var] = np.array(value, copy=True)
+
+    return result
@@ -11,6 +11,16 @@ from .data_model import DatasetDict, dd_to_nc4_ds, dd_to_xr_ds
 # MappingProxyType used as per
 # https://adamj.eu/tech/2022/01/05/how-to-make-immutable-dict-in-python/
 
+# A leading dimension of this name on parameters denotes an ensemble. The
+# ensemble is folded in to the spatial dimensions below which Processes
+# can treat as independent.
+ensemble_dim = "nens"
+ensemble_spatial_dims = ("nhru", "nssr", "ngw")
+# Dimensions of parameters which are the same for all members, e.g. months.
+# Processes with any other dimensions (e.g. nsegment) can not be run as an
+# ensemble.
+ensemble_shared_dims = ("ntime", "nmonth", "ndoy", "ndeplval")
+
 
 class Parameters(DatasetDict):
     """Parameter base class
@@ -210,6 +220,99 @@ class Parameters(DatasetDict):
             _set_dict_read_write(self.data), copy=copy
         )
 
+    def __reduce__(self):
+        # MappingProxyTypes can not be pickled, e.g. to send to other
+        # processes
+        return (type(self).from_dict, (_set_dict_read_write(self.data),))
+
+    def flatten_ensemble(self, n_ensemble: int = None) -> "Parameters":
+        """Fold an ensemble dimension in to the spatial dimensions.
+
+        Parameters with a leading ensemble dimension, "nens", have one value
+        per ensemble member. This returns Parameters where the spatial
+        dimensions (nhru, nssr, ngw) are n_ensemble times longer, ordered by
+        member and then by location. Parameters with the ensemble dimension
+        are reshaped and spatial parameters without it are repeated for each
+        member. Processes using these parameters advance all members in
+        every calculation.
+
+        Args:
+            n_ensemble: the number of members, the length of "nens" if not
+                specified. This may be given to expand Parameters which do
+                not have the ensemble dimension.
+
+        Returns:
+            Parameters of the same type without the ensemble dimension.
+        """
+        if n_ensemble is None:
+            n_ensemble = self.dims[ensemble_dim]
+        elif ensemble_dim in self.dims.keys():
+            assert n_ensemble == self.dims[ensemble_dim]
+
+        data = _set_dict_read_write(self.data)
+        data["dims"].pop(ensemble_dim, None)
+        data["coords"].pop(ensemble_dim, None)
+        data["metadata"].pop(ensemble_dim, None)
+        data["encoding"].pop(ensemble_dim, None)
+        for dim_name in ensemble_spatial_dims:
+            if dim_name in data["dims"].keys():
+                data["dims"][dim_name] *= n_ensemble
+
+        for var_type in ["coords", "data_vars"]:
+            for var_name, var_data in data[var_type].items():
+                var_dims = list(data["metadata"][var_name]["dims"])
+                has_ens = ensemble_dim in var_dims
+                if has_ens:
+                    if var_dims.index(ensemble_dim) != 0:
+                        msg = (
+                            f"The ensemble dimension '{ensemble_dim}' must "
+                            f"be the leading dimension of {var_name}"
+                        )
+                        raise ValueError(msg)
+                    var_dims = var_dims[1:]
+
+                spatial_axes = [
+                    ii
+                    for ii, dd in enumerate(var_dims)
+                    if dd in ensemble_spatial_dims
+                ]
+                if not len(spatial_axes):
+                    if has_ens:
+                        msg = (
+                            f"Parameter {var_name} varies by ensemble member "
+                            "but has no spatial dimension in "
+                            f"{ensemble_spatial_dims}"
+                        )
+                        raise ValueError(msg)
+                    continue
+
+                if len(spatial_axes) > 1:
+                    msg = (
+                        f"Parameter {var_name} has more than one spatial "
+                        "dimension"
+                    )
+                    raise NotImplementedError(msg)
+
+                axis = spatial_axes[0]
+                if has_ens:
+                    var_data = np.moveaxis(var_data, 0, axis)
+                    new_shape = list(var_data.shape)
+                    new_shape[axis : axis + 2] = [
+                        new_shape[axis] * new_shape[axis + 1]
+                    ]
+                    var_data = var_data.reshape(new_shape)
+                else:
+                    var_data = np.concatenate(
+                        [var_data] * n_ensemble, axis=axis
+                    )
+
+                data[var_type][var_name] = var_data
+                data["metadata"][var_name]["dims"] = tuple(var_dims)
+                # encodings like chunk sizes no longer apply
+                data["encoding"].pop(var_name, None)
+
+        return type(self)(**data)
+
     @classmethod
     def merge(cls, *args, copy=True, del_global_src=True):
         """Merge Parameter classes
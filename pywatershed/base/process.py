@@ -1,19 +1,25 @@
 import inspect
 import os
 import pathlib as pl
-from typing import Literal
+from collections import namedtuple
+from typing import Literal, Union
 from warnings import warn
 
 import numpy as np
 
 from ..base import meta
-from ..base.adapter import Adapter, adapter_factory
+from ..base.adapter import Adapter, AdapterEnsemble, adapter_factory
 from ..base.data_model import _merge_dicts
 from ..base.timeseries import TimeseriesArray
 from ..parameters import Parameters
-from ..utils.netcdf_utils import NetCdfWrite
+from ..utils.netcdf_utils import NetCdfAsyncWriter, NetCdfWrite
 from .accessor import Accessor
 from .control import Control
+from .parameters import (
+    ensemble_dim,
+    ensemble_shared_dims,
+    ensemble_spatial_dims,
+)
 
 
 class Process(Accessor):
@@ -68,6 +74,13 @@ class Process(Accessor):
         prognostic variables. (For example is snow_water_equiv = snow_ice +
         snow_liquid, then storage changes for snow_ice and snow_liquid
         should be tracked and not for snow_water_equiv).
+    _timestep_state_attrs, _advance_timestep(), _calculate_timestep():
+        Optional. A subclass whose time step only depends on its own
+        attributes (and the time) lists those attributes and implements
+        its advance and calculate as functions of them, see timestep_state.
+        With numba, these functions are compiled and a Model can run
+        several such Processes for blocks of time steps in one compiled
+        call (see the Model "fuse_n_time_steps" option).
 
     See Also
     --------
@@ -88,6 +101,28 @@ class Process(Accessor):
         How to handle metadata_patches conflicts. Experimental.
     """
 
+    # The attributes of the state taken by the timestep functions, None if
+    # the subclass does not implement them.
+    _timestep_state_attrs = None
+    _timestep_state_attrs_set = frozenset()
+    _timestep_state = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("_timestep_state_attrs", None) is not None:
+            cls._timestep_state_type = _timestep_state_type(cls)
+            cls._timestep_state_attrs_set = frozenset(
+                cls._timestep_state_attrs
+            )
+        return
+
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        # rebinding an attribute of the timestep state invalidates it
+        if name in self._timestep_state_attrs_set:
+            self._timestep_state = None
+        return
+
     def __init__(
         self,
         control: Control,
@@ -103,6 +138,10 @@ class Process(Accessor):
 
         # netcdf output variables
         self._netcdf_initialized = False
+        self._netcdf_writer = None
+
+        # an optional PhaseTimer, set by a Model with timing enabled
+        self._timer = None
 
         self._itime_step = -1
 
@@ -216,9 +255,75 @@ class Process(Accessor):
         """A dictionary of initial values for each public variable."""
         return self.get_init_values()
 
+    @property
+    def timestep_state(self) -> Union[tuple, "TimestepState"]:  # noqa: F821
+        """The state taken by the timestep functions of the Process.
+
+        A namedtuple of the attributes in _timestep_state_attrs, with their
+        leading underscores removed from the field names. The fields refer
+        to (and not copy) the arrays of the Process, which the timestep
+        functions update in place:
+
+            self._advance_timestep(state)
+            self._calculate_timestep(
+                state, itime_step, month, doy, dowy, time_length
+            )
+
+        are the advance of the variables and the calculate of the Process
+        at a time step given by its index and calendar (see
+        Control.calendar). With calc_method "numba", the state is instead a
+        compiled TimestepState (see pywatershed.utils.numba_utils) with the
+        same fields, which is passed to the compiled timestep functions
+        without converting each field at each call. The state is created on
+        first access and again after any of its attributes is rebound (e.g.
+        by set_input_to_adapter).
+        """
+        if self._timestep_state is None:
+            state = self._timestep_state_type(
+                *(getattr(self, attr) for attr in self._timestep_state_attrs)
+            )
+            if self.timestep_numba is not None:
+                from ..utils.numba_utils import timestep_state_structref
+
+                state = timestep_state_structref(state)
+            self._timestep_state = state
+        return self._timestep_state
+
+    @property
+    def timestep_numba(self) -> Union[tuple, None]:
+        """The numba compiled timestep functions of the Process or None.
+
+        The tuple (advance, calculate) of the numba dispatchers of the
+        timestep functions (see timestep_state) when the Process
+        implements them and its calc_method is "numba", otherwise None.
+        """
+        calc_method = getattr(self, "_calc_method", None)
+        if (
+            self._timestep_state_attrs is None
+            or calc_method is None
+            or calc_method.lower() != "numba"
+        ):
+            return None
+        return (self._advance_timestep, self._calculate_timestep)
+
     def _set_params(self, parameters, discretization):
         if hasattr(self, "_params"):
             return
+        if ensemble_dim in parameters.dims.keys():
+            self._n_ensemble = parameters.dims[ensemble_dim]
+        else:
+            self._n_ensemble = 1
+        if self._n_ensemble > 1:
+            ensemble_dims = ensemble_spatial_dims + ensemble_shared_dims
+            unfoldable_dims = set(self.dimensions).difference(ensemble_dims)
+            if unfoldable_dims:
+                msg = (
+                    f"{self.name} can not be run as an ensemble: its "
+                    f"dimensions {sorted(unfoldable_dims)} can not be folded "
+                    f"in to the ensemble spatial dimensions "
+                    f"{ensemble_spatial_dims}"
+                )
+                raise ValueError(msg)
         param_keys = set(parameters.variables.keys())
         missing_params = set(self.parameters).difference(param_keys)
         if missing_params:
@@ -240,11 +345,19 @@ class Process(Accessor):
         else:
             self._params = parameters.subset(self.parameters)
 
+        if self._n_ensemble > 1:
+            # all members are calculated together over the spatial dims
+            self._params = self._params.flatten_ensemble(self._n_ensemble)
+
+        return
+
     def _initialize_self_variables(self, restart: bool = False):
         # dims
         for name in self.dimensions:
             if name == "ntime":
-                setattr(self, name, self.control.n_times)
+                # processes may hold a window of time, e.g. PRMSAtmosphere
+                n_times = getattr(self, "_n_time_chunk", self.control.n_times)
+                setattr(self, name, n_times)
             else:
                 setattr(self, name, self._params.dims[name])
 
@@ -310,7 +423,11 @@ class Process(Accessor):
 
     def _advance_inputs(self):
         for key, value in self._input_variables_dict.items():
-            value.advance()
+            if self._timer is None:
+                value.advance()
+            else:
+                with self._timer.time(f"{self.name}.{key}", "adapter"):
+                    value.advance()
             self[key][:] = value.current
 
         return
@@ -326,10 +443,13 @@ class Process(Accessor):
             if len([mm for mm in check_list if mm in ii_dims[0]]):
                 ii_dims = ii_dims[1:]
 
-            self._input_variables_dict[ii] = adapter_factory(
-                args[ii],
-                variable_name=ii,
-                control=args["control"],
+            self._input_variables_dict[ii] = self._adapt_ensemble(
+                ii,
+                adapter_factory(
+                    args[ii],
+                    variable_name=ii,
+                    control=args["control"],
+                ),
             )
             if self._input_variables_dict[ii]:
                 self[ii] = self._input_variables_dict[ii].current
@@ -359,6 +479,16 @@ class Process(Accessor):
 
         return
 
+    def _adapt_ensemble(self, input_variable_name: str, adapter: Adapter):
+        """Repeat inputs common to all ensemble members for each member."""
+        if self._n_ensemble == 1 or adapter is None:
+            return adapter
+        input_shape = self[input_variable_name].shape
+        adapter_shape = adapter.current.shape
+        if adapter_shape[-1] * self._n_ensemble == input_shape[-1]:
+            return AdapterEnsemble(adapter, self._n_ensemble)
+        return adapter
+
     def set_input_to_adapter(self, input_variable_name: str, adapter: Adapter):
         """Set input variables to adapter.current and manage the adapter.
 
@@ -368,6 +498,7 @@ class Process(Accessor):
             input_variable_name: key of input variable
             adapter: the Adapter for the input.
         """
+        adapter = self._adapt_ensemble(input_variable_name, adapter)
         self._input_variables_dict[input_variable_name] = adapter
         # can NOT use [:] on the LHS as we are relying on pointers between
         # boxes. [:] on the LHS here means it's not a pointer and then
@@ -527,6 +658,11 @@ class Process(Accessor):
 
         self._netcdf = {}
 
+        if self.control.options.get("netcdf_output_async", False):
+            self._netcdf_writer = NetCdfAsyncWriter()
+        else:
+            self._netcdf_writer = None
+
         if self._netcdf_separate:
             # make working directory
             self._netcdf_output_dir.mkdir(parents=True, exist_ok=True)
@@ -542,6 +678,7 @@ class Process(Accessor):
                     [variable_name],
                     {variable_name: self.meta[variable_name]},
                     {"process class": self.name},
+                    **self._netcdf_write_kwargs(),
                 )
 
         else:
@@ -558,12 +695,31 @@ class Process(Accessor):
                 self._netcdf_output_vars,
                 self.meta,
                 {"process class": self.name},
+                **self._netcdf_write_kwargs(),
             )
             for variable in the_out_vars[1:]:
                 self._netcdf[variable] = self._netcdf[initial_variable]
 
         return
 
+    def _netcdf_write_kwargs(self) -> dict:
+        """NetCdfWrite arguments from the control options.
+
+        Returns:
+            A dictionary of keyword arguments for NetCdfWrite
+        """
+        opts = self.control.options
+        kwargs = {"n_times": self.control.n_times}
+        if opts.get("netcdf_output_chunks", None) is not None:
+            kwargs["chunk_sizes"] = opts["netcdf_output_chunks"]
+        if opts.get("netcdf_output_complevel", None) is not None:
+            kwargs["complevel"] = opts["netcdf_output_complevel"]
+            kwargs["zlib"] = opts["netcdf_output_complevel"] > 0
+        if opts.get("netcdf_output_shuffle", None) is not None:
+            kwargs["shuffle"] = opts["netcdf_output_shuffle"]
+
+        return kwargs
+
     def _output_netcdf(self) -> None:
         """Output variable data to NetCDF for a time step.
 
@@ -572,22 +728,63 @@ class Process(Accessor):
 
         """
         if self._netcdf_initialized:
-            time_added = False
-            for variable in self.variables:
-                if (self._netcdf_output_vars is not None) and (
-                    variable not in self._netcdf_output_vars
-                ):
-                    continue
-                if not time_added or self._netcdf_separate:
-                    time_added = True
-                    self._netcdf[variable].add_simulation_time(
-                        self.control.itime_step, self.control.current_datetime
-                    )
-                self._netcdf[variable].add_data(
-                    variable,
+            if self._netcdf_writer is None:
+                self._write_netcdf_time_step(
+                    self.control.itime_step,
+                    self.control.current_datetime,
                     self._itime_step,
-                    getattr(self, variable),
+                    {
+                        variable: getattr(self, variable)
+                        for variable in self._netcdf_output_vars
+                    },
+                )
+            else:
+                # Snapshot the current values, the writer drains them later.
+                self._netcdf_writer.submit(
+                    self._write_netcdf_time_step,
+                    self.control.itime_step,
+                    self.control.current_datetime,
+                    self._itime_step,
+                    {
+                        variable: getattr(self, variable).copy()
+                        for variable in self._netcdf_output_vars
+                    },
+                )
+
+        return
+
+    def _write_netcdf_time_step(
+        self,
+        itime_step: int,
+        current_datetime: np.datetime64,
+        itime_step_data: int,
+        data: dict,
+    ) -> None:
+        """Write the data for a time step to NetCDF.
+
+        Args:
+            itime_step: the control time step index
+            current_datetime: the simulation time
+            itime_step_data: the time index for the data
+            data: a dictionary of variable names and values to write
+
+        Returns:
+            None
+        """
+        time_added = False
+        for variable in self.variables:
+            if variable not in data.keys():
+                continue
+            if not time_added or self._netcdf_separate:
+                time_added = True
+                self._netcdf[variable].add_simulation_time(
+                    itime_step, current_datetime
                 )
+            self._netcdf[variable].add_data(
+                variable,
+                itime_step_data,
+                data[variable],
+            )
 
         return
 
@@ -598,6 +795,9 @@ class Process(Accessor):
             None
         """
         if self._netcdf_initialized:
+            if self._netcdf_writer is not None:
+                self._netcdf_writer.close()
+
             for idx, variable in enumerate(self.variables):
                 if (self._netcdf_output_vars is not None) and (
                     variable not in self._netcdf_output_vars
@@ -655,3 +855,16 @@ class Process(Accessor):
                     raise ValueError(msg)
 
         return args["output_dir"], args["output_vars"], args["separate_files"]
+
+
+def _timestep_state_type(cls) -> type:
+    """The namedtuple type of the timestep state of a Process class."""
+    fields = [attr.lstrip("_") for attr in cls._timestep_state_attrs]
+    if len(set(fields)) != len(fields):
+        msg = f"Duplicate timestep state fields in {cls.__name__}: {fields}"
+        raise ValueError(msg)
+    state_type = namedtuple(f"{cls.__name__}State", fields)
+    # importable by pickle, as numba's on-disk cache requires
+    state_type.__module__ = cls.__module__
+    state_type.__qualname__ = f"{cls.__qualname__}._timestep_state_type"
+    return state_type
@@ -33,6 +33,31 @@ class TimeseriesArray:
         self._set_current()
         return
 
+    def set_window(
+        self,
+        itime_step_start: int,
+        data: np.ndarray = None,
+        time: np.ndarray = None,
+    ) -> None:
+        """Hold a window of time starting at a control time step.
+
+        Args:
+            itime_step_start: the control time step of the first time in data
+            data: optional new data for the window, time is the first
+                dimension
+            time: optional new times for the window
+        """
+        if data is not None:
+            self.data = data
+        if time is not None:
+            self.time = time
+        self._init_time_ind = -itime_step_start
+        return
+
+    def data_window(self, start: int, end: int) -> np.ndarray:
+        """The data for the time steps start to end (exclusive)."""
+        return self.data[start:end]
+
     def _set_current(self):
         if not self.control._current_time:
             # then data is all nans, just use 0
@@ -1,20 +1,25 @@
-from .prms_canopy import PRMSCanopy
-from .prms_channel import PRMSChannel
-from .prms_channel_flow_graph import (
-    HruSegmentFlowAdapter,
-    HruSegmentFlowExchange,
-    PRMSChannelFlowNode,
-    PRMSChannelFlowNodeMaker,
-    prms_channel_flow_graph_postprocess,
-    prms_channel_flow_graph_to_model_dict,
-)
-from .prms_groundwater import PRMSGroundwater
-from .prms_groundwater_no_dprst import PRMSGroundwaterNoDprst
-from .prms_runoff import PRMSRunoff
-from .prms_runoff_no_dprst import PRMSRunoffNoDprst
-from .prms_snow import PRMSSnow
-from .prms_soilzone import PRMSSoilzone
-from .prms_soilzone_no_dprst import PRMSSoilzoneNoDprst
+from ..utils.lazy_loader import lazy_attributes
+
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "PRMSCanopy": ".prms_canopy",
+    "PRMSChannel": ".prms_channel",
+    "HruSegmentFlowAdapter": ".prms_channel_flow_graph",
+    "HruSegmentFlowExchange": ".prms_channel_flow_graph",
+    "PRMSChannelFlowNode": ".prms_channel_flow_graph",
+    "PRMSChannelFlowNodeMaker": ".prms_channel_flow_graph",
+    "prms_channel_flow_graph_postprocess": ".prms_channel_flow_graph",
+    "prms_channel_flow_graph_to_model_dict": ".prms_channel_flow_graph",
+    "PRMSGroundwater": ".prms_groundwater",
+    "PRMSGroundwaterNoDprst": ".prms_groundwater_no_dprst",
+    "PRMSRunoff": ".prms_runoff",
+    "PRMSRunoffNoDprst": ".prms_runoff_no_dprst",
+    "PRMSSnow": ".prms_snow",
+    "PRMSSoilzone": ".prms_soilzone",
+    "PRMSSoilzoneNoDprst": ".prms_soilzone_no_dprst",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
 
 __all__ = (
     "prms_channel_flow_graph_postprocess",
@@ -3,6 +3,7 @@ from warnings import warn
 
 import numpy as np
 from numba import prange
+from numba.extending import register_jitable
 
 from ..base.adapter import adaptable
 from ..base.conservative_process import ConservativeProcess
@@ -13,10 +14,10 @@ from ..constants import (
     dnearzero,
     nan,
     nearzero,
-    numba_num_threads,
     zero,
 )
 from ..parameters import Parameters
+from ..utils.numba_utils import nb_parallel, njit_cached, print_jit_message
 
 try:
     from ..prms_canopy_f import canopy
@@ -73,6 +74,38 @@ class PRMSCanopy(ConservativeProcess):
         load_n_time_batches: not-implemented
     """
 
+    _timestep_state_attrs = (
+        "cov_type",
+        "covden_sum",
+        "covden_win",
+        "freeh2o_prev",
+        "hru_intcpevap",
+        "hru_intcpstor",
+        "hru_intcpstor_change",
+        "hru_intcpstor_old",
+        "hru_ppt",
+        "hru_rain",
+        "hru_snow",
+        "_hru_type",
+        "intcp_changeover",
+        "intcp_evap",
+        "intcp_form",
+        "intcp_stor",
+        "intcp_transp_on",
+        "net_ppt",
+        "net_rain",
+        "net_snow",
+        "nhru",
+        "pk_ice_prev",
+        "potet",
+        "potet_sublim",
+        "pptmix",
+        "snow_intcp",
+        "srain_intcp",
+        "transp_on",
+        "wrain_intcp",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -190,15 +223,7 @@ class PRMSCanopy(ConservativeProcess):
             self._calc_method = "numba"
 
         if self._calc_method.lower() in ["numba"]:
-            import numba as nb
-
-            numba_msg = f"{self.name} jit compiling with numba "
-            nb_parallel = (numba_num_threads is not None) and (
-                numba_num_threads > 1
-            )
-            if nb_parallel:
-                numba_msg += f"and using {numba_num_threads} threads"
-            print(numba_msg, flush=True)
+            print_jit_message(self.name, nb_parallel)
 
             # JLM: note. I gave up on specifying signatures because it
             #      appears impossible/undocumented how to specify the type
@@ -222,7 +247,6 @@ class PRMSCanopy(ConservativeProcess):
             #     ),
             #     fastmath=True,
             # )(self._intercept)
-            self._intercept = nb.njit(fastmath=True)(self._intercept)
 
             # self._calculate_numba = nb.njit(
             #     nb.types.Tuple(
@@ -279,19 +303,23 @@ class PRMSCanopy(ConservativeProcess):
             #     ),
             #     fastmath=True,
             # )(self._calculate_procedural)
-            self._calculate_canopy = nb.njit(
-                fastmath=True, parallel=nb_parallel
-            )(self._calculate_numpy)
+            self._advance_timestep = njit_cached(self._advance_timestep_numpy)
+            self._calculate_timestep = njit_cached(
+                self._calculate_timestep_numpy,
+                fastmath=True,
+                parallel=nb_parallel,
+            )
 
         elif self._calc_method.lower() == "fortran":
-            pass
+            self._advance_timestep = self._advance_timestep_numpy
             # fortran has a different call signature in the last agument
             # because the intercept function is not passed.
             # so it is handled with an if statement at call time.
             # self._calculate_gw = _calculate_fortran
 
         else:
-            self._calculate_canopy = self._calculate_numpy
+            self._advance_timestep = self._advance_timestep_numpy
+            self._calculate_timestep = self._calculate_timestep_numpy
 
         return
 
@@ -301,7 +329,12 @@ class PRMSCanopy(ConservativeProcess):
             None
 
         """
-        self.hru_intcpstor_old[:] = self.hru_intcpstor
+        self._advance_timestep(self.timestep_state)
+        return
+
+    @staticmethod
+    def _advance_timestep_numpy(state) -> None:
+        state.hru_intcpstor_old[:] = state.hru_intcpstor
         return
 
     def _calculate(self, time_length):
@@ -315,57 +348,13 @@ class PRMSCanopy(ConservativeProcess):
 
         """
         if self._calc_method.lower() != "fortran":
-            (
-                self.intcp_evap[:],
-                self.intcp_form[:],
-                self.intcp_stor[:],
-                self.net_rain[:],
-                self.net_snow[:],
-                self.pptmix[:],
-                self.net_ppt[:],
-                self.hru_intcpstor[:],
-                self.hru_intcpevap[:],
-                self.intcp_changeover[:],
-                self.intcp_transp_on[:],
-            ) = self._calculate_canopy(
-                nhru=np.int32(self.nhru),
-                cov_type=self.cov_type,
-                covden_sum=self.covden_sum,
-                covden_win=self.covden_win,
-                hru_intcpstor=self.hru_intcpstor,
-                hru_intcpevap=self.hru_intcpevap,
-                hru_ppt=self.hru_ppt,
-                hru_rain=self.hru_rain,
-                hru_snow=self.hru_snow,
-                intcp_changeover=self.intcp_changeover,
-                intcp_evap=self.intcp_evap,
-                intcp_stor=self.intcp_stor,
-                intcp_transp_on=self.intcp_transp_on,
-                net_ppt=self.net_ppt,
-                net_rain=self.net_rain,
-                net_snow=self.net_snow,
-                pptmix=self.pptmix,
-                pk_ice_prev=self.pk_ice_prev,
-                freeh2o_prev=self.freeh2o_prev,
-                potet=self.potet,
-                potet_sublim=self.potet_sublim,
-                snow_intcp=self.snow_intcp,
-                srain_intcp=self.srain_intcp,
-                transp_on=self.transp_on,
-                wrain_intcp=self.wrain_intcp,
-                time_length=time_length,
-                hru_type=self._hru_type,
-                nearzero=nearzero,
-                dnearzero=dnearzero,
-                baresoil=np.int32(BARESOIL),
-                grasses=np.int32(GRASSES),
-                land=np.int32(LAND),
-                lake=np.int32(LAKE),
-                rain=np.int32(RAIN),
-                snow=np.int32(SNOW),
-                off=np.int32(OFF),
-                active=np.int32(ACTIVE),
-                intercept=self._intercept,
+            self._calculate_timestep(
+                self.timestep_state,
+                self.control.itime_step,
+                self.control.current_month,
+                self.control.current_doy,
+                self.control.current_dowy,
+                time_length,
             )
 
         else:
@@ -420,11 +409,65 @@ class PRMSCanopy(ConservativeProcess):
                 active=np.int32(ACTIVE),
             )
 
-        # <
-        self.hru_intcpstor_change[:] = (
-            self.hru_intcpstor - self.hru_intcpstor_old
+            self.hru_intcpstor_change[:] = (
+                self.hru_intcpstor - self.hru_intcpstor_old
+            )
+
+        return
+
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        _calculate_canopy(
+            nhru=np.int32(state.nhru),
+            cov_type=state.cov_type,
+            covden_sum=state.covden_sum,
+            covden_win=state.covden_win,
+            hru_intcpstor=state.hru_intcpstor,
+            hru_intcpevap=state.hru_intcpevap,
+            hru_ppt=state.hru_ppt,
+            hru_rain=state.hru_rain,
+            hru_snow=state.hru_snow,
+            intcp_changeover=state.intcp_changeover,
+            intcp_evap=state.intcp_evap,
+            intcp_form=state.intcp_form,
+            intcp_stor=state.intcp_stor,
+            intcp_transp_on=state.intcp_transp_on,
+            net_ppt=state.net_ppt,
+            net_rain=state.net_rain,
+            net_snow=state.net_snow,
+            pptmix=state.pptmix,
+            pk_ice_prev=state.pk_ice_prev,
+            freeh2o_prev=state.freeh2o_prev,
+            potet=state.potet,
+            potet_sublim=state.potet_sublim,
+            snow_intcp=state.snow_intcp,
+            srain_intcp=state.srain_intcp,
+            transp_on=state.transp_on,
+            wrain_intcp=state.wrain_intcp,
+            time_length=time_length,
+            hru_type=state.hru_type,
+            nearzero=nearzero,
+            dnearzero=dnearzero,
+            baresoil=np.int32(BARESOIL),
+            grasses=np.int32(GRASSES),
+            land=np.int32(LAND),
+            lake=np.int32(LAKE),
+            rain=np.int32(RAIN),
+            snow=np.int32(SNOW),
+            off=np.int32(OFF),
+            active=np.int32(ACTIVE),
         )
 
+        state.hru_intcpstor_change[:] = (
+            state.hru_intcpstor - state.hru_intcpstor_old
+        )
         return
 
     @staticmethod
@@ -440,6 +483,7 @@ class PRMSCanopy(ConservativeProcess):
         hru_snow,
         intcp_changeover,
         intcp_evap,
+        intcp_form,
         intcp_stor,
         intcp_transp_on,
         net_ppt,
@@ -466,7 +510,6 @@ class PRMSCanopy(ConservativeProcess):
         snow,
         off,
         active,
-        intercept,
     ):
         # TODO: would be nice to alphabetize the arguments
         #       probably while keeping constants at the end.
@@ -475,7 +518,6 @@ class PRMSCanopy(ConservativeProcess):
         #       Keep the f90 call signature consistent with the args in
         #       python/numba.
 
-        intcp_form = np.full_like(hru_rain, np.nan, dtype="int32")
         for i in prange(nhru):
             netrain = hru_rain[i]
             netsnow = hru_snow[i]
@@ -535,10 +577,10 @@ class PRMSCanopy(ConservativeProcess):
                     if cov > 0.0:
                         # IF ( Cov_type(i)>GRASSES ) THEN
                         if cov_type[i] > GRASSES:
-                            # intercept(
+                            # _intercept(
                             #     Hru_rain(i), stor_max_rain, cov, intcpstor,
                             #     netrain)
-                            intcpstor, netrain = intercept(
+                            intcpstor, netrain = _intercept(
                                 hru_rain[i],
                                 stor_max_rain,
                                 cov,
@@ -554,7 +596,7 @@ class PRMSCanopy(ConservativeProcess):
                             if (
                                 pk_ice_prev[i] + freeh2o_prev[i]
                             ) < dnearzero and netsnow < nearzero:
-                                intcpstor, netrain = intercept(
+                                intcpstor, netrain = _intercept(
                                     hru_rain[i],
                                     stor_max_rain,
                                     cov,
@@ -566,7 +608,7 @@ class PRMSCanopy(ConservativeProcess):
             if hru_snow[i] > 0.0:
                 if cov > 0.0:
                     if cov_type[i] > GRASSES:
-                        intcpstor, netsnow = intercept(
+                        intcpstor, netsnow = _intercept(
                             hru_snow[i],
                             snow_intcp[i],
                             cov,
@@ -633,19 +675,7 @@ class PRMSCanopy(ConservativeProcess):
 
             intcp_changeover[i] = changeover + extra_water
 
-        return (
-            intcp_evap,
-            intcp_form,
-            intcp_stor,
-            net_rain,
-            net_snow,
-            pptmix,
-            net_ppt,
-            hru_intcpstor,
-            hru_intcpevap,
-            intcp_changeover,
-            intcp_transp_on,
-        )
+        return
 
     @staticmethod
     def _intercept(precip, stor_max, cov, intcp_stor, net_precip):
@@ -667,3 +697,12 @@ class PRMSCanopy(ConservativeProcess):
                 net_precip[i] += (intcp_stor[i] - stor_max[i]) * covden[i]
                 intcp_stor[i] = stor_max[i]
         return
+
+
+# The kernels call these helpers as module-level functions, compiled with
+# (and cached on disk with) the calling kernel, see
+# pywatershed.utils.numba_utils.
+_intercept = register_jitable(fastmath=True)(PRMSCanopy._intercept)
+_calculate_canopy = register_jitable(fastmath=True, parallel=nb_parallel)(
+    PRMSCanopy._calculate_numpy
+)
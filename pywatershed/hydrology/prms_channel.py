@@ -3,12 +3,15 @@ from warnings import warn
 
 import networkx as nx
 import numpy as np
+from numba import prange
 
 from ..base.adapter import adaptable
 from ..base.conservative_process import ConservativeProcess
 from ..base.control import Control
-from ..constants import SegmentType, nan, zero
+from ..constants import SegmentType, nan, numba_num_threads, zero
 from ..parameters import Parameters
+from ..utils.hru_segment import HruSegmentMap
+from ..utils.numba_utils import njit_cached, print_jit_message
 
 try:
     from ..prms_channel_f import calc_muskingum_mann as _calculate_fortran
@@ -93,6 +96,13 @@ class PRMSChannel(ConservativeProcess):
             before raising the error to give you information. If "no" is
             selected then no parameters are adjusted and there will be no
             warnings or errors.
+        routing_order: one of ["serial", "wavefront"]. None defaults to
+            "serial" which routes segments one at a time in topological
+            order. "wavefront" groups segments into topological levels
+            whose segments are independent of each other and routes each
+            level in parallel (numba prange) when more than one numba thread
+            is available. Results are identical to "serial". Not available
+            with calc_method="fortran".
         verbose: Print extra information or not?
     """
 
@@ -107,6 +117,7 @@ class PRMSChannel(ConservativeProcess):
         budget_type: Literal["defer", None, "warn", "error"] = "defer",
         calc_method: Literal["fortran", "numba", "numpy"] = None,
         adjust_parameters: Literal["warn", "error", "no"] = "warn",
+        routing_order: Literal["serial", "wavefront"] = None,
         verbose: bool = None,
     ) -> None:
         super().__init__(
@@ -198,6 +209,7 @@ class PRMSChannel(ConservativeProcess):
 
         # convert prms data to zero-based
         self._hru_segment = self.hru_segment - 1
+        self._hru_segment_map = HruSegmentMap(self._hru_segment, self.nsegment)
         self._tosegment = self.tosegment - 1
         self._tosegment = self._tosegment.astype("int64")
 
@@ -237,6 +249,38 @@ class PRMSChannel(ConservativeProcess):
 
         self._segment_order = np.array(segment_order, dtype="int64")
 
+        # Wavefronts: group segments by topological level, segments in a
+        # level only receive flow from segments in previous levels. The
+        # upstream segments of each segment are kept in the order they
+        # appear in _segment_order so that upstream inflows are summed in
+        # the same order as the serial routing.
+        seg_level = np.zeros(self.nsegment, dtype="int64")
+        upstream_lists = [[] for iseg in range(self.nsegment)]
+        for iseg in self._segment_order:
+            tosegment = self._tosegment[iseg]
+            if tosegment < 0:
+                continue
+            upstream_lists[tosegment].append(iseg)
+            seg_level[tosegment] = max(
+                seg_level[tosegment], seg_level[iseg] + 1
+            )
+
+        self._upstream_ptr = np.zeros(self.nsegment + 1, dtype="int64")
+        self._upstream_ptr[1:] = np.cumsum([len(ll) for ll in upstream_lists])
+        self._upstream_segs = np.array(
+            [iseg for ll in upstream_lists for iseg in ll], dtype="int64"
+        )
+
+        # stable sort keeps the serial order within each level
+        self._level_segs = self._segment_order[
+            np.argsort(seg_level[self._segment_order], kind="stable")
+        ]
+        n_levels = seg_level.max() + 1 if self.nsegment else 0
+        self._level_ptr = np.zeros(n_levels + 1, dtype="int64")
+        self._level_ptr[1:] = np.cumsum(
+            np.bincount(seg_level, minlength=n_levels)
+        )
+
         # calculate the Muskingum parameters
         velocity = (
             (
@@ -352,6 +396,14 @@ class PRMSChannel(ConservativeProcess):
         if self._calc_method is None:
             self._calc_method = "numba"
 
+        if self._routing_order is None:
+            self._routing_order = "serial"
+
+        if self._routing_order not in ["serial", "wavefront"]:
+            raise ValueError(
+                f"Invalid routing_order={self._routing_order} for {self.name}"
+            )
+
         avail_methods = ["numpy", "numba", "fortran"]
         fortran_msg = ""
         if self._calc_method == "fortran" and not has_prmschannel_f:
@@ -370,11 +422,25 @@ class PRMSChannel(ConservativeProcess):
         if self._calc_method.lower() == "numba":
             import numba as nb
 
-            numba_msg = f"{self.name} jit compiling with numba "
-            # this method can not be parallelized (? true?)
-            print(numba_msg, flush=True)
+            if self._routing_order == "wavefront":
+                # segments within a wavefront are routed in parallel
+                nb_parallel = (numba_num_threads is not None) and (
+                    numba_num_threads > 1
+                )
+                print_jit_message(self.name, nb_parallel)
+
+                self._muskingum_mann_wavefront = njit_cached(
+                    self._muskingum_mann_wavefront_numpy,
+                    fastmath=True,
+                    parallel=nb_parallel,
+                )
+                self._muskingum_mann = self._muskingum_mann_wavefront_args
+                return
 
-            self._muskingum_mann = nb.njit(
+            print_jit_message(self.name, False)
+
+            self._muskingum_mann = njit_cached(
+                self._muskingum_mann_numpy,
                 nb.types.UniTuple(nb.float64[:], 7)(
                     nb.int64[:],  # _segment_order
                     nb.int64[:],  # _tosegment
@@ -389,14 +455,54 @@ class PRMSChannel(ConservativeProcess):
                 ),
                 fastmath=True,
                 parallel=False,
-            )(self._muskingum_mann_numpy)
+            )
 
         elif self._calc_method.lower() == "fortran":
+            if self._routing_order == "wavefront":
+                raise ValueError(
+                    "routing_order='wavefront' is not available with "
+                    "calc_method='fortran'"
+                )
             self._muskingum_mann = _calculate_fortran
 
+        elif self._routing_order == "wavefront":
+            self._muskingum_mann_wavefront = (
+                self._muskingum_mann_wavefront_numpy
+            )
+            self._muskingum_mann = self._muskingum_mann_wavefront_args
+
         else:
             self._muskingum_mann = self._muskingum_mann_numpy
 
+    def _muskingum_mann_wavefront_args(
+        self,
+        segment_order,
+        to_segment,
+        seg_lateral_inflow,
+        seg_inflow0,
+        outflow_ts,
+        tsi,
+        ts,
+        c0,
+        c1,
+        c2,
+    ):
+        # Adapt the wavefront solution to the arguments of the serial one
+        return self._muskingum_mann_wavefront(
+            self._level_ptr,
+            self._level_segs,
+            self._upstream_ptr,
+            self._upstream_segs,
+            seg_lateral_inflow,
+            seg_inflow0,
+            outflow_ts,
+            tsi,
+            ts,
+            c0,
+            c1,
+            c2,
+        )
+
     def _advance_variables(self) -> None:
         self._seg_inflow0[:] = self._seg_inflow
         return
@@ -407,34 +513,30 @@ class PRMSChannel(ConservativeProcess):
         # This could vary with timestep so leave here
         s_per_time = self.control.time_step_seconds
 
-        # WRITE a function for this?
         # calculate lateral flow term
-        self.seg_lateral_inflow[:] = 0.0
-        for ihru in range(self.nhru):
-            iseg = self._hru_segment[ihru]
-            if iseg < 0:
-                # This is bad, selective handling of fluxes is not cool,
-                # mass is being discarded in a way that has to be coordinated
-                # with other parts of the code.
-                # This code shuold be removed evenutally.
-                self.channel_sroff_vol[ihru] = zero
-                self.channel_ssres_flow_vol[ihru] = zero
-                self.channel_gwres_flow_vol[ihru] = zero
-                continue
-
-            else:
-                self.channel_sroff_vol[ihru] = self.sroff_vol[ihru]
-                self.channel_ssres_flow_vol[ihru] = self.ssres_flow_vol[ihru]
-                self.channel_gwres_flow_vol[ihru] = self.gwres_flow_vol[ihru]
-
-            # cubicfeet to cfs
-            lateral_inflow = (
-                self.channel_sroff_vol[ihru]
-                + self.channel_ssres_flow_vol[ihru]
-                + self.channel_gwres_flow_vol[ihru]
-            ) / (s_per_time)
+        connected = self._hru_segment_map.connected
+        # This is bad, selective handling of fluxes is not cool,
+        # mass is being discarded in a way that has to be coordinated
+        # with other parts of the code.
+        # This code shuold be removed evenutally.
+        self.channel_sroff_vol[:] = np.where(connected, self.sroff_vol, zero)
+        self.channel_ssres_flow_vol[:] = np.where(
+            connected, self.ssres_flow_vol, zero
+        )
+        self.channel_gwres_flow_vol[:] = np.where(
+            connected, self.gwres_flow_vol, zero
+        )
 
-            self.seg_lateral_inflow[iseg] += lateral_inflow
+        # cubicfeet to cfs
+        self._hru_segment_map.aggregate(
+            (
+                self.channel_sroff_vol
+                + self.channel_ssres_flow_vol
+                + self.channel_gwres_flow_vol
+            )
+            / (s_per_time),
+            out=self.seg_lateral_inflow,
+        )
 
         # solve muskingum_mann routing
         (
@@ -599,3 +701,114 @@ class PRMSChannel(ConservativeProcess):
             outflow_ts,
             seg_current_sum,
         )
+
+    @staticmethod
+    def _muskingum_mann_wavefront_numpy(
+        level_ptr: np.ndarray,
+        level_segs: np.ndarray,
+        upstream_ptr: np.ndarray,
+        upstream_segs: np.ndarray,
+        seg_lateral_inflow: np.ndarray,
+        seg_inflow0: np.ndarray,
+        outflow_ts: np.ndarray,
+        tsi: np.ndarray,
+        ts: np.ndarray,
+        c0: np.ndarray,
+        c1: np.ndarray,
+        c2: np.ndarray,
+    ) -> Tuple[
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+        np.ndarray,
+    ]:
+        """
+        Muskingum routing function by wavefronts of independent segments
+
+        This gives identical results to _muskingum_mann_numpy. Rather than
+        each segment adding its outflow to its downstream segment, each
+        segment gathers the outflows of its upstream segments (in the serial
+        order) so that the segments of a wavefront can be routed in parallel.
+
+        Args:
+            level_ptr: start index of each wavefront in level_segs (CSR)
+            level_segs: segments ordered by wavefront
+            upstream_ptr: start index of each segment's upstream segments in
+                upstream_segs (CSR)
+            upstream_segs: the upstream segments of each segment
+            seg_lateral_inflow: segment lateral inflow
+            seg_inflow0: previous segment inflow variable (internal
+                calculations)
+            outflow_ts: outflow timeseries variable (internal calculations)
+            tsi: integer flood wave travel time
+            ts: float version of integer flood wave travel time
+            c0: Muskingum c0 variable
+            c1: Muskingum c1 variable
+            c2: Muskingum c2 variable
+
+        Returns:
+            See _muskingum_mann_numpy.
+        """
+        seg_inflow = seg_inflow0 * zero
+        seg_outflow = seg_inflow0 * zero
+        inflow_ts = seg_inflow0 * zero
+        seg_current_sum = seg_inflow0 * zero
+        seg_upstream_inflow = seg_inflow0 * zero
+
+        n_levels = len(level_ptr) - 1
+        for ihr in range(24):
+            for ilevel in range(n_levels):
+                for kk in prange(level_ptr[ilevel], level_ptr[ilevel + 1]):
+                    jseg = level_segs[kk]
+
+                    # upstream segments are in previous wavefronts
+                    upstream_inflow = 0.0
+                    u_start = upstream_ptr[jseg]
+                    u_end = upstream_ptr[jseg + 1]
+                    for uu in range(u_start, u_end):
+                        upstream_inflow += outflow_ts[upstream_segs[uu]]
+                    seg_upstream_inflow[jseg] = upstream_inflow
+
+                    seg_current_inflow = (
+                        seg_lateral_inflow[jseg] + seg_upstream_inflow[jseg]
+                    )
+                    seg_inflow[jseg] += seg_current_inflow
+                    inflow_ts[jseg] += seg_current_inflow
+                    seg_current_sum[jseg] += seg_upstream_inflow[jseg]
+
+                    remainder = (ihr + 1) % tsi[jseg]
+                    if remainder == 0:
+                        # segment routed on current hour
+                        inflow_ts[jseg] /= ts[jseg]
+
+                        if tsi[jseg] > 0:
+                            # Muskingum routing equation
+                            outflow_ts[jseg] = (
+                                inflow_ts[jseg] * c0[jseg]
+                                + seg_inflow0[jseg] * c1[jseg]
+                                + outflow_ts[jseg] * c2[jseg]
+                            )
+                        else:
+                            outflow_ts[jseg] = inflow_ts[jseg]
+
+                        seg_inflow0[jseg] = inflow_ts[jseg]
+                        inflow_ts[jseg] = 0.0
+
+                    seg_outflow[jseg] += outflow_ts[jseg]
+
+        seg_outflow /= 24.0
+        seg_inflow /= 24.0
+        seg_upstream_inflow = seg_current_sum.copy() / 24.0
+
+        return (
+            seg_upstream_inflow,
+            seg_inflow0,
+            seg_inflow,
+            seg_outflow,
+            inflow_ts,
+            outflow_ts,
+            seg_current_sum,
+        )
@@ -10,12 +10,14 @@ from pywatershed.base.control import Control
 from pywatershed.base.flow_graph import (
     FlowGraph,
     FlowNode,
+    FlowNodeBatch,
     FlowNodeMaker,
     inflow_exchange_factory,
 )
 from pywatershed.constants import SegmentType, nan, zero
 from pywatershed.hydrology.prms_channel import PRMSChannel
 from pywatershed.parameters import Parameters
+from pywatershed.utils.hru_segment import HruSegmentMap
 
 
 class PRMSChannelFlowNode(FlowNode):
@@ -149,6 +151,128 @@ class PRMSChannelFlowNode(FlowNode):
         return zero
 
 
+class PRMSChannelFlowNodeBatch(FlowNodeBatch):
+    """A FlowNodeBatch for the Muskingum-Mann method of PRMSChannel
+
+    This is a :class:`FlowNodeBatch` implementation of :class:`PRMSChannel`
+    where the solution is the so-called Muskingum-Mann method. The data for
+    all nodes in the batch are held in arrays and the subtimestep solution of
+    each node is identical to that of :class:`PRMSChannelFlowNode`.
+
+    See :class:`FlowGraph` for discussion and a worked example.
+    """
+
+    def __init__(
+        self,
+        control: Control,
+        tsi: np.ndarray,
+        ts: np.ndarray,
+        c0: np.ndarray,
+        c1: np.ndarray,
+        c2: np.ndarray,
+        calc_method: Literal["numba", "numpy"] = None,
+    ):
+        """Initialize a PRMSChannelFlowNodeBatch.
+
+        Args:
+          control: A :class:`Control` object.
+          tsi: Parameter of :class:`PRMSChannel` for the nodes in the batch.
+          ts: Parameter of :class:`PRMSChannel` for the nodes in the batch.
+          c0: Parameter of :class:`PRMSChannel` for the nodes in the batch.
+          c1: Parameter of :class:`PRMSChannel` for the nodes in the batch.
+          c2: Parameter of :class:`PRMSChannel` for the nodes in the batch.
+          calc_method: One of "numba" (default), "numpy".
+        """
+        self.control = control
+
+        if calc_method not in [None, "numba", "numpy"]:
+            raise ValueError(f"Invalid choice of calc_method: {calc_method}")
+        self._calc_method = calc_method
+
+        self._tsi = np.ascontiguousarray(tsi, dtype="int64")
+        self._ts = np.ascontiguousarray(ts, dtype="float64")
+        self._c0 = np.ascontiguousarray(c0, dtype="float64")
+        self._c1 = np.ascontiguousarray(c1, dtype="float64")
+        self._c2 = np.ascontiguousarray(c2, dtype="float64")
+
+        self.nnodes = len(self._tsi)
+        self._outflow_ts = np.zeros(self.nnodes)
+        self._seg_inflow0 = np.zeros(self.nnodes)
+        self._seg_inflow = np.zeros(self.nnodes)
+        self._inflow_ts = np.zeros(self.nnodes)
+        self._seg_outflow = np.zeros(self.nnodes)
+        self.seg_stor_change = np.zeros(self.nnodes)
+
+        self._state = (
+            self._tsi,
+            self._ts,
+            self._c0,
+            self._c1,
+            self._c2,
+            self._seg_inflow0,
+            self._seg_inflow,
+            self._inflow_ts,
+            self._seg_outflow,
+            self._outflow_ts,
+        )
+        return
+
+    def prepare_timestep(self):
+        self._seg_inflow[:] = zero
+        self._seg_outflow[:] = zero
+        self._inflow_ts[:] = zero
+        return
+
+    def calculate_subtimestep(
+        self, ihr, index, inflow_upstream, inflow_lateral
+    ):
+        return _calculate_subtimestep_batch_numpy(
+            ihr, index, inflow_upstream, inflow_lateral, self._state
+        )
+
+    @property
+    def calculate_subtimestep_numba(self):
+        if self._calc_method == "numpy":
+            return None
+        return _calculate_subtimestep_batch_numba
+
+    def finalize_timestep(self):
+        # get rid of the magic 24 with argument?
+        self._seg_outflow[:] = self._seg_outflow / 24.0
+        self._seg_inflow[:] = self._seg_inflow / 24.0
+        self.seg_stor_change[:] = self._seg_inflow - self._seg_outflow
+        return
+
+    def advance(self):
+        self._seg_inflow0[:] = self._seg_inflow
+        return
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def outflow(self):
+        """The average outflow over the timestep in cubic feet per second."""
+        return self._seg_outflow
+
+    @property
+    def storage_change(self):
+        """The volumetric storage change in cubic feet."""
+        return self.seg_stor_change
+
+    @property
+    def storage(self):
+        """The volumetric storage in millions of cubic feet.
+        Not defined for PRMSChannel.
+        """
+        return np.full(self.nnodes, nan)
+
+    @property
+    def sink_source(self):
+        return np.zeros(self.nnodes)
+
+
 class PRMSChannelFlowNodeMaker(FlowNodeMaker):
     """A FlowNodeMaker for PRMSChannelFlowNodes.
 
@@ -199,6 +323,17 @@ class PRMSChannelFlowNodeMaker(FlowNodeMaker):
             calc_method=self._calc_method,
         )
 
+    def get_node_batch(self, control, indices) -> PRMSChannelFlowNodeBatch:
+        return PRMSChannelFlowNodeBatch(
+            control=control,
+            tsi=self._tsi[indices],
+            ts=self._ts[indices],
+            c0=self._c0[indices],
+            c1=self._c1[indices],
+            c2=self._c2[indices],
+            calc_method=self._calc_method,
+        )
+
     def _set_data(self, discretization, parameters):
         self._parameters = parameters
         self._discretization = discretization
@@ -266,38 +401,15 @@ class PRMSChannelFlowNodeMaker(FlowNodeMaker):
         Kcoef = np.where(Kcoef < 0.01, 0.01, Kcoef)
         self._Kcoef = np.where(Kcoef > 24.0, 24.0, Kcoef)
 
-        self._ts = np.ones(self.nsegment, dtype=float)
-        self._tsi = np.ones(self.nsegment, dtype="int64")
-
-        # todo: vectorize this
-        for iseg in range(self.nsegment):
-            k = self._Kcoef[iseg]
-            if k < 1.0:
-                self._tsi[iseg] = -1
-            elif k < 2.0:
-                self._ts[iseg] = 1.0
-                self._tsi[iseg] = 1
-            elif k < 3.0:
-                self._ts[iseg] = 2.0
-                self._tsi[iseg] = 2
-            elif k < 4.0:
-                self._ts[iseg] = 3.0
-                self._tsi[iseg] = 3
-            elif k < 6.0:
-                self._ts[iseg] = 4.0
-                self._tsi[iseg] = 4
-            elif k < 8.0:
-                self._ts[iseg] = 6.0
-                self._tsi[iseg] = 6
-            elif k < 12.0:
-                self._ts[iseg] = 8.0
-                self._tsi[iseg] = 8
-            elif k < 24.0:
-                self._ts[iseg] = 12.0
-                self._tsi[iseg] = 12
-            else:
-                self._ts[iseg] = 24.0
-                self._tsi[iseg] = 24
+        # travel time rounded down to an even divisor of 24 hours,
+        # Kcoef < 1 is flagged with tsi = -1 and routed without storage
+        ts_bins = np.array([1.0, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 24.0])
+        ts_upper = np.array([2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 24.0])
+        self._ts = ts_bins[np.searchsorted(ts_upper, self._Kcoef, "right")]
+        self._tsi = self._ts.astype("int64")
+        wh_short = self._Kcoef < 1.0
+        self._ts[wh_short] = 1.0
+        self._tsi[wh_short] = -1
 
         d = self._Kcoef - (self._Kcoef * self.x_coef) + (0.5 * self._ts)
         d = np.where(np.abs(d) < 1e-6, 0.0001, d)
@@ -395,11 +507,60 @@ _calculate_subtimestep_numba = nb.njit(
         nb.float64,  # _c1
         nb.float64,  # _c2
     ),
-    fastmath=True,
+    cache=True,
     parallel=False,
 )(_calculate_subtimestep_numpy)
 
 
+def _calculate_subtimestep_batch_numpy(
+    ihr, index, inflow_upstream, inflow_lateral, state
+):
+    (
+        _tsi,
+        _ts,
+        _c0,
+        _c1,
+        _c2,
+        _seg_inflow0,
+        _seg_inflow,
+        _inflow_ts,
+        _seg_outflow,
+        _outflow_ts,
+    ) = state
+
+    seg_current_inflow = inflow_lateral + inflow_upstream
+    _seg_inflow[index] += seg_current_inflow
+    _inflow_ts[index] += seg_current_inflow
+
+    remainder = (ihr + 1) % _tsi[index]
+    if remainder == 0:
+        # segment routed on current hour
+        _inflow_ts[index] /= _ts[index]
+
+        if _tsi[index] > 0:
+            # Muskingum routing equation
+            _outflow_ts[index] = (
+                _inflow_ts[index] * _c0[index]
+                + _seg_inflow0[index] * _c1[index]
+                + _outflow_ts[index] * _c2[index]
+            )
+        else:
+            _outflow_ts[index] = _inflow_ts[index]
+
+        _seg_inflow0[index] = _inflow_ts[index]
+        _inflow_ts[index] = 0.0
+
+    _seg_outflow[index] += _outflow_ts[index]
+
+    return _outflow_ts[index]
+
+
+_calculate_subtimestep_batch_numba = nb.njit(
+    cache=True,
+    parallel=False,
+)(_calculate_subtimestep_batch_numpy)
+
+
 class HruSegmentFlowAdapter(Adapter):
     """Adapt volumetric flows from HRUs to lateral inflows on PRMS segments/nodes.
 
@@ -451,6 +612,9 @@ class HruSegmentFlowAdapter(Adapter):
         self._current_value = np.zeros(self._nsegment) * nan
 
         self._hru_segment = self._parameters.parameters["hru_segment"] - 1
+        self._hru_segment_map = HruSegmentMap(
+            self._hru_segment, self._nsegment
+        )
 
         return
 
@@ -474,17 +638,11 @@ class HruSegmentFlowAdapter(Adapter):
 
     def _calculate_segment_lateral_inflows(self):
         """Map HRU inflows to lateral inflows on segments/nodes"""
-        self._current_value[:] = zero
-        for ihru in range(self._nhru):
-            iseg = self._hru_segment[ihru]
-            if iseg < 0:
-                # This is bad, selective handling of fluxes is not cool,
-                # mass is being discarded in a way that has to be
-                # coordinated with other parts of the code.
-                # This code should be removed evenutally.
-                continue
-
-            self._current_value[iseg] += self._inflows[ihru]
+        # This is bad, selective handling of fluxes is not cool,
+        # mass is being discarded in a way that has to be
+        # coordinated with other parts of the code.
+        # This code should be removed evenutally.
+        self._hru_segment_map.aggregate(self._inflows, out=self._current_value)
 
         return
 
@@ -539,6 +697,9 @@ class HruSegmentFlowExchange(ConservativeProcess):
         self._set_options(locals())
 
         self._hru_segment = self.hru_segment - 1
+        self._hru_segment_map = HruSegmentMap(
+            self._hru_segment, len(self.inflows)
+        )
 
         self._set_budget(basis="global")
 
@@ -597,14 +758,11 @@ class HruSegmentFlowExchange(ConservativeProcess):
             / s_per_time
         )
 
-        self.inflows[:] = zero
-        self.sinks[:] = zero  # this is an HRU variable
-        for ihru in range(self.nhru):
-            iseg = self._hru_segment[ihru]
-            if iseg < 0:
-                self.sinks[ihru] += self._inputs_sum[ihru]
-            else:
-                self.inflows[iseg] += self._inputs_sum[ihru]
+        self._hru_segment_map.aggregate(self._inputs_sum, out=self.inflows)
+        # this is an HRU variable
+        self._hru_segment_map.disconnected_values(
+            self._inputs_sum, out=self.sinks
+        )
 
         self.inflows_vol[:] = self.inflows * s_per_time
         self.sinks_vol[:] = self.sinks * s_per_time
@@ -787,26 +945,25 @@ def prms_channel_flow_graph_to_model_dict(
     )
 
     def exchange_calculation(self) -> None:
-        _hru_segment = self.hru_segment - 1
+        if not hasattr(self, "_hru_segment_map"):
+            self._hru_segment_map = HruSegmentMap(
+                self.hru_segment - 1, len(self.inflows)
+            )
+
         s_per_time = self.control.time_step_seconds
         self._inputs_sum = (
             sum([vv.current for vv in self._input_variables_dict.values()])
             / s_per_time
         )
 
-        # This zero in the last index means zero inflows to the pass through
-        # node
-        self.inflows[:] = zero
+        # No HRUs map to the last index, giving zero inflows to the pass
+        # through node
+        self._hru_segment_map.aggregate(self._inputs_sum, out=self.inflows)
         # sinks is an HRU variable, its accounting in budget is fine because
         # global collapses it to a scalar before summing over variables
-        self.sinks[:] = zero
-
-        for ihru in range(self.nhru):
-            iseg = _hru_segment[ihru]
-            if iseg < 0:
-                self.sinks[ihru] += self._inputs_sum[ihru]
-            else:
-                self.inflows[iseg] += self._inputs_sum[ihru]
+        self._hru_segment_map.disconnected_values(
+            self._inputs_sum, out=self.sinks
+        )
 
         self.inflows_vol[:] = self.inflows * s_per_time
         self.sinks_vol[:] = self.sinks * s_per_time
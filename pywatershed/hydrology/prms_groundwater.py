@@ -2,12 +2,14 @@ from typing import Literal
 from warnings import warn
 
 import numpy as np
+from numba.extending import register_jitable
 
 from ..base.adapter import adaptable, adapter_factory
 from ..base.conservative_process import ConservativeProcess
 from ..base.control import Control
-from ..constants import nan, numba_num_threads
+from ..constants import nan
 from ..parameters import Parameters
+from ..utils.numba_utils import nb_parallel, njit_cached, print_jit_message
 
 try:
     from ..prms_groundwater_f import calc_groundwater as _calculate_fortran
@@ -49,6 +51,22 @@ class PRMSGroundwater(ConservativeProcess):
 
     """
 
+    _timestep_state_attrs = (
+        "dprst_seep_hru",
+        "gwflow_coef",
+        "gwres_flow",
+        "gwres_flow_vol",
+        "gwres_sink",
+        "gwres_stor",
+        "gwres_stor_change",
+        "gwres_stor_old",
+        "gwsink_coef",
+        "hru_area",
+        "hru_in_to_cf",
+        "soil_to_gw",
+        "ssr_to_gw",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -168,65 +186,89 @@ class PRMSGroundwater(ConservativeProcess):
             self._calc_method = "numba"
 
         if self._calc_method.lower() == "numba":
-            import numba as nb
+            print_jit_message(self.name, nb_parallel)
 
-            numba_msg = f"{self.name} jit compiling with numba "
-            nb_parallel = (numba_num_threads is not None) and (
-                numba_num_threads > 1
-            )
-            if nb_parallel:
-                numba_msg += f"and using {numba_num_threads} threads"
-            print(numba_msg, flush=True)
-
-            self._calculate_gw = nb.njit(
-                nb.types.UniTuple(nb.float64[:], 5)(
-                    nb.types.Array(nb.types.float64, 1, "C", readonly=True),
-                    nb.float64[:],
-                    nb.float64[:],
-                    nb.float64[:],
-                    nb.float64[:],
-                    nb.types.Array(nb.types.float64, 1, "C", readonly=True),
-                    nb.types.Array(nb.types.float64, 1, "C", readonly=True),
-                    nb.float64[:],
-                    nb.types.Array(nb.types.float64, 1, "C", readonly=True),
-                ),
+            self._advance_timestep = njit_cached(self._advance_timestep_numpy)
+            self._calculate_timestep = njit_cached(
+                self._calculate_timestep_numpy,
                 fastmath=True,
                 parallel=False,
-            )(self._calculate_numpy)
-
-        elif self._calc_method.lower() == "fortran":
-            self._calculate_gw = _calculate_fortran
+            )
 
         else:
-            self._calculate_gw = self._calculate_numpy
+            self._advance_timestep = self._advance_timestep_numpy
+            self._calculate_timestep = self._calculate_timestep_numpy
 
         return
 
     def _advance_variables(self) -> None:
-        self.gwres_stor_old[:] = self.gwres_stor
+        self._advance_timestep(self.timestep_state)
+        return
+
+    @staticmethod
+    def _advance_timestep_numpy(state) -> None:
+        state.gwres_stor_old[:] = state.gwres_stor
         return
 
     def _calculate(self, simulation_time):
         self._simulation_time = simulation_time
-        (
-            self.gwres_stor[:],
-            self.gwres_flow[:],
-            self.gwres_sink[:],
-            self.gwres_stor_change[:],
-            self.gwres_flow_vol[:],
-        ) = self._calculate_gw(
-            self.hru_area,
-            self.soil_to_gw,
-            self.ssr_to_gw,
-            self.dprst_seep_hru,
-            self.gwres_stor,
-            self.gwflow_coef,
-            self.gwsink_coef,
-            self.gwres_stor_old,
-            self.hru_in_to_cf,
+        if self._calc_method.lower() == "fortran":
+            (
+                self.gwres_stor[:],
+                self.gwres_flow[:],
+                self.gwres_sink[:],
+                self.gwres_stor_change[:],
+                self.gwres_flow_vol[:],
+            ) = _calculate_fortran(
+                self.hru_area,
+                self.soil_to_gw,
+                self.ssr_to_gw,
+                self.dprst_seep_hru,
+                self.gwres_stor,
+                self.gwflow_coef,
+                self.gwsink_coef,
+                self.gwres_stor_old,
+                self.hru_in_to_cf,
+            )
+            return
+
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            simulation_time,
         )
         return
 
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        _calculate_gw(
+            state.hru_area,
+            state.soil_to_gw,
+            state.ssr_to_gw,
+            state.dprst_seep_hru,
+            state.gwres_stor,
+            state.gwflow_coef,
+            state.gwsink_coef,
+            state.gwres_stor_old,
+            state.hru_in_to_cf,
+            state.gwres_flow,
+            state.gwres_sink,
+            state.gwres_stor_change,
+            state.gwres_flow_vol,
+        )
+
+        return
+
     @staticmethod
     def _calculate_numpy(
         gwarea,
@@ -238,6 +280,10 @@ class PRMSGroundwater(ConservativeProcess):
         gwsink_coef,
         gwres_stor_old,
         hru_in_to_cf,
+        gwres_flow,
+        gwres_sink,
+        gwres_stor_change,
+        gwres_flow_vol,
     ):
         soil_to_gw_vol = soil_to_gw * gwarea
         ssr_to_gw_vol = ssr_to_gw * gwarea
@@ -258,18 +304,20 @@ class PRMSGroundwater(ConservativeProcess):
 
         # convert most units back to self variables
         # output variables
-        gwres_stor = _gwres_stor / gwarea
+        gwres_stor[:] = _gwres_stor / gwarea
         # for some stupid reason this is left in acre-inches
-        gwres_flow = _gwres_flow / gwarea
-        gwres_sink = _gwres_sink / gwarea
+        gwres_flow[:] = _gwres_flow / gwarea
+        gwres_sink[:] = _gwres_sink / gwarea
 
-        gwres_stor_change = gwres_stor - gwres_stor_old
-        gwres_flow_vol = gwres_flow * hru_in_to_cf
+        gwres_stor_change[:] = gwres_stor - gwres_stor_old
+        gwres_flow_vol[:] = gwres_flow * hru_in_to_cf
 
-        return (
-            gwres_stor,
-            gwres_flow,
-            gwres_sink,
-            gwres_stor_change,
-            gwres_flow_vol,
-        )
+        return
+
+
+# The timestep functions call the kernel as a module-level function, compiled
+# with (and cached on disk with) the calling function, see
+# pywatershed.utils.numba_utils.
+_calculate_gw = register_jitable(fastmath=True)(
+    PRMSGroundwater._calculate_numpy
+)
@@ -4,7 +4,12 @@ from ..base.adapter import adaptable
 from ..base.control import Control
 from ..constants import nan, zero
 from ..parameters import Parameters
-from .prms_groundwater import PRMSGroundwater
+from .prms_groundwater import PRMSGroundwater, _calculate_gw
+
+try:
+    from ..prms_groundwater_f import calc_groundwater as _calculate_fortran
+except ImportError:
+    pass
 
 
 class PRMSGroundwaterNoDprst(PRMSGroundwater):
@@ -39,6 +44,21 @@ class PRMSGroundwaterNoDprst(PRMSGroundwater):
 
     """
 
+    _timestep_state_attrs = (
+        "gwflow_coef",
+        "gwres_flow",
+        "gwres_flow_vol",
+        "gwres_sink",
+        "gwres_stor",
+        "gwres_stor_change",
+        "gwres_stor_old",
+        "gwsink_coef",
+        "hru_area",
+        "hru_in_to_cf",
+        "soil_to_gw",
+        "ssr_to_gw",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -118,23 +138,62 @@ class PRMSGroundwaterNoDprst(PRMSGroundwater):
         }
 
     def _calculate(self, simulation_time):
-        zero_array = self.gwres_stor * zero
         self._simulation_time = simulation_time
-        (
-            self.gwres_stor[:],
-            self.gwres_flow[:],
-            self.gwres_sink[:],
-            self.gwres_stor_change[:],
-            self.gwres_flow_vol[:],
-        ) = self._calculate_gw(
-            self.hru_area,
-            self.soil_to_gw,
-            self.ssr_to_gw,
+        if self._calc_method.lower() == "fortran":
+            zero_array = self.gwres_stor * zero
+            (
+                self.gwres_stor[:],
+                self.gwres_flow[:],
+                self.gwres_sink[:],
+                self.gwres_stor_change[:],
+                self.gwres_flow_vol[:],
+            ) = _calculate_fortran(
+                self.hru_area,
+                self.soil_to_gw,
+                self.ssr_to_gw,
+                zero_array,
+                self.gwres_stor,
+                self.gwflow_coef,
+                self.gwsink_coef,
+                self.gwres_stor_old,
+                self.hru_in_to_cf,
+            )
+            return
+
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            simulation_time,
+        )
+        return
+
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        zero_array = state.gwres_stor * zero
+        _calculate_gw(
+            state.hru_area,
+            state.soil_to_gw,
+            state.ssr_to_gw,
             zero_array,
-            self.gwres_stor,
-            self.gwflow_coef,
-            self.gwsink_coef,
-            self.gwres_stor_old,
-            self.hru_in_to_cf,
+            state.gwres_stor,
+            state.gwflow_coef,
+            state.gwsink_coef,
+            state.gwres_stor_old,
+            state.hru_in_to_cf,
+            state.gwres_flow,
+            state.gwres_sink,
+            state.gwres_stor_change,
+            state.gwres_flow_vol,
         )
+
         return
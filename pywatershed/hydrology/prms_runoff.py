@@ -3,12 +3,14 @@ from warnings import warn
 
 import numpy as np
 from numba import prange
+from numba.extending import register_jitable
 
 from ..base.adapter import adaptable
 from ..base.conservative_process import ConservativeProcess
 from ..base.control import Control
-from ..constants import HruType, dnearzero, nearzero, numba_num_threads, zero
+from ..constants import HruType, dnearzero, nearzero, zero
 from ..parameters import Parameters
+from ..utils.numba_utils import nb_parallel, njit_cached, print_jit_message
 
 RAIN = 0
 SNOW = 1
@@ -74,6 +76,82 @@ class PRMSRunoff(ConservativeProcess):
         verbose: Print extra information or not?
     """
 
+    _timestep_state_attrs = (
+        "carea_max",
+        "contrib_fraction",
+        "dprst_area_clos",
+        "dprst_area_clos_max",
+        "dprst_area_max",
+        "dprst_area_open",
+        "dprst_area_open_max",
+        "dprst_et_coef",
+        "dprst_evap_hru",
+        "_dprst_flag",
+        "dprst_flow_coef",
+        "dprst_frac_clos",
+        "dprst_frac_open",
+        "dprst_in",
+        "dprst_insroff_hru",
+        "dprst_seep_hru",
+        "dprst_seep_rate_clos",
+        "dprst_seep_rate_open",
+        "dprst_sroff_hru",
+        "dprst_stor_hru",
+        "dprst_stor_hru_change",
+        "dprst_stor_hru_old",
+        "dprst_vol_clos",
+        "dprst_vol_clos_frac",
+        "dprst_vol_clos_max",
+        "dprst_vol_frac",
+        "dprst_vol_open",
+        "dprst_vol_open_frac",
+        "dprst_vol_open_max",
+        "dprst_vol_thres_open",
+        "hru_area",
+        "hru_frac_perv",
+        "hru_imperv",
+        "hru_impervevap",
+        "hru_impervstor",
+        "hru_impervstor_change",
+        "hru_impervstor_old",
+        "hru_in_to_cf",
+        "hru_intcpevap",
+        "hru_percent_imperv",
+        "hru_perv",
+        "hru_sroffi",
+        "hru_sroffp",
+        "hru_type",
+        "imperv_evap",
+        "imperv_stor",
+        "imperv_stor_max",
+        "infil",
+        "infil_hru",
+        "intcp_changeover",
+        "net_ppt",
+        "net_rain",
+        "net_snow",
+        "nhru",
+        "pkwater_equiv",
+        "potet",
+        "pptmix_nopack",
+        "smidx_coef",
+        "smidx_exp",
+        "snow_evap",
+        "snowcov_area",
+        "snowinfil_max",
+        "snowmelt",
+        "soil_lower_prev",
+        "soil_moist_max",
+        "soil_rechr_prev",
+        "sro_to_dprst_imperv",
+        "sro_to_dprst_perv",
+        "sroff",
+        "sroff_vol",
+        "through_rain",
+        "va_clos_exp",
+        "va_open_exp",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -401,141 +479,130 @@ class PRMSRunoff(ConservativeProcess):
             self._calc_method = "numba"
 
         if self._calc_method.lower() == "numba":
-            import numba as nb
-
-            numba_msg = f"{self.name} jit compiling with numba "
-            nb_parallel = (numba_num_threads is not None) and (
-                numba_num_threads > 1
-            )
-            if nb_parallel:
-                numba_msg += f"and using {numba_num_threads} threads"
-            print(numba_msg, flush=True)
+            print_jit_message(self.name, nb_parallel)
 
-            self._calculate_runoff = nb.njit(
-                self._calculate_numpy, parallel=nb_parallel
+            self._advance_timestep = njit_cached(self._advance_timestep_numpy)
+            self._calculate_timestep = njit_cached(
+                self._calculate_timestep_numpy,
+                parallel=nb_parallel,
             )
-            self.check_capacity = nb.njit(self.check_capacity)
-            self.perv_comp = nb.njit(self.perv_comp)
-            self.compute_infil = nb.njit(self.compute_infil)
-            self.dprst_comp = nb.njit(self.dprst_comp)
-            self.imperv_et = nb.njit(self.imperv_et)
 
         else:
-            self._calculate_runoff = self._calculate_numpy
+            self._advance_timestep = self._advance_timestep_numpy
+            self._calculate_timestep = self._calculate_timestep_numpy
 
         return
 
     def _advance_variables(self) -> None:
-        self.hru_impervstor_old[:] = self.hru_impervstor
-        self.dprst_stor_hru_old[:] = self.dprst_stor_hru
+        self._advance_timestep(self.timestep_state)
+        return
+
+    @staticmethod
+    def _advance_timestep_numpy(state) -> None:
+        state.hru_impervstor_old[:] = state.hru_impervstor
+        state.dprst_stor_hru_old[:] = state.dprst_stor_hru
         return None
 
     def _calculate(self, time_length, vectorized=False):
         """Perform the core calculations"""
-        (
-            self.infil[:],
-            self.contrib_fraction[:],
-            self.hru_sroffp[:],
-            self.hru_sroffi[:],
-            self.imperv_evap[:],
-            self.hru_impervevap[:],
-            self.imperv_stor[:],
-            self.dprst_in[:],
-            self.dprst_vol_open[:],
-            self.dprst_vol_clos[:],
-            self.dprst_sroff_hru[:],
-            self.dprst_evap_hru[:],
-            self.dprst_seep_hru[:],
-            self.dprst_insroff_hru[:],
-            self.dprst_vol_open_frac[:],
-            self.dprst_vol_clos_frac[:],
-            self.dprst_vol_frac[:],
-            self.dprst_stor_hru[:],
-            self.sroff[:],
-        ) = self._calculate_runoff(
-            infil=self.infil,
-            nhru=self.nhru,
-            hru_area=self.hru_area,
-            hru_perv=self.hru_perv,
-            hru_frac_perv=self.hru_frac_perv,
-            hru_sroffp=self.hru_sroffp,
-            contrib_fraction=self.contrib_fraction,
-            hru_percent_imperv=self.hru_percent_imperv,
-            hru_sroffi=self.hru_sroffi,
-            imperv_evap=self.imperv_evap,
-            hru_imperv=self.hru_imperv,
-            hru_impervevap=self.hru_impervevap,
-            potet=self.potet,
-            snow_evap=self.snow_evap,
-            hru_intcpevap=self.hru_intcpevap,
-            soil_lower_prev=self.soil_lower_prev,
-            soil_rechr_prev=self.soil_rechr_prev,
-            soil_moist_max=self.soil_moist_max,
-            carea_max=self.carea_max,
-            smidx_coef=self.smidx_coef,
-            smidx_exp=self.smidx_exp,
-            pptmix_nopack=self.pptmix_nopack,
-            net_rain=self.net_rain,
-            net_ppt=self.net_ppt,
-            imperv_stor=self.imperv_stor,
-            imperv_stor_max=self.imperv_stor_max,
-            snowmelt=self.snowmelt,
-            snowinfil_max=self.snowinfil_max,
-            net_snow=self.net_snow,
-            pkwater_equiv=self.pkwater_equiv,
-            hru_type=self.hru_type,
-            intcp_changeover=self.intcp_changeover,
-            dprst_in=self.dprst_in,
-            dprst_seep_hru=self.dprst_seep_hru,
-            dprst_area_max=self.dprst_area_max,
-            dprst_vol_open=self.dprst_vol_open,
-            dprst_vol_clos=self.dprst_vol_clos,
-            dprst_sroff_hru=self.dprst_sroff_hru,
-            dprst_evap_hru=self.dprst_evap_hru,
-            dprst_insroff_hru=self.dprst_insroff_hru,
-            dprst_vol_open_frac=self.dprst_vol_open_frac,
-            dprst_vol_clos_frac=self.dprst_vol_clos_frac,
-            dprst_vol_frac=self.dprst_vol_frac,
-            dprst_stor_hru=self.dprst_stor_hru,
-            dprst_area_clos_max=self.dprst_area_clos_max,
-            dprst_area_clos=self.dprst_area_clos,
-            dprst_vol_open_max=self.dprst_vol_open_max,
-            dprst_area_open_max=self.dprst_area_open_max,
-            dprst_area_open=self.dprst_area_open,
-            sro_to_dprst_perv=self.sro_to_dprst_perv,
-            sro_to_dprst_imperv=self.sro_to_dprst_imperv,
-            dprst_frac_open=self.dprst_frac_open,
-            dprst_frac_clos=self.dprst_frac_clos,
-            va_open_exp=self.va_open_exp,
-            dprst_vol_clos_max=self.dprst_vol_clos_max,
-            va_clos_exp=self.va_clos_exp,
-            snowcov_area=self.snowcov_area,
-            dprst_et_coef=self.dprst_et_coef,
-            dprst_seep_rate_open=self.dprst_seep_rate_open,
-            dprst_vol_thres_open=self.dprst_vol_thres_open,
-            dprst_flow_coef=self.dprst_flow_coef,
-            dprst_seep_rate_clos=self.dprst_seep_rate_clos,
-            sroff=self.sroff,
-            hru_impervstor=self.hru_impervstor,
-            check_capacity=self.check_capacity,
-            perv_comp=self.perv_comp,
-            compute_infil=self.compute_infil,
-            dprst_comp=self.dprst_comp,
-            imperv_et=self.imperv_et,
-            through_rain=self.through_rain,
-            dprst_flag=self._dprst_flag,
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            time_length,
+        )
+        return
+
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        _calculate_runoff(
+            infil=state.infil,
+            nhru=state.nhru,
+            hru_area=state.hru_area,
+            hru_perv=state.hru_perv,
+            hru_frac_perv=state.hru_frac_perv,
+            hru_sroffp=state.hru_sroffp,
+            contrib_fraction=state.contrib_fraction,
+            hru_percent_imperv=state.hru_percent_imperv,
+            hru_sroffi=state.hru_sroffi,
+            imperv_evap=state.imperv_evap,
+            hru_imperv=state.hru_imperv,
+            hru_impervevap=state.hru_impervevap,
+            potet=state.potet,
+            snow_evap=state.snow_evap,
+            hru_intcpevap=state.hru_intcpevap,
+            soil_lower_prev=state.soil_lower_prev,
+            soil_rechr_prev=state.soil_rechr_prev,
+            soil_moist_max=state.soil_moist_max,
+            carea_max=state.carea_max,
+            smidx_coef=state.smidx_coef,
+            smidx_exp=state.smidx_exp,
+            pptmix_nopack=state.pptmix_nopack,
+            net_rain=state.net_rain,
+            net_ppt=state.net_ppt,
+            imperv_stor=state.imperv_stor,
+            imperv_stor_max=state.imperv_stor_max,
+            snowmelt=state.snowmelt,
+            snowinfil_max=state.snowinfil_max,
+            net_snow=state.net_snow,
+            pkwater_equiv=state.pkwater_equiv,
+            hru_type=state.hru_type,
+            intcp_changeover=state.intcp_changeover,
+            dprst_in=state.dprst_in,
+            dprst_seep_hru=state.dprst_seep_hru,
+            dprst_area_max=state.dprst_area_max,
+            dprst_vol_open=state.dprst_vol_open,
+            dprst_vol_clos=state.dprst_vol_clos,
+            dprst_sroff_hru=state.dprst_sroff_hru,
+            dprst_evap_hru=state.dprst_evap_hru,
+            dprst_insroff_hru=state.dprst_insroff_hru,
+            dprst_vol_open_frac=state.dprst_vol_open_frac,
+            dprst_vol_clos_frac=state.dprst_vol_clos_frac,
+            dprst_vol_frac=state.dprst_vol_frac,
+            dprst_stor_hru=state.dprst_stor_hru,
+            dprst_area_clos_max=state.dprst_area_clos_max,
+            dprst_area_clos=state.dprst_area_clos,
+            dprst_vol_open_max=state.dprst_vol_open_max,
+            dprst_area_open_max=state.dprst_area_open_max,
+            dprst_area_open=state.dprst_area_open,
+            sro_to_dprst_perv=state.sro_to_dprst_perv,
+            sro_to_dprst_imperv=state.sro_to_dprst_imperv,
+            dprst_frac_open=state.dprst_frac_open,
+            dprst_frac_clos=state.dprst_frac_clos,
+            va_open_exp=state.va_open_exp,
+            dprst_vol_clos_max=state.dprst_vol_clos_max,
+            va_clos_exp=state.va_clos_exp,
+            snowcov_area=state.snowcov_area,
+            dprst_et_coef=state.dprst_et_coef,
+            dprst_seep_rate_open=state.dprst_seep_rate_open,
+            dprst_vol_thres_open=state.dprst_vol_thres_open,
+            dprst_flow_coef=state.dprst_flow_coef,
+            dprst_seep_rate_clos=state.dprst_seep_rate_clos,
+            sroff=state.sroff,
+            hru_impervstor=state.hru_impervstor,
+            through_rain=state.through_rain,
+            dprst_flag=state.dprst_flag,
         )
 
-        self.infil_hru[:] = self.infil * self.hru_frac_perv
+        state.infil_hru[:] = state.infil * state.hru_frac_perv
 
-        self.hru_impervstor_change[:] = (
-            self.hru_impervstor - self.hru_impervstor_old
+        state.hru_impervstor_change[:] = (
+            state.hru_impervstor - state.hru_impervstor_old
         )
-        self.dprst_stor_hru_change[:] = (
-            self.dprst_stor_hru - self.dprst_stor_hru_old
+        state.dprst_stor_hru_change[:] = (
+            state.dprst_stor_hru - state.dprst_stor_hru_old
         )
 
-        self.sroff_vol[:] = self.sroff * self.hru_in_to_cf
+        state.sroff_vol[:] = state.sroff * state.hru_in_to_cf
 
         return
 
@@ -605,12 +672,6 @@ class PRMSRunoff(ConservativeProcess):
         dprst_seep_rate_clos,
         sroff,
         hru_impervstor,
-        # functions at end
-        check_capacity,
-        perv_comp,
-        compute_infil,
-        dprst_comp,
-        imperv_et,
         through_rain,
         dprst_flag,
     ):
@@ -672,8 +733,6 @@ class PRMSRunoff(ConservativeProcess):
                 hruarea_imperv=hruarea_imperv,
                 sri=sri,
                 srp=srp,
-                check_capacity=check_capacity,
-                perv_comp=perv_comp,
                 through_rain=through_rain[i],
             )
 
@@ -793,27 +852,7 @@ class PRMSRunoff(ConservativeProcess):
             sroff[i] = srunoff
 
         # <
-        return (
-            infil,
-            contrib_fraction,
-            hru_sroffp,
-            hru_sroffi,
-            imperv_evap,
-            hru_impervevap,
-            imperv_stor,
-            dprst_in,
-            dprst_vol_open,
-            dprst_vol_clos,
-            dprst_sroff_hru,
-            dprst_evap_hru,
-            dprst_seep_hru,
-            dprst_insroff_hru,
-            dprst_vol_open_frac,
-            dprst_vol_clos_frac,
-            dprst_vol_frac,
-            dprst_stor_hru,
-            sroff,
-        )
+        return
 
     @staticmethod
     def compute_infil(
@@ -838,8 +877,6 @@ class PRMSRunoff(ConservativeProcess):
         hruarea_imperv,
         sri,
         srp,
-        check_capacity,
-        perv_comp,
         through_rain,
     ):
         isglacier = False  # todo -- hardwired
@@ -1285,3 +1322,16 @@ class PRMSRunoff(ConservativeProcess):
                 imperv_evap = avail_et / imperv_frac
             imperv_stor = imperv_stor - imperv_evap
         return imperv_stor, imperv_evap
+
+
+# The kernels call these helpers as module-level functions, compiled with
+# (and cached on disk with) the calling kernel, see
+# pywatershed.utils.numba_utils.
+check_capacity = register_jitable(PRMSRunoff.check_capacity)
+perv_comp = register_jitable(PRMSRunoff.perv_comp)
+compute_infil = register_jitable(PRMSRunoff.compute_infil)
+dprst_comp = register_jitable(PRMSRunoff.dprst_comp)
+imperv_et = register_jitable(PRMSRunoff.imperv_et)
+_calculate_runoff = register_jitable(parallel=nb_parallel)(
+    PRMSRunoff._calculate_numpy
+)
@@ -4,7 +4,7 @@ from ..base.adapter import adaptable
 from ..base.control import Control
 from ..constants import HruType, zero
 from ..parameters import Parameters
-from .prms_runoff import PRMSRunoff
+from .prms_runoff import PRMSRunoff, _calculate_runoff
 
 RAIN = 0
 SNOW = 1
@@ -68,6 +68,51 @@ class PRMSRunoffNoDprst(PRMSRunoff):
         verbose: Print extra information or not?
     """
 
+    _timestep_state_attrs = (
+        "carea_max",
+        "contrib_fraction",
+        "_dprst_flag",
+        "hru_area",
+        "hru_frac_perv",
+        "hru_imperv",
+        "hru_impervevap",
+        "hru_impervstor",
+        "hru_impervstor_change",
+        "hru_impervstor_old",
+        "hru_in_to_cf",
+        "hru_intcpevap",
+        "hru_percent_imperv",
+        "hru_perv",
+        "hru_sroffi",
+        "hru_sroffp",
+        "hru_type",
+        "imperv_evap",
+        "imperv_stor",
+        "imperv_stor_max",
+        "infil",
+        "infil_hru",
+        "intcp_changeover",
+        "net_ppt",
+        "net_rain",
+        "net_snow",
+        "nhru",
+        "pkwater_equiv",
+        "potet",
+        "pptmix_nopack",
+        "smidx_coef",
+        "smidx_exp",
+        "snow_evap",
+        "snowcov_area",
+        "snowinfil_max",
+        "snowmelt",
+        "soil_lower_prev",
+        "soil_moist_max",
+        "soil_rechr_prev",
+        "sroff",
+        "sroff_vol",
+        "through_rain",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -205,67 +250,71 @@ class PRMSRunoffNoDprst(PRMSRunoff):
         }
 
     def _advance_variables(self) -> None:
-        self.hru_impervstor_old[:] = self.hru_impervstor
+        self._advance_timestep(self.timestep_state)
+        return
+
+    @staticmethod
+    def _advance_timestep_numpy(state) -> None:
+        state.hru_impervstor_old[:] = state.hru_impervstor
         return None
 
     def _calculate(self, time_length, vectorized=False):
         """Perform the core calculations"""
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            time_length,
+        )
+        return
+
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
 
-        zero_array = zero * self.infil
-
-        (
-            self.infil[:],
-            self.contrib_fraction[:],
-            self.hru_sroffp[:],
-            self.hru_sroffi[:],
-            self.imperv_evap[:],
-            self.hru_impervevap[:],
-            self.imperv_stor[:],
-            _,
-            _,
-            _,
-            _,
-            _,
-            _,
-            _,
-            _,
-            _,
-            _,
-            _,
-            self.sroff[:],
-        ) = self._calculate_runoff(
-            infil=self.infil,
-            nhru=self.nhru,
-            hru_area=self.hru_area,
-            hru_perv=self.hru_perv,
-            hru_frac_perv=self.hru_frac_perv,
-            hru_sroffp=self.hru_sroffp,
-            contrib_fraction=self.contrib_fraction,
-            hru_percent_imperv=self.hru_percent_imperv,
-            hru_sroffi=self.hru_sroffi,
-            imperv_evap=self.imperv_evap,
-            hru_imperv=self.hru_imperv,
-            hru_impervevap=self.hru_impervevap,
-            potet=self.potet,
-            snow_evap=self.snow_evap,
-            hru_intcpevap=self.hru_intcpevap,
-            soil_lower_prev=self.soil_lower_prev,
-            soil_rechr_prev=self.soil_rechr_prev,
-            soil_moist_max=self.soil_moist_max,
-            carea_max=self.carea_max,
-            smidx_coef=self.smidx_coef,
-            smidx_exp=self.smidx_exp,
-            pptmix_nopack=self.pptmix_nopack,
-            net_rain=self.net_rain,
-            net_ppt=self.net_ppt,
-            imperv_stor=self.imperv_stor,
-            imperv_stor_max=self.imperv_stor_max,
-            snowmelt=self.snowmelt,
-            snowinfil_max=self.snowinfil_max,
-            net_snow=self.net_snow,
-            pkwater_equiv=self.pkwater_equiv,
-            hru_type=self.hru_type,
-            intcp_changeover=self.intcp_changeover,
+        zero_array = zero * state.infil
+
+        _calculate_runoff(
+            infil=state.infil,
+            nhru=state.nhru,
+            hru_area=state.hru_area,
+            hru_perv=state.hru_perv,
+            hru_frac_perv=state.hru_frac_perv,
+            hru_sroffp=state.hru_sroffp,
+            contrib_fraction=state.contrib_fraction,
+            hru_percent_imperv=state.hru_percent_imperv,
+            hru_sroffi=state.hru_sroffi,
+            imperv_evap=state.imperv_evap,
+            hru_imperv=state.hru_imperv,
+            hru_impervevap=state.hru_impervevap,
+            potet=state.potet,
+            snow_evap=state.snow_evap,
+            hru_intcpevap=state.hru_intcpevap,
+            soil_lower_prev=state.soil_lower_prev,
+            soil_rechr_prev=state.soil_rechr_prev,
+            soil_moist_max=state.soil_moist_max,
+            carea_max=state.carea_max,
+            smidx_coef=state.smidx_coef,
+            smidx_exp=state.smidx_exp,
+            pptmix_nopack=state.pptmix_nopack,
+            net_rain=state.net_rain,
+            net_ppt=state.net_ppt,
+            imperv_stor=state.imperv_stor,
+            imperv_stor_max=state.imperv_stor_max,
+            snowmelt=state.snowmelt,
+            snowinfil_max=state.snowinfil_max,
+            net_snow=state.net_snow,
+            pkwater_equiv=state.pkwater_equiv,
+            hru_type=state.hru_type,
+            intcp_changeover=state.intcp_changeover,
             dprst_in=zero_array.copy(),
             dprst_seep_hru=zero_array.copy(),
             dprst_area_max=zero_array.copy(),
@@ -290,29 +339,24 @@ class PRMSRunoffNoDprst(PRMSRunoff):
             va_open_exp=zero_array.copy(),
             dprst_vol_clos_max=zero_array.copy(),
             va_clos_exp=zero_array.copy(),
-            snowcov_area=self.snowcov_area,
+            snowcov_area=state.snowcov_area,
             dprst_et_coef=zero_array.copy(),
             dprst_seep_rate_open=zero_array.copy(),
             dprst_vol_thres_open=zero_array.copy(),
             dprst_flow_coef=zero_array.copy(),
             dprst_seep_rate_clos=zero_array.copy(),
-            sroff=self.sroff,
-            hru_impervstor=self.hru_impervstor,
-            check_capacity=self.check_capacity,
-            perv_comp=self.perv_comp,
-            compute_infil=self.compute_infil,
-            dprst_comp=self.dprst_comp,
-            imperv_et=self.imperv_et,
-            through_rain=self.through_rain,
-            dprst_flag=self._dprst_flag,
+            sroff=state.sroff,
+            hru_impervstor=state.hru_impervstor,
+            through_rain=state.through_rain,
+            dprst_flag=state.dprst_flag,
         )
 
-        self.infil_hru[:] = self.infil * self.hru_frac_perv
+        state.infil_hru[:] = state.infil * state.hru_frac_perv
 
-        self.hru_impervstor_change[:] = (
-            self.hru_impervstor - self.hru_impervstor_old
+        state.hru_impervstor_change[:] = (
+            state.hru_impervstor - state.hru_impervstor_old
         )
 
-        self.sroff_vol[:] = self.sroff * self.hru_in_to_cf
+        state.sroff_vol[:] = state.sroff * state.hru_in_to_cf
 
         return
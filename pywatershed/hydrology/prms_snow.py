@@ -3,6 +3,7 @@ from warnings import warn
 
 import numpy as np
 from numba import prange
+from numba.extending import register_jitable
 
 from ..base.adapter import adaptable
 from ..base.conservative_process import ConservativeProcess
@@ -14,11 +15,11 @@ from ..constants import (
     inch2cm,
     nan,
     nearzero,
-    numba_num_threads,
     one,
     zero,
 )
 from ..parameters import Parameters
+from ..utils.numba_utils import nb_parallel, njit_cached, print_jit_message
 
 # These are constants used like variables (on self) in PRMS6
 # They dont appear on any LHS, so it seems they are constants
@@ -119,6 +120,86 @@ class PRMSSnow(ConservativeProcess):
         verbose: Print extra information or not?
     """
 
+    _timestep_state_attrs = (
+        "ai",
+        "albedo",
+        "albset_rna",
+        "albset_rnm",
+        "albset_sna",
+        "albset_snm",
+        "cecn_coef",
+        "cov_type",
+        "covden_sum",
+        "covden_win",
+        "den_max",
+        "deninv",
+        "denmaxinv",
+        "emis_noppt",
+        "frac_swe",
+        "freeh2o",
+        "freeh2o_cap",
+        "freeh2o_change",
+        "freeh2o_prev",
+        "hru_deplcrv",
+        "hru_intcpevap",
+        "hru_ppt",
+        "hru_type",
+        "iasw",
+        "int_alb",
+        "iso",
+        "lso",
+        "lst",
+        "melt_force",
+        "melt_look",
+        "mso",
+        "net_ppt",
+        "net_rain",
+        "net_snow",
+        "newsnow",
+        "nhru",
+        "orad_hru",
+        "pk_def",
+        "pk_den",
+        "pk_depth",
+        "pk_ice",
+        "pk_ice_change",
+        "pk_ice_prev",
+        "pk_precip",
+        "pk_temp",
+        "pksv",
+        "pkwater_equiv",
+        "potet",
+        "potet_sublim",
+        "pptmix",
+        "pptmix_nopack",
+        "prmx",
+        "pss",
+        "pst",
+        "rad_trncf",
+        "salb",
+        "scrv",
+        "settle_const",
+        "slst",
+        "snarea_curve_2d",
+        "snarea_thresh",
+        "snow_evap",
+        "snowcov_area",
+        "snowcov_areasv",
+        "snowmelt",
+        "snsv",
+        "soltab_horad_potsw",
+        "swrad",
+        "tavgc",
+        "tcal",
+        "through_rain",
+        "tmax_allsnow_c",
+        "tmaxc",
+        "tminc",
+        "transp_on",
+        "tstorm_mo",
+        "_verbose",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -443,178 +524,136 @@ class PRMSSnow(ConservativeProcess):
             self._calc_method = "numba"
 
         if self._calc_method.lower() == "numba":
-            import numba as nb
+            print_jit_message(self.name, nb_parallel)
 
-            numba_msg = f"{self.name} jit compiling with numba "
-            nb_parallel = (numba_num_threads is not None) and (
-                numba_num_threads > 1
+            self._advance_timestep = njit_cached(self._advance_timestep_numpy)
+            self._calculate_timestep = njit_cached(
+                self._calculate_timestep_numpy,
+                fastmath=True,
+                parallel=nb_parallel,
             )
-            if nb_parallel:
-                numba_msg += f"and using {numba_num_threads} threads"
-            print(numba_msg, flush=True)
-
-            self._calculate_snow = nb.njit(
-                fastmath=True, parallel=nb_parallel
-            )(self._calculate_numpy)
-
-            fns = [
-                "_calc_calin",
-                "_calc_caloss",
-                "_calc_ppt_to_pack",
-                "_calc_sca_deplcrv",
-                "_calc_snalbedo",
-                "_calc_snowbal",
-                "_calc_snowcov",
-                "_calc_snowevap",
-                "_calc_step_4",
-            ]
-            for fn in fns:
-                setattr(
-                    self,
-                    fn,
-                    nb.njit(fastmath=True)(getattr(self, fn)),
-                )
 
         else:
-            self._calculate_snow = self._calculate_numpy
+            self._advance_timestep = self._advance_timestep_numpy
+            self._calculate_timestep = self._calculate_timestep_numpy
 
         return
 
     def _advance_variables(self) -> None:
-        self.freeh2o_prev[:] = self.freeh2o
-        self.pk_ice_prev[:] = self.pk_ice
+        self._advance_timestep(self.timestep_state)
+        return
+
+    @staticmethod
+    def _advance_timestep_numpy(state) -> None:
+        state.freeh2o_prev[:] = state.freeh2o
+        state.pk_ice_prev[:] = state.pk_ice
         return
 
     def _calculate(self, simulation_time):
-        (
-            self.ai[:],
-            self.albedo[:],
-            self.frac_swe[:],
-            self.freeh2o[:],
-            self.freeh2o_change[:],
-            self.iasw[:],
-            self.int_alb[:],
-            self.iso[:],
-            self.lso[:],
-            self.lst[:],
-            self.mso[:],
-            self.newsnow[:],
-            self.pk_def[:],
-            self.pk_den[:],
-            self.pk_depth[:],
-            self.pk_ice[:],
-            self.pk_ice_change[:],
-            self.pk_precip[:],
-            self.pk_temp[:],
-            self.pksv[:],
-            self.pkwater_equiv[:],
-            self.pptmix_nopack[:],
-            self.pss[:],
-            self.pst[:],
-            self.salb[:],
-            self.scrv[:],
-            self.slst[:],
-            self.snow_evap[:],
-            self.snowcov_area[:],
-            self.snowcov_areasv[:],
-            self.snowmelt[:],
-            self.snsv[:],
-            self.tcal[:],
-            self.through_rain[:],
-        ) = self._calculate_snow(
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            simulation_time,
+        )
+        return
+
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        _calculate_snow(
             acum_init=acum_init,
-            ai=self.ai,
-            albedo=self.albedo,
-            albset_rna=self.albset_rna,
-            albset_rnm=self.albset_rnm,
-            albset_sna=self.albset_sna,
-            albset_snm=self.albset_snm,
+            ai=state.ai,
+            albedo=state.albedo,
+            albset_rna=state.albset_rna,
+            albset_rnm=state.albset_rnm,
+            albset_sna=state.albset_sna,
+            albset_snm=state.albset_snm,
             amlt_init=amlt_init,
-            calc_calin=self._calc_calin,
-            calc_caloss=self._calc_caloss,
-            calc_ppt_to_pack=self._calc_ppt_to_pack,
-            calc_sca_deplcrv=self._calc_sca_deplcrv,
-            calc_snalbedo=self._calc_snalbedo,
-            calc_snowbal=self._calc_snowbal,
-            calc_snowcov=self._calc_snowcov,
-            calc_snowevap=self._calc_snowevap,
-            calc_step_4=self._calc_step_4,
-            cecn_coef=self.cecn_coef,
-            cov_type=self.cov_type,
-            covden_sum=self.covden_sum,
-            covden_win=self.covden_win,
-            current_dowy=self.control.current_dowy,
-            current_doy=self.control.current_doy,
-            current_month=self.control.current_month,
-            den_max=self.den_max,
-            deninv=self.deninv,
-            denmaxinv=self.denmaxinv,
-            emis_noppt=self.emis_noppt,
-            frac_swe=self.frac_swe,
-            freeh2o=self.freeh2o,
-            freeh2o_cap=self.freeh2o_cap,
-            freeh2o_change=self.freeh2o_change,
-            freeh2o_prev=self.freeh2o_prev,
-            hru_deplcrv=self.hru_deplcrv,
-            hru_intcpevap=self.hru_intcpevap,
-            hru_ppt=self.hru_ppt,
-            hru_type=self.hru_type,
-            iasw=self.iasw,
-            int_alb=self.int_alb,
-            iso=self.iso,
-            itime_step=self.control.itime_step,
-            lso=self.lso,
-            lst=self.lst,
-            melt_force=self.melt_force,
-            melt_look=self.melt_look,
-            mso=self.mso,
-            net_ppt=self.net_ppt,
-            net_rain=self.net_rain,
-            net_snow=self.net_snow,
-            newsnow=self.newsnow,
-            nhru=self.nhru,
-            orad_hru=self.orad_hru,
-            pk_def=self.pk_def,
-            pk_den=self.pk_den,
-            pk_depth=self.pk_depth,
-            pk_ice=self.pk_ice,
-            pk_ice_change=self.pk_ice_change,
-            pk_ice_prev=self.pk_ice_prev,
-            pk_precip=self.pk_precip,
-            pk_temp=self.pk_temp,
-            pksv=self.pksv,
-            pkwater_equiv=self.pkwater_equiv,
-            potet=self.potet,
-            potet_sublim=self.potet_sublim,
-            pptmix=self.pptmix,
-            pptmix_nopack=self.pptmix_nopack,
-            prmx=self.prmx,
-            pss=self.pss,
-            pst=self.pst,
-            rad_trncf=self.rad_trncf,
-            salb=self.salb,
-            scrv=self.scrv,
-            settle_const=self.settle_const,
-            simulation_time=simulation_time,
-            slst=self.slst,
-            snarea_curve_2d=self.snarea_curve_2d,
-            snarea_thresh=self.snarea_thresh,
-            snow_evap=self.snow_evap,
-            snowcov_area=self.snowcov_area,
-            snowcov_areasv=self.snowcov_areasv,
-            snowmelt=self.snowmelt,
-            snsv=self.snsv,
-            soltab_horad_potsw=self.soltab_horad_potsw,
-            swrad=self.swrad,
-            tavgc=self.tavgc,
-            tcal=self.tcal,
-            through_rain=self.through_rain,
-            tmax_allsnow_c=self.tmax_allsnow_c,
-            tmaxc=self.tmaxc,
-            tminc=self.tminc,
-            transp_on=self.transp_on,
-            tstorm_mo=self.tstorm_mo,
-            verbose=self._verbose,
+            cecn_coef=state.cecn_coef,
+            cov_type=state.cov_type,
+            covden_sum=state.covden_sum,
+            covden_win=state.covden_win,
+            current_dowy=current_dowy,
+            current_doy=current_doy,
+            current_month=current_month,
+            den_max=state.den_max,
+            deninv=state.deninv,
+            denmaxinv=state.denmaxinv,
+            emis_noppt=state.emis_noppt,
+            frac_swe=state.frac_swe,
+            freeh2o=state.freeh2o,
+            freeh2o_cap=state.freeh2o_cap,
+            freeh2o_change=state.freeh2o_change,
+            freeh2o_prev=state.freeh2o_prev,
+            hru_deplcrv=state.hru_deplcrv,
+            hru_intcpevap=state.hru_intcpevap,
+            hru_ppt=state.hru_ppt,
+            hru_type=state.hru_type,
+            iasw=state.iasw,
+            int_alb=state.int_alb,
+            iso=state.iso,
+            itime_step=itime_step,
+            lso=state.lso,
+            lst=state.lst,
+            melt_force=state.melt_force,
+            melt_look=state.melt_look,
+            mso=state.mso,
+            net_ppt=state.net_ppt,
+            net_rain=state.net_rain,
+            net_snow=state.net_snow,
+            newsnow=state.newsnow,
+            nhru=state.nhru,
+            orad_hru=state.orad_hru,
+            pk_def=state.pk_def,
+            pk_den=state.pk_den,
+            pk_depth=state.pk_depth,
+            pk_ice=state.pk_ice,
+            pk_ice_change=state.pk_ice_change,
+            pk_ice_prev=state.pk_ice_prev,
+            pk_precip=state.pk_precip,
+            pk_temp=state.pk_temp,
+            pksv=state.pksv,
+            pkwater_equiv=state.pkwater_equiv,
+            potet=state.potet,
+            potet_sublim=state.potet_sublim,
+            pptmix=state.pptmix,
+            pptmix_nopack=state.pptmix_nopack,
+            prmx=state.prmx,
+            pss=state.pss,
+            pst=state.pst,
+            rad_trncf=state.rad_trncf,
+            salb=state.salb,
+            scrv=state.scrv,
+            settle_const=state.settle_const,
+            simulation_time=time_length,
+            slst=state.slst,
+            snarea_curve_2d=state.snarea_curve_2d,
+            snarea_thresh=state.snarea_thresh,
+            snow_evap=state.snow_evap,
+            snowcov_area=state.snowcov_area,
+            snowcov_areasv=state.snowcov_areasv,
+            snowmelt=state.snowmelt,
+            snsv=state.snsv,
+            soltab_horad_potsw=state.soltab_horad_potsw,
+            swrad=state.swrad,
+            tavgc=state.tavgc,
+            tcal=state.tcal,
+            through_rain=state.through_rain,
+            tmax_allsnow_c=state.tmax_allsnow_c,
+            tmaxc=state.tmaxc,
+            tminc=state.tminc,
+            transp_on=state.transp_on,
+            tstorm_mo=state.tstorm_mo,
+            verbose=state.verbose,
         )
 
         return
@@ -629,15 +668,6 @@ class PRMSSnow(ConservativeProcess):
         albset_sna,
         albset_snm,
         amlt_init,
-        calc_calin,
-        calc_caloss,
-        calc_ppt_to_pack,
-        calc_snalbedo,
-        calc_sca_deplcrv,
-        calc_snowbal,
-        calc_snowcov,
-        calc_snowevap,
-        calc_step_4,
         cecn_coef,
         cov_type,
         covden_sum,
@@ -731,7 +761,7 @@ class PRMSSnow(ConservativeProcess):
         # cals = zero  # JLM this is unnecessary.
 
         # newsnow is a doganostic for prms_snow, so it lives here
-        newsnow = np.where(net_snow > zero, True, False)
+        newsnow[:] = np.where(net_snow > zero, True, False)
 
         # JLM TODO: there's a conditional here we dont have
         #  in fotran trd is scalar and the RHS terms are vector?
@@ -823,9 +853,7 @@ class PRMSSnow(ConservativeProcess):
                 pss[jj],
                 pst[jj],
                 snowmelt[jj],
-            ) = calc_ppt_to_pack(
-                calc_calin=calc_calin,
-                calc_caloss=calc_caloss,
+            ) = _calc_ppt_to_pack(
                 den_max=den_max[jj],
                 denmaxinv=denmaxinv[jj],
                 freeh2o=freeh2o[jj],
@@ -874,7 +902,7 @@ class PRMSSnow(ConservativeProcess):
                     scrv[jj],
                     snowcov_area[jj],
                     snowcov_areasv[jj],
-                ) = calc_snowcov(
+                ) = _calc_snowcov(
                     ai=ai[jj],
                     frac_swe=frac_swe[jj],
                     hru_deplcrv=hru_deplcrv[jj],
@@ -884,7 +912,6 @@ class PRMSSnow(ConservativeProcess):
                     pksv=pksv[jj],
                     pkwater_equiv=pkwater_equiv[jj],
                     pst=pst[jj],
-                    calc_sca_deplcrv=calc_sca_deplcrv,
                     scrv=scrv[jj],
                     snarea_curve=snarea_curve_2d[hru_deplcrv[jj] - 1, :],
                     snarea_thresh=snarea_thresh[jj],
@@ -905,7 +932,7 @@ class PRMSSnow(ConservativeProcess):
                     salb[jj],
                     slst[jj],
                     snsv[jj],
-                ) = calc_snalbedo(
+                ) = _calc_snalbedo(
                     acum_init=acum_init,
                     albedo=albedo[jj],
                     albset_rna=albset_rna,
@@ -949,11 +976,8 @@ class PRMSSnow(ConservativeProcess):
                     pss[jj],
                     tcal[jj],
                     snowmelt[jj],
-                ) = calc_step_4(
+                ) = _calc_step_4(
                     trd[jj],
-                    calc_calin=calc_calin,
-                    calc_caloss=calc_caloss,
-                    calc_snowbal=calc_snowbal,
                     canopy_covden=canopy_covden[jj],
                     albedo=albedo[jj],
                     cecn_coef=cecn_coef[current_month - 1, jj],
@@ -1011,7 +1035,7 @@ class PRMSSnow(ConservativeProcess):
                             pk_temp[jj],
                             pkwater_equiv[jj],
                             snow_evap[jj],
-                        ) = calc_snowevap(
+                        ) = _calc_snowevap(
                             freeh2o=freeh2o[jj],
                             hru_intcpevap=hru_intcpevap[jj],
                             pk_def=pk_def[jj],
@@ -1136,42 +1160,7 @@ class PRMSSnow(ConservativeProcess):
             through_rain,
         )
 
-        return (
-            ai,
-            albedo,
-            frac_swe,
-            freeh2o,
-            freeh2o_change,
-            iasw,
-            int_alb,
-            iso,
-            lso,
-            lst,
-            mso,
-            newsnow,
-            pk_def,
-            pk_den,
-            pk_depth,
-            pk_ice,
-            pk_ice_change,
-            pk_precip,
-            pk_temp,
-            pksv,
-            pkwater_equiv,
-            pptmix_nopack,
-            pss,
-            pst,
-            salb,
-            scrv,
-            slst,
-            snow_evap,
-            snowcov_area,
-            snowcov_areasv,
-            snowmelt,
-            snsv,
-            tcal,
-            through_rain,
-        )
+        return
 
     @staticmethod
     def _calc_sca_deplcrv(snarea_curve: np.ndarray, frac_swe: float) -> float:
@@ -1202,8 +1191,6 @@ class PRMSSnow(ConservativeProcess):
 
     @staticmethod
     def _calc_ppt_to_pack(
-        calc_calin,
-        calc_caloss,
         den_max,
         denmaxinv,
         freeh2o,
@@ -1419,7 +1406,7 @@ class PRMSSnow(ConservativeProcess):
                             pst,
                             snowmelt,
                             pkwater_equiv,
-                        ) = calc_calin(
+                        ) = _calc_calin(
                             cal=calpr,
                             den_max=den_max,
                             denmaxinv=denmaxinv,
@@ -1464,7 +1451,7 @@ class PRMSSnow(ConservativeProcess):
                         pst,
                         snowmelt,
                         pkwater_equiv,
-                    ) = calc_calin(
+                    ) = _calc_calin(
                         cal=calpr,
                         den_max=den_max,
                         denmaxinv=denmaxinv,
@@ -1539,7 +1526,7 @@ class PRMSSnow(ConservativeProcess):
                         pk_ice,
                         pk_temp,
                         pkwater_equiv,
-                    ) = calc_caloss(
+                    ) = _calc_caloss(
                         cal=calps,
                         freeh2o=freeh2o,
                         pk_def=pk_def,
@@ -1850,7 +1837,6 @@ class PRMSSnow(ConservativeProcess):
     @staticmethod
     def _calc_snowcov(
         ai,
-        calc_sca_deplcrv,
         frac_swe,
         hru_deplcrv,
         iasw,
@@ -2113,7 +2099,7 @@ class PRMSSnow(ConservativeProcess):
             # JLM: better to just call this explicitly above, with each regime
             #      and make a case for no new snow and not interpolating?
             #      could also make this a function...
-            snowcov_area = calc_sca_deplcrv(snarea_curve, frac_swe)
+            snowcov_area = _calc_sca_deplcrv(snarea_curve, frac_swe)
 
         # <
         return (
@@ -2435,9 +2421,6 @@ class PRMSSnow(ConservativeProcess):
     @staticmethod
     def _calc_step_4(
         trd,
-        calc_calin,
-        calc_caloss,
-        calc_snowbal,
         canopy_covden,
         albedo,
         cecn_coef,  # control.current_month
@@ -2616,7 +2599,7 @@ class PRMSSnow(ConservativeProcess):
                 pst,
                 snowmelt,
                 pkwater_equiv,
-            ) = calc_snowbal(
+            ) = _calc_snowbal(
                 niteda=niteda,
                 cec=cec,
                 cst=cst,
@@ -2624,8 +2607,6 @@ class PRMSSnow(ConservativeProcess):
                 sw=sw,
                 temp=temp,
                 trd=trd,
-                calc_calin=calc_calin,
-                calc_caloss=calc_caloss,
                 canopy_covden=canopy_covden,
                 den_max=den_max,
                 denmaxinv=denmaxinv,
@@ -2677,7 +2658,7 @@ class PRMSSnow(ConservativeProcess):
                 pst,
                 snowmelt,
                 pkwater_equiv,
-            ) = calc_snowbal(
+            ) = _calc_snowbal(
                 niteda=niteda,
                 cec=cec,
                 cst=cst,
@@ -2685,8 +2666,6 @@ class PRMSSnow(ConservativeProcess):
                 sw=sw,
                 temp=temp,
                 trd=trd,
-                calc_calin=calc_calin,
-                calc_caloss=calc_caloss,
                 canopy_covden=canopy_covden,
                 den_max=den_max,
                 denmaxinv=denmaxinv,
@@ -2739,8 +2718,6 @@ class PRMSSnow(ConservativeProcess):
         sw,
         temp,
         trd,
-        calc_calin,
-        calc_caloss,
         canopy_covden,
         den_max,
         denmaxinv,
@@ -2881,7 +2858,7 @@ class PRMSSnow(ConservativeProcess):
                 pst,
                 snowmelt,
                 pkwater_equiv,
-            ) = calc_calin(
+            ) = _calc_calin(
                 cal=cal,
                 den_max=den_max,
                 denmaxinv=denmaxinv,
@@ -2960,7 +2937,7 @@ class PRMSSnow(ConservativeProcess):
                     pk_ice,
                     pk_temp,
                     pkwater_equiv,
-                ) = calc_caloss(
+                ) = _calc_caloss(
                     cal=qcond,
                     freeh2o=freeh2o,
                     pk_def=pk_def,
@@ -2999,7 +2976,7 @@ class PRMSSnow(ConservativeProcess):
                         pst,
                         snowmelt,
                         pkwater_equiv,
-                    ) = calc_calin(
+                    ) = _calc_calin(
                         cal=cal,
                         den_max=den_max,
                         denmaxinv=denmaxinv,
@@ -3260,3 +3237,20 @@ class PRMSSnow(ConservativeProcess):
             ai,
             frac_swe,
         )
+
+
+# The kernels call these helpers as module-level functions, compiled with
+# (and cached on disk with) the calling kernel, see
+# pywatershed.utils.numba_utils.
+_calc_calin = register_jitable(fastmath=True)(PRMSSnow._calc_calin)
+_calc_caloss = register_jitable(fastmath=True)(PRMSSnow._calc_caloss)
+_calc_ppt_to_pack = register_jitable(fastmath=True)(PRMSSnow._calc_ppt_to_pack)
+_calc_sca_deplcrv = register_jitable(fastmath=True)(PRMSSnow._calc_sca_deplcrv)
+_calc_snalbedo = register_jitable(fastmath=True)(PRMSSnow._calc_snalbedo)
+_calc_snowbal = register_jitable(fastmath=True)(PRMSSnow._calc_snowbal)
+_calc_snowcov = register_jitable(fastmath=True)(PRMSSnow._calc_snowcov)
+_calc_snowevap = register_jitable(fastmath=True)(PRMSSnow._calc_snowevap)
+_calc_step_4 = register_jitable(fastmath=True)(PRMSSnow._calc_step_4)
+_calculate_snow = register_jitable(fastmath=True, parallel=nb_parallel)(
+    PRMSSnow._calculate_numpy
+)
@@ -3,6 +3,7 @@ from warnings import warn
 
 import numpy as np
 from numba import prange
+from numba.extending import register_jitable
 
 from ..base.adapter import adaptable, adapter_factory
 from ..base.conservative_process import ConservativeProcess
@@ -13,11 +14,11 @@ from ..constants import (
     SoilType,
     nan,
     nearzero,
-    numba_num_threads,
     one,
     zero,
 )
 from ..parameters import Parameters
+from ..utils.numba_utils import nb_parallel, njit_cached, print_jit_message
 
 ONETHIRD = 1 / 3
 TWOTHIRDS = 2 / 3
@@ -74,6 +75,84 @@ class PRMSSoilzone(ConservativeProcess):
         verbose: Print extra information or not?
     """
 
+    _timestep_state_attrs = (
+        "cap_infil_tot",
+        "cap_waterin",
+        "cov_type",
+        "dprst_evap_hru",
+        "_dprst_flag",
+        "dprst_seep_hru",
+        "dunnian_flow",
+        "fastcoef_lin",
+        "fastcoef_sq",
+        "hru_actet",
+        "hru_frac_perv",
+        "hru_impervevap",
+        "hru_in_to_cf",
+        "hru_intcpevap",
+        "hru_type",
+        "infil_hru",
+        "nhru",
+        "perv_actet",
+        "perv_actet_hru",
+        "potet",
+        "potet_lower",
+        "potet_rechr",
+        "pref_flow",
+        "_pref_flow_den",
+        "_pref_flow_flag",
+        "pref_flow_in",
+        "pref_flow_infil",
+        "pref_flow_infil_frac",
+        "pref_flow_max",
+        "pref_flow_stor",
+        "pref_flow_stor_change",
+        "pref_flow_stor_prev",
+        "pref_flow_thrsh",
+        "recharge",
+        "_sat_threshold",
+        "slow_flow",
+        "slow_stor",
+        "slow_stor_change",
+        "slow_stor_prev",
+        "slowcoef_lin",
+        "slowcoef_sq",
+        "snow_evap",
+        "_snow_free",
+        "snowcov_area",
+        "_soil2gw_flag",
+        "soil2gw_max",
+        "soil_lower",
+        "soil_lower_change",
+        "soil_lower_change_hru",
+        "soil_lower_max",
+        "soil_lower_prev",
+        "soil_lower_ratio",
+        "soil_moist",
+        "soil_moist_max",
+        "soil_moist_tot",
+        "soil_rechr",
+        "soil_rechr_change",
+        "soil_rechr_change_hru",
+        "soil_rechr_max",
+        "soil_rechr_prev",
+        "soil_to_gw",
+        "soil_to_ssr",
+        "soil_type",
+        "sroff",
+        "sroff_vol",
+        "ssr2gw_exp",
+        "ssr2gw_rate",
+        "ssr_to_gw",
+        "ssres_flow",
+        "ssres_flow_vol",
+        "ssres_in",
+        "ssres_stor",
+        "swale_actet",
+        "transp_on",
+        "unused_potet",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -544,163 +623,131 @@ class PRMSSoilzone(ConservativeProcess):
             self._calc_method = "numba"
 
         if self._calc_method.lower() == "numba":
-            import numba as nb
+            print_jit_message(self.name, nb_parallel)
 
-            numba_msg = f"{self.name} jit compiling with numba "
-            nb_parallel = (numba_num_threads is not None) and (
-                numba_num_threads > 1
-            )
-            if nb_parallel:
-                numba_msg += f"and using {numba_num_threads} threads"
-            print(numba_msg, flush=True)
-
-            self._calculate_soilzone = nb.njit(
-                fastmath=True, parallel=nb_parallel
-            )(self._calculate_numpy)
-
-            self._compute_gwflow = nb.njit(fastmath=True)(self._compute_gwflow)
-            self._compute_interflow = nb.njit(fastmath=True)(
-                self._compute_interflow
-            )
-            self._compute_soilmoist = nb.njit(fastmath=True)(
-                self._compute_soilmoist
-            )
-            self._compute_szactet = nb.njit(fastmath=True)(
-                self._compute_szactet
+            self._advance_timestep = njit_cached(self._advance_timestep_numpy)
+            self._calculate_timestep = njit_cached(
+                self._calculate_timestep_numpy,
+                fastmath=True,
+                parallel=nb_parallel,
             )
 
         else:
-            self._calculate_soilzone = self._calculate_numpy
+            self._advance_timestep = self._advance_timestep_numpy
+            self._calculate_timestep = self._calculate_timestep_numpy
 
         return
 
     def _advance_variables(self) -> None:
-        self.pref_flow_stor_prev[:] = self.pref_flow_stor
-        self.soil_rechr_prev[:] = self.soil_rechr
-        self.soil_lower_prev[:] = self.soil_lower
-        self.slow_stor_prev[:] = self.slow_stor
+        self._advance_timestep(self.timestep_state)
+        return
+
+    @staticmethod
+    def _advance_timestep_numpy(state) -> None:
+        state.pref_flow_stor_prev[:] = state.pref_flow_stor
+        state.soil_rechr_prev[:] = state.soil_rechr
+        state.soil_lower_prev[:] = state.soil_lower
+        state.slow_stor_prev[:] = state.slow_stor
         return
 
     def _calculate(self, simulation_time):
-        (
-            self.soil_to_gw[:],
-            self.soil_to_ssr[:],
-            self.ssr_to_gw[:],
-            self.slow_flow[:],
-            self.ssres_flow[:],
-            self.potet_rechr[:],
-            self.potet_lower[:],
-            self.cap_waterin[:],
-            self.soil_moist[:],
-            self.soil_rechr[:],
-            self.hru_actet[:],
-            self.cap_infil_tot[:],
-            self.slow_stor[:],
-            self.pref_flow_in[:],
-            self.pref_flow_stor[:],
-            self.perv_actet[:],
-            self.soil_lower[:],
-            self.dunnian_flow[:],
-            self.perv_actet_hru[:],
-            self.pref_flow[:],
-            self.pref_flow_stor_change[:],
-            self.recharge[:],
-            self.slow_stor_change[:],
-            self.soil_lower_change[:],
-            self.soil_lower_change_hru[:],
-            self.soil_lower_ratio[:],
-            self.soil_moist_tot[:],
-            self.soil_rechr_change[:],
-            self.soil_rechr_change_hru[:],
-            self.sroff[:],
-            self.ssres_flow_vol[:],
-            self.ssres_in[:],
-            self.ssres_stor[:],
-            self.swale_actet[:],
-            self.unused_potet[:],
-        ) = self._calculate_soilzone(
-            _pref_flow_flag=self._pref_flow_flag,
-            _snow_free=self._snow_free,
-            _soil2gw_flag=self._soil2gw_flag,
-            cap_infil_tot=self.cap_infil_tot,
-            cap_waterin=self.cap_waterin,
-            compute_gwflow=self._compute_gwflow,
-            compute_interflow=self._compute_interflow,
-            compute_soilmoist=self._compute_soilmoist,
-            compute_szactet=self._compute_szactet,
-            cov_type=self.cov_type,
-            current_time=self.control.current_time,
-            dprst_evap_hru=self.dprst_evap_hru,
-            dprst_flag=self._dprst_flag,
-            dprst_seep_hru=self.dprst_seep_hru,
-            dunnian_flow=self.dunnian_flow,
-            fastcoef_lin=self.fastcoef_lin,
-            fastcoef_sq=self.fastcoef_sq,
-            hru_actet=self.hru_actet,
-            hru_frac_perv=self.hru_frac_perv,
-            hru_impervevap=self.hru_impervevap,
-            hru_in_to_cf=self.hru_in_to_cf,
-            hru_intcpevap=self.hru_intcpevap,
-            hru_type=self.hru_type,
-            infil_hru=self.infil_hru,
-            nhru=self.nhru,
-            perv_actet=self.perv_actet,
-            perv_actet_hru=self.perv_actet_hru,
-            potet=self.potet,
-            potet_lower=self.potet_lower,
-            potet_rechr=self.potet_rechr,
-            pref_flow=self.pref_flow,
-            pref_flow_den=self._pref_flow_den,
-            pref_flow_in=self.pref_flow_in,
-            pref_flow_infil=self.pref_flow_infil,
-            pref_flow_infil_frac=self.pref_flow_infil_frac,
-            pref_flow_max=self.pref_flow_max,
-            pref_flow_stor=self.pref_flow_stor,
-            pref_flow_stor_change=self.pref_flow_stor_change,
-            pref_flow_stor_prev=self.pref_flow_stor_prev,
-            pref_flow_thrsh=self.pref_flow_thrsh,
-            recharge=self.recharge,
-            sat_threshold=self._sat_threshold,
-            slow_flow=self.slow_flow,
-            slow_stor=self.slow_stor,
-            slow_stor_change=self.slow_stor_change,
-            slow_stor_prev=self.slow_stor_prev,
-            slowcoef_lin=self.slowcoef_lin,
-            slowcoef_sq=self.slowcoef_sq,
-            snow_evap=self.snow_evap,
-            snowcov_area=self.snowcov_area,
-            soil2gw_max=self.soil2gw_max,
-            soil_lower=self.soil_lower,
-            soil_lower_change=self.soil_lower_change,
-            soil_lower_change_hru=self.soil_lower_change_hru,
-            soil_lower_max=self.soil_lower_max,
-            soil_lower_prev=self.soil_lower_prev,
-            soil_lower_ratio=self.soil_lower_ratio,
-            soil_moist=self.soil_moist,
-            soil_moist_max=self.soil_moist_max,
-            soil_moist_tot=self.soil_moist_tot,
-            soil_rechr=self.soil_rechr,
-            soil_rechr_change=self.soil_rechr_change,
-            soil_rechr_change_hru=self.soil_rechr_change_hru,
-            soil_rechr_max=self.soil_rechr_max,
-            soil_rechr_prev=self.soil_rechr_prev,
-            soil_to_gw=self.soil_to_gw,
-            soil_to_ssr=self.soil_to_ssr,
-            soil_type=self.soil_type,
-            sroff=self.sroff,
-            ssr2gw_exp=self.ssr2gw_exp,
-            ssr2gw_rate=self.ssr2gw_rate,
-            ssr_to_gw=self.ssr_to_gw,
-            ssres_flow=self.ssres_flow,
-            ssres_flow_vol=self.ssres_flow_vol,
-            ssres_in=self.ssres_in,
-            ssres_stor=self.ssres_stor,
-            swale_actet=self.swale_actet,
-            transp_on=self.transp_on,
-            unused_potet=self.unused_potet,
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            simulation_time,
         )
+        return
 
-        self.sroff_vol[:] = self.sroff * self.hru_in_to_cf
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        _calculate_soilzone(
+            _pref_flow_flag=state.pref_flow_flag,
+            _snow_free=state.snow_free,
+            _soil2gw_flag=state.soil2gw_flag,
+            cap_infil_tot=state.cap_infil_tot,
+            cap_waterin=state.cap_waterin,
+            cov_type=state.cov_type,
+            dprst_evap_hru=state.dprst_evap_hru,
+            dprst_flag=state.dprst_flag,
+            dprst_seep_hru=state.dprst_seep_hru,
+            dunnian_flow=state.dunnian_flow,
+            fastcoef_lin=state.fastcoef_lin,
+            fastcoef_sq=state.fastcoef_sq,
+            hru_actet=state.hru_actet,
+            hru_frac_perv=state.hru_frac_perv,
+            hru_impervevap=state.hru_impervevap,
+            hru_in_to_cf=state.hru_in_to_cf,
+            hru_intcpevap=state.hru_intcpevap,
+            hru_type=state.hru_type,
+            infil_hru=state.infil_hru,
+            nhru=state.nhru,
+            perv_actet=state.perv_actet,
+            perv_actet_hru=state.perv_actet_hru,
+            potet=state.potet,
+            potet_lower=state.potet_lower,
+            potet_rechr=state.potet_rechr,
+            pref_flow=state.pref_flow,
+            pref_flow_den=state.pref_flow_den,
+            pref_flow_in=state.pref_flow_in,
+            pref_flow_infil=state.pref_flow_infil,
+            pref_flow_infil_frac=state.pref_flow_infil_frac,
+            pref_flow_max=state.pref_flow_max,
+            pref_flow_stor=state.pref_flow_stor,
+            pref_flow_stor_change=state.pref_flow_stor_change,
+            pref_flow_stor_prev=state.pref_flow_stor_prev,
+            pref_flow_thrsh=state.pref_flow_thrsh,
+            recharge=state.recharge,
+            sat_threshold=state.sat_threshold,
+            slow_flow=state.slow_flow,
+            slow_stor=state.slow_stor,
+            slow_stor_change=state.slow_stor_change,
+            slow_stor_prev=state.slow_stor_prev,
+            slowcoef_lin=state.slowcoef_lin,
+            slowcoef_sq=state.slowcoef_sq,
+            snow_evap=state.snow_evap,
+            snowcov_area=state.snowcov_area,
+            soil2gw_max=state.soil2gw_max,
+            soil_lower=state.soil_lower,
+            soil_lower_change=state.soil_lower_change,
+            soil_lower_change_hru=state.soil_lower_change_hru,
+            soil_lower_max=state.soil_lower_max,
+            soil_lower_prev=state.soil_lower_prev,
+            soil_lower_ratio=state.soil_lower_ratio,
+            soil_moist=state.soil_moist,
+            soil_moist_max=state.soil_moist_max,
+            soil_moist_tot=state.soil_moist_tot,
+            soil_rechr=state.soil_rechr,
+            soil_rechr_change=state.soil_rechr_change,
+            soil_rechr_change_hru=state.soil_rechr_change_hru,
+            soil_rechr_max=state.soil_rechr_max,
+            soil_rechr_prev=state.soil_rechr_prev,
+            soil_to_gw=state.soil_to_gw,
+            soil_to_ssr=state.soil_to_ssr,
+            soil_type=state.soil_type,
+            sroff=state.sroff,
+            ssr2gw_exp=state.ssr2gw_exp,
+            ssr2gw_rate=state.ssr2gw_rate,
+            ssr_to_gw=state.ssr_to_gw,
+            ssres_flow=state.ssres_flow,
+            ssres_flow_vol=state.ssres_flow_vol,
+            ssres_in=state.ssres_in,
+            ssres_stor=state.ssres_stor,
+            swale_actet=state.swale_actet,
+            transp_on=state.transp_on,
+            unused_potet=state.unused_potet,
+        )
+
+        state.sroff_vol[:] = state.sroff * state.hru_in_to_cf
 
         return
 
@@ -711,12 +758,7 @@ class PRMSSoilzone(ConservativeProcess):
         _soil2gw_flag,
         cap_infil_tot,
         cap_waterin,
-        compute_gwflow,
-        compute_interflow,
-        compute_soilmoist,
-        compute_szactet,
         cov_type,
-        current_time,
         dprst_evap_hru,
         dprst_flag,
         dprst_seep_hru,
@@ -814,10 +856,10 @@ class PRMSSoilzone(ConservativeProcess):
         # soil_moist_prev[:] = soil_moist
 
         # JLM: ET calculations to be removed from soilzone.
-        hru_actet = hru_impervevap + hru_intcpevap + snow_evap
+        hru_actet[:] = hru_impervevap + hru_intcpevap + snow_evap
 
         if dprst_flag:
-            hru_actet = hru_actet + dprst_evap_hru
+            hru_actet[:] = hru_actet + dprst_evap_hru
 
         # <
         for hh in prange(nhru):
@@ -901,7 +943,7 @@ class PRMSSoilzone(ConservativeProcess):
                     soil_rechr[hh],
                     soil_to_gw[hh],
                     soil_to_ssr[hh],
-                ) = compute_soilmoist(
+                ) = _compute_soilmoist(
                     _soil2gw_flag[hh],
                     hru_frac_perv[hh],
                     soil_moist_max[hh],
@@ -976,7 +1018,7 @@ class PRMSSoilzone(ConservativeProcess):
                     (
                         slow_stor[hh],
                         slow_flow[hh],
-                    ) = compute_interflow(
+                    ) = _compute_interflow(
                         slowcoef_lin[hh],
                         slowcoef_sq[hh],
                         ssresin,
@@ -993,7 +1035,7 @@ class PRMSSoilzone(ConservativeProcess):
                 (
                     ssr_to_gw[hh],
                     slow_stor[hh],
-                ) = compute_gwflow(
+                ) = _compute_gwflow(
                     ssr2gw_rate[hh],
                     ssr2gw_exp[hh],
                     slow_stor[hh],
@@ -1025,7 +1067,7 @@ class PRMSSoilzone(ConservativeProcess):
                     (
                         pref_flow_stor[hh],
                         prefflow,
-                    ) = compute_interflow(
+                    ) = _compute_interflow(
                         fastcoef_lin[hh],
                         fastcoef_sq[hh],
                         pref_flow_in[hh],
@@ -1049,7 +1091,7 @@ class PRMSSoilzone(ConservativeProcess):
                     potet_rechr[hh],
                     potet_lower[hh],
                     perv_actet[hh],
-                ) = compute_szactet(
+                ) = _compute_szactet(
                     transp_on[hh],
                     cov_type[hh],
                     soil_type[hh],
@@ -1123,11 +1165,11 @@ class PRMSSoilzone(ConservativeProcess):
             / soil_lower_max[wh_lower_stor_max_gt_zero]
         )
 
-        soil_moist_tot = ssres_stor + soil_moist * hru_frac_perv
-        recharge = soil_to_gw + ssr_to_gw
+        soil_moist_tot[:] = ssres_stor + soil_moist * hru_frac_perv
+        recharge[:] = soil_to_gw + ssr_to_gw
 
         if dprst_flag:
-            recharge = recharge + dprst_seep_hru
+            recharge[:] = recharge + dprst_seep_hru
 
         pref_flow_stor_change[:] = pref_flow_stor - pref_flow_stor_prev
         soil_lower_change[:] = soil_lower - soil_lower_prev
@@ -1144,43 +1186,7 @@ class PRMSSoilzone(ConservativeProcess):
 
         ssres_flow_vol[:] = ssres_flow * hru_in_to_cf
 
-        return (
-            soil_to_gw,
-            soil_to_ssr,
-            ssr_to_gw,
-            slow_flow,
-            ssres_flow,
-            potet_rechr,
-            potet_lower,
-            cap_waterin,
-            soil_moist,
-            soil_rechr,
-            hru_actet,
-            cap_infil_tot,
-            slow_stor,
-            pref_flow_in,
-            pref_flow_stor,
-            perv_actet,
-            soil_lower,
-            dunnian_flow,
-            perv_actet_hru,
-            pref_flow,
-            pref_flow_stor_change,
-            recharge,
-            slow_stor_change,
-            soil_lower_change,
-            soil_lower_change_hru,
-            soil_lower_ratio,
-            soil_moist_tot,
-            soil_rechr_change,
-            soil_rechr_change_hru,
-            sroff,
-            ssres_flow_vol,
-            ssres_in,
-            ssres_stor,
-            swale_actet,
-            unused_potet,
-        )
+        return
 
     @staticmethod
     def _compute_soilmoist(
@@ -1450,3 +1456,21 @@ class PRMSSoilzone(ConservativeProcess):
             potet_lower,
             et,  # -> perv_actet
         )
+
+
+# The kernels call these helpers as module-level functions, compiled with
+# (and cached on disk with) the calling kernel, see
+# pywatershed.utils.numba_utils.
+_compute_gwflow = register_jitable(fastmath=True)(PRMSSoilzone._compute_gwflow)
+_compute_interflow = register_jitable(fastmath=True)(
+    PRMSSoilzone._compute_interflow
+)
+_compute_soilmoist = register_jitable(fastmath=True)(
+    PRMSSoilzone._compute_soilmoist
+)
+_compute_szactet = register_jitable(fastmath=True)(
+    PRMSSoilzone._compute_szactet
+)
+_calculate_soilzone = register_jitable(fastmath=True, parallel=nb_parallel)(
+    PRMSSoilzone._calculate_numpy
+)
@@ -4,7 +4,7 @@ from ..base.adapter import adaptable
 from ..base.control import Control
 from ..constants import nan, zero
 from ..parameters import Parameters
-from .prms_soilzone import PRMSSoilzone
+from .prms_soilzone import PRMSSoilzone, _calculate_soilzone
 
 ONETHIRD = 1 / 3
 TWOTHIRDS = 2 / 3
@@ -55,6 +55,81 @@ class PRMSSoilzoneNoDprst(PRMSSoilzone):
         verbose: Print extra information or not?
     """
 
+    _timestep_state_attrs = (
+        "cap_infil_tot",
+        "cap_waterin",
+        "cov_type",
+        "dunnian_flow",
+        "fastcoef_lin",
+        "fastcoef_sq",
+        "hru_actet",
+        "hru_frac_perv",
+        "hru_impervevap",
+        "hru_in_to_cf",
+        "hru_intcpevap",
+        "hru_type",
+        "infil_hru",
+        "nhru",
+        "perv_actet",
+        "perv_actet_hru",
+        "potet",
+        "potet_lower",
+        "potet_rechr",
+        "pref_flow",
+        "pref_flow_den",
+        "_pref_flow_flag",
+        "pref_flow_in",
+        "pref_flow_infil",
+        "pref_flow_infil_frac",
+        "pref_flow_max",
+        "pref_flow_stor",
+        "pref_flow_stor_change",
+        "pref_flow_stor_prev",
+        "pref_flow_thrsh",
+        "recharge",
+        "_sat_threshold",
+        "slow_flow",
+        "slow_stor",
+        "slow_stor_change",
+        "slow_stor_prev",
+        "slowcoef_lin",
+        "slowcoef_sq",
+        "snow_evap",
+        "_snow_free",
+        "snowcov_area",
+        "_soil2gw_flag",
+        "soil2gw_max",
+        "soil_lower",
+        "soil_lower_change",
+        "soil_lower_change_hru",
+        "soil_lower_max",
+        "soil_lower_prev",
+        "soil_lower_ratio",
+        "soil_moist",
+        "soil_moist_max",
+        "soil_moist_tot",
+        "soil_rechr",
+        "soil_rechr_change",
+        "soil_rechr_change_hru",
+        "soil_rechr_max",
+        "soil_rechr_prev",
+        "soil_to_gw",
+        "soil_to_ssr",
+        "soil_type",
+        "sroff",
+        "sroff_vol",
+        "ssr2gw_exp",
+        "ssr2gw_rate",
+        "ssr_to_gw",
+        "ssres_flow",
+        "ssres_flow_vol",
+        "ssres_in",
+        "ssres_stor",
+        "swale_actet",
+        "transp_on",
+        "unused_potet",
+    )
+
     def __init__(
         self,
         control: Control,
@@ -223,126 +298,104 @@ class PRMSSoilzoneNoDprst(PRMSSoilzone):
         }
 
     def _calculate(self, simulation_time):
-        zero_array = self.soil_to_gw * zero
+        self._calculate_timestep(
+            self.timestep_state,
+            self.control.itime_step,
+            self.control.current_month,
+            self.control.current_doy,
+            self.control.current_dowy,
+            simulation_time,
+        )
+        return
+
+    @staticmethod
+    def _calculate_timestep_numpy(
+        state,
+        itime_step,
+        current_month,
+        current_doy,
+        current_dowy,
+        time_length,
+    ) -> None:
+        zero_array = state.soil_to_gw * zero
 
-        (
-            self.soil_to_gw[:],
-            self.soil_to_ssr[:],
-            self.ssr_to_gw[:],
-            self.slow_flow[:],
-            self.ssres_flow[:],
-            self.potet_rechr[:],
-            self.potet_lower[:],
-            self.cap_waterin[:],
-            self.soil_moist[:],
-            self.soil_rechr[:],
-            self.hru_actet[:],
-            self.cap_infil_tot[:],
-            self.slow_stor[:],
-            self.pref_flow_in[:],
-            self.pref_flow_stor[:],
-            self.perv_actet[:],
-            self.soil_lower[:],
-            self.dunnian_flow[:],
-            self.perv_actet_hru[:],
-            self.pref_flow[:],
-            self.pref_flow_stor_change[:],
-            self.recharge[:],
-            self.slow_stor_change[:],
-            self.soil_lower_change[:],
-            self.soil_lower_change_hru[:],
-            self.soil_lower_ratio[:],
-            self.soil_moist_tot[:],
-            self.soil_rechr_change[:],
-            self.soil_rechr_change_hru[:],
-            self.sroff[:],
-            self.ssres_flow_vol[:],
-            self.ssres_in[:],
-            self.ssres_stor[:],
-            self.swale_actet[:],
-            self.unused_potet[:],
-        ) = self._calculate_soilzone(
-            _pref_flow_flag=self._pref_flow_flag,
-            _snow_free=self._snow_free,
-            _soil2gw_flag=self._soil2gw_flag,
-            cap_infil_tot=self.cap_infil_tot,
-            cap_waterin=self.cap_waterin,
-            compute_gwflow=self._compute_gwflow,
-            compute_interflow=self._compute_interflow,
-            compute_soilmoist=self._compute_soilmoist,
-            compute_szactet=self._compute_szactet,
-            cov_type=self.cov_type,
-            current_time=self.control.current_time,
+        _calculate_soilzone(
+            _pref_flow_flag=state.pref_flow_flag,
+            _snow_free=state.snow_free,
+            _soil2gw_flag=state.soil2gw_flag,
+            cap_infil_tot=state.cap_infil_tot,
+            cap_waterin=state.cap_waterin,
+            cov_type=state.cov_type,
             dprst_evap_hru=zero_array.copy(),
             dprst_flag=False,
             dprst_seep_hru=zero_array.copy(),
-            dunnian_flow=self.dunnian_flow,
-            fastcoef_lin=self.fastcoef_lin,
-            fastcoef_sq=self.fastcoef_sq,
-            hru_actet=self.hru_actet,
-            hru_frac_perv=self.hru_frac_perv,
-            hru_impervevap=self.hru_impervevap,
-            hru_in_to_cf=self.hru_in_to_cf,
-            hru_intcpevap=self.hru_intcpevap,
-            hru_type=self.hru_type,
-            infil_hru=self.infil_hru,
-            nhru=self.nhru,
-            perv_actet=self.perv_actet,
-            perv_actet_hru=self.perv_actet_hru,
-            potet=self.potet,
-            potet_lower=self.potet_lower,
-            potet_rechr=self.potet_rechr,
-            pref_flow=self.pref_flow,
-            pref_flow_den=self.pref_flow_den,
-            pref_flow_in=self.pref_flow_in,
-            pref_flow_infil=self.pref_flow_infil,
-            pref_flow_infil_frac=self.pref_flow_infil_frac,
-            pref_flow_max=self.pref_flow_max,
-            pref_flow_stor=self.pref_flow_stor,
-            pref_flow_stor_change=self.pref_flow_stor_change,
-            pref_flow_stor_prev=self.pref_flow_stor_prev,
-            pref_flow_thrsh=self.pref_flow_thrsh,
-            recharge=self.recharge,
-            sat_threshold=self._sat_threshold,
-            slow_flow=self.slow_flow,
-            slow_stor=self.slow_stor,
-            slow_stor_change=self.slow_stor_change,
-            slow_stor_prev=self.slow_stor_prev,
-            slowcoef_lin=self.slowcoef_lin,
-            slowcoef_sq=self.slowcoef_sq,
-            snow_evap=self.snow_evap,
-            snowcov_area=self.snowcov_area,
-            soil2gw_max=self.soil2gw_max,
-            soil_lower=self.soil_lower,
-            soil_lower_change=self.soil_lower_change,
-            soil_lower_change_hru=self.soil_lower_change_hru,
-            soil_lower_max=self.soil_lower_max,
-            soil_lower_prev=self.soil_lower_prev,
-            soil_lower_ratio=self.soil_lower_ratio,
-            soil_moist=self.soil_moist,
-            soil_moist_max=self.soil_moist_max,
-            soil_moist_tot=self.soil_moist_tot,
-            soil_rechr=self.soil_rechr,
-            soil_rechr_change=self.soil_rechr_change,
-            soil_rechr_change_hru=self.soil_rechr_change_hru,
-            soil_rechr_max=self.soil_rechr_max,
-            soil_rechr_prev=self.soil_rechr_prev,
-            soil_to_gw=self.soil_to_gw,
-            soil_to_ssr=self.soil_to_ssr,
-            soil_type=self.soil_type,
-            sroff=self.sroff,
-            ssr2gw_exp=self.ssr2gw_exp,
-            ssr2gw_rate=self.ssr2gw_rate,
-            ssr_to_gw=self.ssr_to_gw,
-            ssres_flow=self.ssres_flow,
-            ssres_flow_vol=self.ssres_flow_vol,
-            ssres_in=self.ssres_in,
-            ssres_stor=self.ssres_stor,
-            swale_actet=self.swale_actet,
-            transp_on=self.transp_on,
-            unused_potet=self.unused_potet,
+            dunnian_flow=state.dunnian_flow,
+            fastcoef_lin=state.fastcoef_lin,
+            fastcoef_sq=state.fastcoef_sq,
+            hru_actet=state.hru_actet,
+            hru_frac_perv=state.hru_frac_perv,
+            hru_impervevap=state.hru_impervevap,
+            hru_in_to_cf=state.hru_in_to_cf,
+            hru_intcpevap=state.hru_intcpevap,
+            hru_type=state.hru_type,
+            infil_hru=state.infil_hru,
+            nhru=state.nhru,
+            perv_actet=state.perv_actet,
+            perv_actet_hru=state.perv_actet_hru,
+            potet=state.potet,
+            potet_lower=state.potet_lower,
+            potet_rechr=state.potet_rechr,
+            pref_flow=state.pref_flow,
+            pref_flow_den=state.pref_flow_den,
+            pref_flow_in=state.pref_flow_in,
+            pref_flow_infil=state.pref_flow_infil,
+            pref_flow_infil_frac=state.pref_flow_infil_frac,
+            pref_flow_max=state.pref_flow_max,
+            pref_flow_stor=state.pref_flow_stor,
+            pref_flow_stor_change=state.pref_flow_stor_change,
+            pref_flow_stor_prev=state.pref_flow_stor_prev,
+            pref_flow_thrsh=state.pref_flow_thrsh,
+            recharge=state.recharge,
+            sat_threshold=state.sat_threshold,
+            slow_flow=state.slow_flow,
+            slow_stor=state.slow_stor,
+            slow_stor_change=state.slow_stor_change,
+            slow_stor_prev=state.slow_stor_prev,
+            slowcoef_lin=state.slowcoef_lin,
+            slowcoef_sq=state.slowcoef_sq,
+            snow_evap=state.snow_evap,
+            snowcov_area=state.snowcov_area,
+            soil2gw_max=state.soil2gw_max,
+            soil_lower=state.soil_lower,
+            soil_lower_change=state.soil_lower_change,
+            soil_lower_change_hru=state.soil_lower_change_hru,
+            soil_lower_max=state.soil_lower_max,
+            soil_lower_prev=state.soil_lower_prev,
+            soil_lower_ratio=state.soil_lower_ratio,
+            soil_moist=state.soil_moist,
+            soil_moist_max=state.soil_moist_max,
+            soil_moist_tot=state.soil_moist_tot,
+            soil_rechr=state.soil_rechr,
+            soil_rechr_change=state.soil_rechr_change,
+            soil_rechr_change_hru=state.soil_rechr_change_hru,
+            soil_rechr_max=state.soil_rechr_max,
+            soil_rechr_prev=state.soil_rechr_prev,
+            soil_to_gw=state.soil_to_gw,
+            soil_to_ssr=state.soil_to_ssr,
+            soil_type=state.soil_type,
+            sroff=state.sroff,
+            ssr2gw_exp=state.ssr2gw_exp,
+            ssr2gw_rate=state.ssr2gw_rate,
+            ssr_to_gw=state.ssr_to_gw,
+            ssres_flow=state.ssres_flow,
+            ssres_flow_vol=state.ssres_flow_vol,
+            ssres_in=state.ssres_in,
+            ssres_stor=state.ssres_stor,
+            swale_actet=state.swale_actet,
+            transp_on=state.transp_on,
+            unused_potet=state.unused_potet,
         )
 
-        self.sroff_vol[:] = self.sroff * self.hru_in_to_cf
+        state.sroff_vol[:] = state.sroff * state.hru_in_to_cf
 
         return
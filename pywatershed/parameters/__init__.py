@@ -1,6 +1,13 @@
-from ..base.parameters import Parameters
-from .prms_parameters import PrmsParameters
-from .starfit_parameters import StarfitParameters
+from ..utils.lazy_loader import lazy_attributes
+
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "Parameters": "..base.parameters",
+    "PrmsParameters": ".prms_parameters",
+    "StarfitParameters": ".starfit_parameters",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
 
 __all__ = (
     "Parameters",
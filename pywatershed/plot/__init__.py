@@ -1,3 +1,10 @@
-from .domain_plot import DomainPlot
+from ..utils.lazy_loader import lazy_attributes
 
-__all__ = (DomainPlot,)
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "DomainPlot": ".domain_plot",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
+
+__all__ = ("DomainPlot",)
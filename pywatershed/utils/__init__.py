@@ -1,26 +1,40 @@
-from .cbh_utils import cbh_file_to_netcdf
-from .control import ControlVariables, compare_control_files
-from .csv_utils import CsvFile
-from .netcdf_utils import NetCdfRead, NetCdfWrite
-from .prms5_file_util import PrmsFile
-from .prms5util import (
-    Soltab,
-    load_prms_output,
-    load_prms_statscsv,
-    load_wbl_output,
-)
-from .separate_nhm_params import separate_domain_params_dis_to_ncdf
-from .utils import timer
+from .lazy_loader import lazy_attributes
 
-from .optional_import import import_optional_dependency  # isort:skip
+# The attributes are imported from their modules on first access, see
+# pywatershed.utils.lazy_loader.
+_lazy_attributes = {
+    "ArrayCache": ".cache_utils",
+    "cbh_file_to_netcdf": ".cbh_utils",
+    "ControlVariables": ".control",
+    "compare_control_files": ".control",
+    "CsvFile": ".csv_utils",
+    "HruSegmentMap": ".hru_segment",
+    "netcdf_to_npy": ".memmap_utils",
+    "NetCdfRead": ".netcdf_utils",
+    "NetCdfWrite": ".netcdf_utils",
+    "PrmsFile": ".prms5_file_util",
+    "Soltab": ".prms5util",
+    "load_prms_output": ".prms5util",
+    "load_prms_statscsv": ".prms5util",
+    "load_wbl_output": ".prms5util",
+    "separate_domain_params_dis_to_ncdf": ".separate_nhm_params",
+    "PhaseTimer": ".timing",
+    "timer": ".utils",
+    "import_optional_dependency": ".optional_import",
+}
+__getattr__, __dir__ = lazy_attributes(__name__, _lazy_attributes)
 
 __all__ = (
+    "ArrayCache",
     "cbh_file_to_netcdf",
     "ControlVariables",
     "compare_control_files",
     "CsvFile",
+    "HruSegmentMap",
+    "netcdf_to_npy",
     "NetCdfRead",
     "NetCdfWrite",
+    "PhaseTimer",
     "PrmsFile",
     "Soltab",
     "load_prms_output",
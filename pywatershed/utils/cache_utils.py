@@ -0,0 +1,167 @@
+"""A content-addressed, size-bounded on-disk cache of numpy arrays.
+
+Processes that preprocess their inputs for all of time (PRMSAtmosphere,
+PRMSSolarGeometry) can store the results in an ArrayCache keyed by a hash of
+everything the results depend on: the class and pywatershed version, the
+parameters, the input files and the time window. Repeated runs with the same
+key, e.g. the members of a parameter sweep that do not change the atmosphere
+parameters, load the arrays instead of recomputing them.
+
+Each entry is an uncompressed "<key>.npz" file in the cache directory. The
+modification time of an entry is updated on every load, and when the total
+size of the entries exceeds the maximum size, the least recently used
+entries are removed.
+"""
+
+import hashlib
+import os
+import pathlib as pl
+import tempfile
+
+import numpy as np
+
+from ..constants import fileish
+from ..version import __version__
+
+# 10 GB
+default_cache_max_bytes = 10 * 1024**3
+
+
+class ArrayCache:
+    """A content-addressed on-disk cache of dictionaries of numpy arrays.
+
+    Args:
+        cache_dir: the directory of the cache, created if it does not exist.
+        max_bytes: the maximum total size of the entries in the cache, the
+            least recently used entries are removed to stay below it.
+            Defaults to 10 GB.
+
+    Examples:
+    ---------
+
+    >>> import numpy as np
+    >>> from pywatershed.utils.cache_utils import ArrayCache
+    >>> cache = ArrayCache("./cache")
+    >>> key = cache.key("example", np.arange(3))
+    >>> cache.load(key) is None
+    True
+    >>> cache.save(key, {"x": np.arange(3) * 2})
+    >>> cache.load(key)["x"]
+    array([0, 2, 4])
+    """
+
+    def __init__(self, cache_dir: fileish, max_bytes: int = None):
+        self._cache_dir = pl.Path(cache_dir)
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = default_cache_max_bytes
+        self._max_bytes = max_bytes
+        return
+
+    @property
+    def cache_dir(self) -> pl.Path:
+        """The directory of the cache."""
+        return self._cache_dir
+
+    @staticmethod
+    def key(*parts) -> str:
+        """A hash of the parts, and the pywatershed version, as a key.
+
+        Parts may be numpy arrays (their dtype, shape and values are hashed),
+        paths of files (their resolved name, size and modification time are
+        hashed), dicts (their sorted items are hashed), lists or tuples of
+        parts, None, or anything else with a deterministic repr.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(__version__.encode())
+        for part in parts:
+            _hash_part(hasher, part)
+        return hasher.hexdigest()
+
+    def _entry_file(self, key: str) -> pl.Path:
+        return self._cache_dir / f"{key}.npz"
+
+    def load(self, key: str) -> dict:
+        """Load the arrays of an entry or None if the key is not cached."""
+        entry_file = self._entry_file(key)
+        try:
+            with np.load(entry_file, allow_pickle=False) as entry:
+                arrays = {kk: entry[kk] for kk in entry.files}
+        except (FileNotFoundError, ValueError, OSError):
+            # missing, or removed or truncated by another process
+            return None
+        # the entry was used most recently
+        try:
+            os.utime(entry_file)
+        except FileNotFoundError:
+            pass
+        return arrays
+
+    def save(self, key: str, arrays: dict) -> None:
+        """Save a dictionary of arrays as an entry and evict as necessary."""
+        # write to a temporary file and move it so that concurrent runs
+        # never load a partial entry
+        fd, tmp_file = tempfile.mkstemp(dir=self._cache_dir, suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_file, self._entry_file(key))
+        except BaseException:
+            pl.Path(tmp_file).unlink(missing_ok=True)
+            raise
+        self.evict()
+        return
+
+    def evict(self) -> None:
+        """Remove the least recently used entries above the maximum size."""
+        entries = []
+        for entry_file in self._cache_dir.glob("*.npz"):
+            try:
+                stat = entry_file.stat()
+            except FileNotFoundError:
+                continue
+            entries += [(stat.st_mtime_ns, stat.st_size, entry_file)]
+        total_bytes = sum(ee[1] for ee in entries)
+        for _, size, entry_file in sorted(entries):
+            if total_bytes <= self._max_bytes:
+                break
+            entry_file.unlink(missing_ok=True)
+            total_bytes -= size
+        return
+
+    @property
+    def n_bytes(self) -> int:
+        """The total size of the entries in the cache."""
+        return sum(ff.stat().st_size for ff in self._cache_dir.glob("*.npz"))
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        for entry_file in self._cache_dir.glob("*.npz"):
+            entry_file.unlink(missing_ok=True)
+        return
+
+
+def _hash_part(hasher, part) -> None:
+    if isinstance(part, np.ndarray):
+        part = np.ma.getdata(part)
+        hasher.update(f"array{part.dtype.str}{part.shape}".encode())
+        if part.dtype.hasobject:
+            hasher.update(repr(part.tolist()).encode())
+        else:
+            hasher.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, pl.Path):
+        path = part.resolve()
+        stat = path.stat()
+        hasher.update(f"file{path}{stat.st_size}{stat.st_mtime_ns}".encode())
+    elif isinstance(part, dict):
+        hasher.update(b"dict")
+        for kk in sorted(part.keys()):
+            _hash_part(hasher, kk)
+            _hash_part(hasher, part[kk])
+    elif isinstance(part, (list, tuple)):
+        hasher.update(f"seq{len(part)}".encode())
+        for pp in part:
+            _hash_part(hasher, pp)
+    else:
+        hasher.update(f"{type(part).__name__}{part!r}".encode())
+    return
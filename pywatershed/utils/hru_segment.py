@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class HruSegmentMap:
+    """Aggregate HRU values to the segments they drain to.
+
+    The (zero-based) HRU to segment mapping is precomputed once so that
+    mapping HRU fluxes to segment lateral inflows is a single vectorized
+    reduction instead of a python loop over HRUs each timestep. HRUs are
+    accumulated in HRU order, so results are identical to the equivalent
+    loop.
+
+    HRUs with a negative segment index are not connected to the channel
+    network. Their values are excluded from the aggregation and are
+    available via :meth:`disconnected_values`.
+
+    Args:
+        hru_segment: zero-based segment index of each HRU, negative for HRUs
+            not connected to a segment.
+        nsegment: the number of segments (or nodes) to aggregate to. May be
+            larger than the number of segments referenced by hru_segment.
+    """
+
+    def __init__(self, hru_segment: np.ndarray, nsegment: int):
+        self._hru_segment = np.asarray(hru_segment).astype("int64")
+        self._nhru = len(self._hru_segment)
+        self._nsegment = int(nsegment)
+        self._connected = self._hru_segment >= 0
+        self._disconnected = ~self._connected
+        self._any_disconnected = bool(self._disconnected.any())
+        self._connected_hrus = np.where(self._connected)[0]
+        self._segments = self._hru_segment[self._connected]
+        return
+
+    @property
+    def nhru(self) -> int:
+        return self._nhru
+
+    @property
+    def nsegment(self) -> int:
+        return self._nsegment
+
+    @property
+    def connected(self) -> np.ndarray:
+        """Boolean mask of HRUs draining to a segment."""
+        return self._connected
+
+    @property
+    def disconnected(self) -> np.ndarray:
+        """Boolean mask of HRUs not draining to any segment."""
+        return self._disconnected
+
+    def aggregate(
+        self, hru_values: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """Sum HRU values on to segments.
+
+        Args:
+            hru_values: values on HRUs, either with shape (nhru,) or
+                (ntime, nhru).
+            out: optional array of shape (nsegment,) or (ntime, nsegment) in
+                which to place the result.
+
+        Returns:
+            The segment sums of hru_values.
+        """
+        hru_values = np.asarray(hru_values)
+        if hru_values.ndim == 1:
+            if self._any_disconnected:
+                weights = hru_values[self._connected_hrus]
+            else:
+                weights = hru_values
+            result = np.bincount(
+                self._segments, weights=weights, minlength=self._nsegment
+            )
+
+        else:
+            # Offset the segment index by time to reduce all times at once.
+            ntime = hru_values.shape[0]
+            offsets = np.arange(ntime, dtype="int64")[:, None] * (
+                self._nsegment
+            )
+            index = (offsets + self._segments[None, :]).ravel()
+            weights = hru_values[:, self._connected_hrus].ravel()
+            result = np.bincount(
+                index, weights=weights, minlength=ntime * self._nsegment
+            ).reshape(ntime, self._nsegment)
+
+        if out is None:
+            return result
+
+        out[:] = result
+        return out
+
+    def disconnected_values(
+        self, hru_values: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """HRU values on HRUs not connected to a segment, zero elsewhere.
+
+        Args:
+            hru_values: values on HRUs with shape (nhru,).
+            out: optional array of shape (nhru,) in which to place the
+                result.
+
+        Returns:
+            The values of hru_values on disconnected HRUs.
+        """
+        if out is None:
+            out = np.zeros_like(hru_values)
+        else:
+            out[:] = 0.0
+
+        if self._any_disconnected:
+            out[self._disconnected] = hru_values[self._disconnected]
+
+        return out
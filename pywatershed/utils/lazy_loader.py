@@ -0,0 +1,59 @@
+"""Lazy loading of the attributes of packages (PEP 562).
+
+The ``__init__`` of a package lists the attributes it exports and the
+modules defining them, and calls :func:`lazy_attributes` for its module
+``__getattr__`` and ``__dir__``. A module is only imported when one of its
+attributes is first accessed (e.g. ``pywatershed.PRMSSnow`` or
+``from pywatershed import PRMSSnow``), so ``import pywatershed`` does not
+import numba kernels, plotting libraries or optional dependencies which a
+program does not use.
+"""
+
+import importlib
+import importlib.util
+import sys
+from typing import Callable, Tuple
+
+
+def lazy_attributes(
+    package: str, attributes: dict
+) -> Tuple[Callable, Callable]:
+    """The module __getattr__ and __dir__ of a lazily loaded package.
+
+    Args:
+        package: the __name__ of the package.
+        attributes: a dictionary of attribute names and the module, relative
+            to the package (e.g. ".base.control"), defining each. An
+            attribute with the name of its module (e.g. "meta": ".base.meta")
+            is the module itself.
+
+    Returns:
+        The __getattr__ and __dir__ functions for the package. Attributes
+        not in attributes which are submodules of the package (e.g.
+        "constants") are also imported on access.
+    """
+
+    def __getattr__(name: str):
+        if name in attributes.keys():
+            module_name = attributes[name]
+            module = importlib.import_module(module_name, package)
+            if module_name.rsplit(".", 1)[-1] == name:
+                value = module
+            else:
+                value = getattr(module, name)
+
+        elif importlib.util.find_spec(f"{package}.{name}") is not None:
+            value = importlib.import_module(f"{package}.{name}")
+
+        else:
+            msg = f"module {package!r} has no attribute {name!r}"
+            raise AttributeError(msg)
+
+        # later accesses do not call __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> list:
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -0,0 +1,122 @@
+"""Uncompressed, memory-mappable copies of pywatershed input files.
+
+A NetCDF input variable is written to "<variable>.npy", an uncompressed numpy
+array with the time (or doy) dimension first, and a sidecar header,
+"<variable>.header.npz", holding its time coordinate and spatial ids. Reading
+these with a memory map (see AdapterMemmap) avoids decompressing the data
+for every run and lets the operating system's page cache serve repeated runs
+on the same inputs.
+"""
+
+import pathlib as pl
+
+import numpy as np
+
+from ..constants import fileish
+from .netcdf_utils import NetCdfRead, nc4_lock
+
+header_suffix = ".header.npz"
+
+# time steps converted at once
+_convert_n_times = 365
+
+
+def npy_header_file(npy_file: fileish) -> pl.Path:
+    """The header file name of a .npy input file."""
+    npy_file = pl.Path(npy_file)
+    return npy_file.with_name(npy_file.stem + header_suffix)
+
+
+def netcdf_to_npy(
+    nc_file: fileish,
+    output_dir: fileish = None,
+    variables: list = None,
+) -> list:
+    """Convert variables in a NetCDF input file to .npy files and headers.
+
+    Args:
+        nc_file: the NetCDF file to convert.
+        output_dir: the directory of the output files, defaults to the
+            directory of nc_file.
+        variables: the variables to convert, defaults to all variables other
+            than the time and spatial id coordinates.
+
+    Returns:
+        A list of the .npy files written.
+
+    Examples:
+    ---------
+
+    >>> import pywatershed as pws
+    >>> from pywatershed.utils.memmap_utils import netcdf_to_npy
+    >>> netcdf_to_npy("prcp.nc")
+    [PosixPath('prcp.npy')]
+    """
+    nc_file = pl.Path(nc_file)
+    if output_dir is None:
+        output_dir = nc_file.parent
+    output_dir = pl.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    nc_read = NetCdfRead(nc_file)
+    if variables is None:
+        variables = nc_read.variables
+
+    header = {}
+    if hasattr(nc_read, "_time"):
+        header["time"] = nc_read._time
+    else:
+        header["doy"] = nc_read._doy
+    for id_name, id_values in nc_read._spatial_ids.items():
+        header[id_name] = np.ma.getdata(id_values)
+
+    npy_files = []
+    for variable in variables:
+        with nc4_lock:
+            nc_var = nc_read.dataset[variable]
+            shape = nc_var.shape
+            dtype = nc_var.dtype
+            dims = nc_var.dimensions
+
+        if dims[0] not in ("time", "doy"):
+            msg = f"The first dimension of {variable} is not time or doy"
+            raise ValueError(msg)
+
+        npy_file = output_dir / f"{variable}.npy"
+        data = np.lib.format.open_memmap(
+            npy_file, mode="w+", dtype=dtype, shape=shape
+        )
+        for start in range(0, shape[0], _convert_n_times):
+            end = min(start + _convert_n_times, shape[0])
+            with nc4_lock:
+                data[start:end] = np.ma.getdata(nc_var[start:end])
+        data.flush()
+        del data
+
+        np.savez(
+            npy_header_file(npy_file),
+            variable=np.array(variable),
+            dims=np.array(dims),
+            **header,
+        )
+        npy_files += [npy_file]
+
+    nc_read.close()
+    return npy_files
+
+
+def read_npy_header(npy_file: fileish) -> dict:
+    """Read the header of a .npy input file written by netcdf_to_npy().
+
+    Args:
+        npy_file: the .npy file (not the header file).
+
+    Returns:
+        A dictionary with the variable name, dims, the time (or doy)
+        coordinate, and the spatial ids.
+    """
+    with np.load(npy_header_file(npy_file), allow_pickle=False) as header:
+        result = {kk: header[kk] for kk in header.files}
+    result["variable"] = str(result["variable"])
+    result["dims"] = tuple(str(dd) for dd in result["dims"])
+    return result
@@ -13,6 +13,7 @@ from pywatershed import Control, meta
 from ..constants import fileish, zero
 from ..parameters import PrmsParameters
 from ..utils import import_optional_dependency
+from .hru_segment import HruSegmentMap
 
 mpsplines = import_optional_dependency("mpsplines", errors="warn")
 
@@ -342,6 +343,9 @@ class MmrToMf6Dfw:
         # set dimensions on self
         self._nsegment = self.parameters.dims["nsegment"]
         self._hru_segment = self.parameters.parameters["hru_segment"] - 1
+        self._hru_segment_map = HruSegmentMap(
+            self._hru_segment, self._nsegment
+        )
 
         return
 
@@ -648,23 +652,18 @@ class MmrToMf6Dfw:
             # print(f"{prms_nper=}")
 
             # calculate lateral flow term to the REACH/segment from HRUs
+            # This is bad, selective handling of fluxes is not cool,
+            # mass is being discarded in a way that has to be
+            # coordinated
+            # with other parts of the code.
+            # This code shuold be removed evenutally.
+            disconnected = self._hru_segment_map.disconnected
+            inflows[flow_name][:, disconnected] = zero * new_inflow_unit
             lat_inflow_prms = (
-                np.zeros((prms_nper, self._nsegment)) * new_inflow_unit
+                self._hru_segment_map.aggregate(inflows[flow_name].magnitude)
+                * new_inflow_unit
             )
 
-            for ihru in range(self.parameters.dims["nhru"]):
-                iseg = self._hru_segment[ihru]
-                if iseg < 0:
-                    # This is bad, selective handling of fluxes is not cool,
-                    # mass is being discarded in a way that has to be
-                    # coordinated
-                    # with other parts of the code.
-                    # This code shuold be removed evenutally.
-                    inflows[flow_name][:, ihru] = zero * new_inflow_unit
-                    continue
-
-                lat_inflow_prms[:, iseg] += inflows[flow_name][:, ihru]
-
             # the target
             lat_inflow = np.zeros((self._nper, self._nsegment))
             time_prms = np.arange(0, prms_nper)
@@ -1,7 +1,12 @@
 import datetime as dt
+import functools
 import pathlib as pl
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from math import ceil
-from typing import Union
+from time import perf_counter
+from typing import Callable, Union
 
 import netCDF4 as nc4
 import numpy as np
@@ -16,6 +21,26 @@ listish = Union[list, tuple]
 arrayish = Union[list, tuple, np.ndarray]
 ATOL = np.finfo(np.float32).eps
 
+# Defaults for chunking NetCDF output, see default_chunk_sizes()
+default_chunk_n_times = 32
+default_chunk_bytes = 2**20
+
+# The netCDF-C and HDF5 libraries are not thread safe and netCDF4 releases the
+# GIL, so all library calls made through this module are serialized.
+nc4_lock = threading.RLock()
+
+
+def _nc4_locked(func):
+    """Decorator to hold nc4_lock for the duration of a method call"""
+
+    @functools.wraps(func)
+    def wrap_func(*args, **kwargs):
+        with nc4_lock:
+            return func(*args, **kwargs)
+
+    return wrap_func
+
+
 # JLM TODO: the implied time dimension seems like a bad idea, it should be
 #    an argument.
 
@@ -41,6 +66,13 @@ class NetCdfRead(Accessor):
         _load_n_time_batches are None, then no time batching is used. This has
         proven an inefficient pattern. The time batching is not implemented for
         DOY (cyclic) variables, only for variables with time dimension "time".
+      prefetch_n_time_batches: optional integer number of time batches to
+        read ahead of the current batch on a background thread, default 0.
+        When the data of a batch are requested, reads of the following
+        batches are started so that they are (ideally) already in memory
+        when they are needed. This allows small batches (to limit memory
+        usage) without waiting on the file at the start of each batch. Each
+        prefetched batch requires the memory of a batch.
     """
 
     def __init__(
@@ -51,8 +83,11 @@ class NetCdfRead(Accessor):
         nc_read_vars: list = None,
         load_n_times: int = None,
         load_n_time_batches: int = 1,
+        prefetch_n_time_batches: int = 0,
     ) -> "NetCdfRead":
         self.name = "NetCdfRead"
+        # an optional PhaseTimer for the time spent in get_data
+        self.timer = None
         self._nc_file = name
         self._nc_read_vars = nc_read_vars
         self._start_time = start_time
@@ -64,6 +99,10 @@ class NetCdfRead(Accessor):
 
         self._load_n_times = load_n_times
         self._load_n_time_batches = load_n_time_batches
+        self._prefetch_n_time_batches = prefetch_n_time_batches
+        self._prefetch_executor = None
+        # futures of prefetched batches by variable and batch number
+        self._prefetched = {}
 
         self._open_nc_file()
         self._itime_step = {}
@@ -71,12 +110,27 @@ class NetCdfRead(Accessor):
             self._itime_step[variable] = 0
 
     def __del__(self):
-        self.close()
+        # A finalizer must not wait on the prefetch thread: it may run on
+        # that thread or while another thread holds the nc4_lock.
+        self._shutdown_prefetch(wait=False)
+        self._close_dataset()
 
     def close(self):
+        self._shutdown_prefetch(wait=True)
+        self._close_dataset()
+
+    def _shutdown_prefetch(self, wait: bool):
+        if getattr(self, "_prefetch_executor", None) is not None:
+            self._prefetch_executor.shutdown(wait=wait, cancel_futures=True)
+            self._prefetch_executor = None
+            self._prefetched = {}
+
+    @_nc4_locked
+    def _close_dataset(self):
         if self.dataset.isopen():
             self.dataset.close()
 
+    @_nc4_locked
     def _open_nc_file(self):
         self.dataset = nc4.Dataset(self._nc_file, "r")
         self.ds_var_list = list(self.dataset.variables.keys())
@@ -119,6 +173,7 @@ class NetCdfRead(Accessor):
                     self._ntimes / self._load_n_time_batches
                 )
                 self._data_loaded = {}
+                self._data_loaded_batch = {}
 
             elif self._load_n_times is not None:
                 # Use ceil to account for the remainder batch
@@ -128,6 +183,7 @@ class NetCdfRead(Accessor):
                     self._ntimes / self._load_n_times
                 )
                 self._data_loaded = {}
+                self._data_loaded_batch = {}
 
             # Note that if neither _load variables is specified, then no time
             # batching is used
@@ -281,15 +337,72 @@ class NetCdfRead(Accessor):
             arr: numpy array with the data for a variable
 
         """
+        if self.timer is None:
+            return self._get_data(variable, itime_step)
+
+        start = perf_counter()
+        data = self._get_data(variable, itime_step)
+        self.timer.add(
+            pl.Path(self._nc_file).name, "read", perf_counter() - start
+        )
+        return data
+
+    def get_data_window(
+        self, variable: str, start: int, end: int
+    ) -> np.ndarray:
+        """Get data for a variable for a window of time steps
+
+        Only the window is read, independent of time batching.
+
+        Args:
+            variable: variable name
+            start: the first time step, relative to start_time
+            end: the time step after the last, relative to start_time
+
+        Returns:
+            arr: numpy array with the data for the time steps start to end
+        """
         if variable not in self._nc_read_vars:
             raise ValueError(
                 f"'{variable}' not in list of available variables"
             )
+        if start < 0 or end > self._ntimes or start >= end:
+            msg = (
+                f"requested time steps {start} to {end} but only "
+                f"{self._ntimes} time steps are available."
+            )
+            raise ValueError(msg)
 
-        if itime_step is None:
-            return self.dataset[variable][
-                self._start_index : (self._end_index + 1), :
+        read_start = perf_counter()
+        with nc4_lock:
+            data = self.dataset[variable][
+                (self._start_index + start) : (self._start_index + end), :
             ]
+        if self.timer is not None:
+            self.timer.add(
+                pl.Path(self._nc_file).name,
+                "read",
+                perf_counter() - read_start,
+            )
+        return data
+
+    def _get_data(
+        self,
+        variable: str,
+        itime_step: int = None,
+    ) -> np.ndarray:
+        # nc4_lock is only held while reading so that waiting for a batch
+        # being read by the prefetch thread does not block it.
+        if variable not in self._nc_read_vars:
+            raise ValueError(
+                f"'{variable}' not in list of available variables"
+            )
+
+        if itime_step is None:
+            with nc4_lock:
+                return self.dataset[variable][
+                    self._start_index : (self._end_index + 1), :
+                ]
 
         else:
             if itime_step >= self._ntimes:
@@ -299,28 +412,73 @@ class NetCdfRead(Accessor):
                 )
 
             if hasattr(self, "_data_loaded"):
-                # load when needed, at the beginning of each batch
+                # load when needed, at the beginning of each batch or when
+                # resuming within a batch (e.g. from a checkpoint)
                 batch_index = itime_step % self._load_n_times
-                if batch_index == 0:
-                    ith_batch = itime_step // self._load_n_times
-                    # print(
-                    #     f"load batch "
-                    #     f"#{ith_batch}/{self._load_n_time_batches-1}: "
-                    #     f"{variable}"
-                    # )
-                    start_ind = self._start_index + (
-                        ith_batch * self._load_n_times
+                ith_batch = itime_step // self._load_n_times
+                if (
+                    batch_index == 0
+                    or self._data_loaded_batch.get(variable) != ith_batch
+                ):
+                    self._data_loaded[variable] = self._get_batch(
+                        variable, ith_batch
                     )
-                    end_ind = start_ind + self._load_n_times
-                    self._data_loaded[variable] = self.dataset[variable][
-                        start_ind:end_ind, :
-                    ]
+                    self._data_loaded_batch[variable] = ith_batch
 
                 return self._data_loaded[variable][batch_index, :]
 
             else:
                 # no time batching
-                return self.dataset[variable][itime_step, :]
+                with nc4_lock:
+                    return self.dataset[variable][itime_step, :]
+
+    @_nc4_locked
+    def _read_batch(self, variable: str, ith_batch: int) -> np.ndarray:
+        # print(
+        #     f"load batch "
+        #     f"#{ith_batch}/{self._load_n_time_batches-1}: "
+        #     f"{variable}"
+        # )
+        start_ind = self._start_index + (ith_batch * self._load_n_times)
+        end_ind = start_ind + self._load_n_times
+        return self.dataset[variable][start_ind:end_ind, :]
+
+    def _get_batch(self, variable: str, ith_batch: int) -> np.ndarray:
+        """Get a time batch, from the prefetched batches when available."""
+        if not self._prefetch_n_time_batches:
+            return self._read_batch(variable, ith_batch)
+
+        prefetched = self._prefetched.setdefault(variable, {})
+        future = prefetched.pop(ith_batch, None)
+        # batches requested out of order (e.g. restored from a checkpoint)
+        for batch in [bb for bb in prefetched.keys() if bb < ith_batch]:
+            prefetched.pop(batch).cancel()
+
+        # the requested batch is read before it competes with prefetching
+        if future is None:
+            data = self._read_batch(variable, ith_batch)
+        else:
+            data = None
+
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="NetCdfRead-prefetch"
+            )
+
+        n_batches = ceil(self._ntimes / self._load_n_times)
+        last_batch = min(
+            ith_batch + self._prefetch_n_time_batches, n_batches - 1
+        )
+        for batch in range(ith_batch + 1, last_batch + 1):
+            if batch not in prefetched.keys():
+                prefetched[batch] = self._prefetch_executor.submit(
+                    self._read_batch, variable, batch
+                )
+
+        if data is None:
+            data = future.result()
+
+        return data
 
     def advance(
         self, variable: str, current_time: np.datetime64 = None
@@ -355,6 +513,10 @@ class NetCdfRead(Accessor):
 class NetCdfWrite(Accessor):
     """Output the csv output data to a netcdf file
 
+    Data passed to add_data() and add_simulation_time() are buffered in
+    memory for n_buffer_times consecutive time steps and written to the file
+    as a single block. Buffered data are written on flush() or close().
+
     Args:
         name: path for netcdf output file
         clobber: boolean indicating if an existing netcdf file should
@@ -362,9 +524,19 @@ class NetCdfWrite(Accessor):
         zlib: boolean indicating if the data should be compressed
             (default is True)
         complevel: compression level (default is 4)
-        chunk_sizes: dictionary defining chunk sizes for the data
+        chunk_sizes: dictionary defining chunk sizes for the data by
+            dimension name, e.g. {"time": 30, "nhm_id": 1000}. A value of 0
+            for a spatial dimension uses its full length. Dimensions not
+            specified use the defaults from default_chunk_sizes().
+        shuffle: boolean indicating if the HDF5 shuffle filter is applied
+            before compression (default is True)
+        n_times: optional, the expected number of times to be written,
+            used to choose default chunk sizes.
+        n_buffer_times: the number of time steps to buffer before writing
+            to file. Defaults to the time chunk size.
     """
 
+    @_nc4_locked
     def __init__(
         self,
         name: fileish,
@@ -376,7 +548,10 @@ class NetCdfWrite(Accessor):
         clobber: bool = True,
         zlib: bool = True,
         complevel: int = 4,
-        chunk_sizes: dict = {"time": 1, "hruid": 0},
+        chunk_sizes: dict = None,
+        shuffle: bool = True,
+        n_times: int = None,
+        n_buffer_times: int = None,
     ):
         if isinstance(variables, dict):
             group_variables = []
@@ -396,6 +571,12 @@ class NetCdfWrite(Accessor):
         else:
             group_variables = variables
 
+        # time step buffers, see add_data()
+        self._n_buffer_times = 1
+        self._buffers = {}
+        self._buffer_start = {}
+        self._buffer_count = {}
+
         self.dataset = nc4.Dataset(name, "w", clobber=clobber)
         self.dataset.setncattr("Description", "pywatershed output data")
         for att_key, att_val in global_attrs.items():
@@ -513,6 +694,7 @@ class NetCdfWrite(Accessor):
             self.node_coord[:] = coordinates["node_coord"]
 
         self.variables = {}
+        time_chunk_sizes = []
         for var_name, group_var_name in zip(variables, group_variables):
             variabletype = meta_netcdf_type(var_meta[var_name])
             if len(
@@ -541,6 +723,16 @@ class NetCdfWrite(Accessor):
             else:
                 time_dim = "time"
 
+            var_chunk_sizes = default_chunk_sizes(
+                len(self.dataset.dimensions[spatial_coordinate]),
+                np.dtype(variabletype).itemsize,
+                n_times=n_times,
+                chunk_sizes=chunk_sizes,
+                spatial_dim=spatial_coordinate,
+            )
+            if time_dim == "time":
+                time_chunk_sizes += [var_chunk_sizes[0]]
+
             self.variables[var_name] = self.dataset.createVariable(
                 group_var_name,
                 variabletype,
@@ -548,28 +740,89 @@ class NetCdfWrite(Accessor):
                 fill_value=nc4.default_fillvals[variabletype],
                 zlib=zlib,
                 complevel=complevel,
-                chunksizes=tuple(chunk_sizes.values()),
+                shuffle=shuffle,
+                chunksizes=var_chunk_sizes,
             )
             for key, val in var_meta[var_name].items():
                 if isinstance(val, dict):
                     continue
                 self.variables[var_name].setncattr(key, val)
 
+        if n_buffer_times is None:
+            if len(time_chunk_sizes):
+                n_buffer_times = max(time_chunk_sizes)
+            else:
+                n_buffer_times = 1
+        self._n_buffer_times = n_buffer_times
+
         return
 
     def __del__(self):
         self.close()
         return
 
+    @_nc4_locked
     def close(self):
         if self.dataset.isopen():
+            self.flush()
             self.dataset.close()
             return
 
+    @_nc4_locked
+    def flush(self) -> None:
+        """Write all buffered data to file."""
+        for name in self._buffers.keys():
+            self._flush_buffer(name)
+        return
+
+    def _flush_buffer(self, name: str) -> None:
+        count = self._buffer_count[name]
+        if count == 0:
+            return
+        start = self._buffer_start[name]
+        if name == "time":
+            self.time[start : start + count] = self._buffers[name][0:count]
+        else:
+            self.variables[name][start : start + count, :] = self._buffers[
+                name
+            ][0:count, :]
+        self._buffer_count[name] = 0
+        return
+
+    def _buffer_data(
+        self, name: str, itime_step: int, current: np.ndarray, dtype
+    ) -> None:
+        if name not in self._buffers.keys():
+            shape = (self._n_buffer_times,) + np.shape(current)
+            self._buffers[name] = np.zeros(shape, dtype=dtype)
+            self._buffer_count[name] = 0
+
+        count = self._buffer_count[name]
+        if count and itime_step != self._buffer_start[name] + count:
+            # only consecutive time steps are written as a block
+            self._flush_buffer(name)
+            count = 0
+
+        if count == 0:
+            self._buffer_start[name] = itime_step
+
+        self._buffers[name][count] = current
+        self._buffer_count[name] = count + 1
+        if self._buffer_count[name] == self._n_buffer_times:
+            self._flush_buffer(name)
+
+        return
+
+    @_nc4_locked
     def add_simulation_time(self, itime_step: int, simulation_time: float):
-        self.time[itime_step] = nc4.date2num(simulation_time, self.time.units)
+        time_num = nc4.date2num(simulation_time, self.time.units)
+        if self._n_buffer_times == 1:
+            self.time[itime_step] = time_num
+        else:
+            self._buffer_data("time", itime_step, time_num, self.time.dtype)
         return
 
+    @_nc4_locked
     def add_data(
         self, name: str, itime_step: int, current: np.ndarray
     ) -> None:
@@ -585,9 +838,46 @@ class NetCdfWrite(Accessor):
         if name not in self.variables.keys():
             raise KeyError(f"{name} not a valid variable name")
         var = self.variables[name]
-        var[itime_step, :] = current[:]
+        if self._n_buffer_times == 1:
+            var[itime_step, :] = current[:]
+        else:
+            self._buffer_data(name, itime_step, current, var.dtype)
+        return
+
+    @_nc4_locked
+    def add_simulation_times(
+        self, itime_step: int, simulation_times: np.ndarray
+    ) -> None:
+        """Add the times of consecutive time steps starting at itime_step."""
+        self.time[itime_step : itime_step + len(simulation_times)] = (
+            nc4.date2num(
+                simulation_times.astype(dt.datetime),
+                units=self.time.units,
+                calendar="standard",
+            )
+        )
+        return
+
+    @_nc4_locked
+    def add_data_block(
+        self, name: str, itime_step: int, data: np.ndarray
+    ) -> None:
+        """Add data for consecutive time steps starting at itime_step
+
+        Args:
+            name: the variable name
+            itime_step: the time step of the first time in data
+            data: the data with time as the first dimension
+
+        Returns:
+            None
+        """
+        if name not in self.variables.keys():
+            raise KeyError(f"{name} not a valid variable name")
+        self.variables[name][itime_step : itime_step + data.shape[0], :] = data
         return
 
+    @_nc4_locked
     def add_all_data(
         self,
         name: str,
@@ -625,6 +915,135 @@ class NetCdfWrite(Accessor):
         return
 
 
+def default_chunk_sizes(
+    n_space: int,
+    itemsize: int = 8,
+    n_times: int = None,
+    chunk_sizes: dict = None,
+    spatial_dim: str = None,
+) -> tuple:
+    """Get (time, space) chunk sizes for a NetCDF output variable.
+
+    By default, chunks span up to default_chunk_n_times in time and are
+    limited in space so that a chunk does not exceed default_chunk_bytes.
+    This keeps chunks large enough to compress well and allows reading the
+    full record at a single location without reading the full domain.
+
+    Args:
+        n_space: the length of the spatial dimension
+        itemsize: the size in bytes of the data type
+        n_times: optional, the expected number of times
+        chunk_sizes: optional dictionary of requested chunk sizes by
+            dimension name which override the defaults. The key "time"
+            is used for time and the key spatial_dim for space. A value of
+            0 for the spatial dimension uses its full length.
+        spatial_dim: the name of the spatial dimension
+
+    Returns:
+        A tuple of (time, space) chunk sizes.
+    """
+    if chunk_sizes is None:
+        chunk_sizes = {}
+
+    if "time" in chunk_sizes.keys():
+        time_chunk = chunk_sizes["time"]
+    else:
+        time_chunk = default_chunk_n_times
+        if n_times is not None:
+            time_chunk = min(time_chunk, n_times)
+    time_chunk = max(1, int(time_chunk))
+
+    if spatial_dim is not None and spatial_dim in chunk_sizes.keys():
+        space_chunk = chunk_sizes[spatial_dim]
+        if space_chunk == 0:
+            space_chunk = n_space
+    else:
+        space_chunk = default_chunk_bytes // (time_chunk * itemsize)
+    space_chunk = min(max(1, int(space_chunk)), max(1, n_space))
+
+    return (time_chunk, space_chunk)
+
+
+class NetCdfAsyncWriter:
+    """Drain NetCDF writes from a bounded buffer on a background thread.
+
+    Writes submitted to this object are executed in submission order by a
+    single background thread so that computation is not stalled by
+    compression and disk writes. The buffer holds at most buffer_size pending
+    writes; submitting to a full buffer blocks until a slot is free, bounding
+    memory use. The caller is responsible for passing data that will not be
+    modified after submission, e.g. copies of the current state.
+
+    Exceptions raised on the writer thread are re-raised on the next call to
+    submit(), flush(), or close().
+
+    Args:
+        buffer_size: the maximum number of pending writes. The default of 2
+            double buffers output.
+    """
+
+    def __init__(self, buffer_size: int = 2):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be at least 1")
+        self._queue = queue.Queue(maxsize=buffer_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._drain, name="NetCdfAsyncWriter", daemon=True
+        )
+        self._thread.start()
+        return
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    func, args = item
+                    func(*args)
+            except BaseException as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise RuntimeError("NetCDF output writer failed") from error
+        return
+
+    def submit(self, func: Callable, *args) -> None:
+        """Queue func(*args) for execution on the writer thread.
+
+        Blocks while the buffer is full.
+        """
+        if self._closed:
+            raise RuntimeError("NetCdfAsyncWriter is closed")
+        self._raise_error()
+        self._queue.put((func, args))
+        return
+
+    def flush(self) -> None:
+        """Block until all pending writes are complete."""
+        if not self._closed:
+            self._queue.join()
+        self._raise_error()
+        return
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread."""
+        if not self._closed:
+            self._queue.join()
+            self._queue.put(None)
+            self._thread.join()
+            self._closed = True
+        self._raise_error()
+        return
+
+
 def subset_netcdf_file(
     file_name: Union[pl.Path, str],
     new_file_name: Union[pl.Path, str],
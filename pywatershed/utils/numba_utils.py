@@ -0,0 +1,169 @@
+"""Compile numba kernels once per session and cache them on disk.
+
+Processes compile their timestep functions (e.g.
+PRMSSnow._calculate_timestep_numpy, see Process.timestep_state) with
+:func:`njit_cached` instead of calling numba.njit in each instance. The
+dispatchers are kept for the Python session, so Processes of later Models and
+ensemble members reuse them, and are compiled with numba's on-disk cache
+(cache=True), so later sessions load the compiled kernels instead of
+compiling them.
+
+numba writes the cache to a __pycache__ directory next to the source file
+or, if that is not writable, to the directory given by the NUMBA_CACHE_DIR
+environment variable or a user cache directory. A cached kernel is
+recompiled when the source file of the kernel changes. Kernels must call
+other kernels as module-level functions registered with
+numba.extending.register_jitable rather than take them as arguments: the
+type of a dispatcher argument is specific to the session and can not be
+cached.
+"""
+
+from typing import Callable
+
+import numpy as np
+from numba.core import cgutils, types
+from numba.experimental import structref
+from numba.extending import intrinsic, overload
+
+from ..constants import numba_num_threads
+
+# kernels use numba's parallel loops (prange) when threads are available
+nb_parallel = (numba_num_threads is not None) and (numba_num_threads > 1)
+
+_dispatchers = {}
+_jit_messages = set()
+
+
+def njit_cached(func: Callable, *args, **kwargs) -> Callable:
+    """The numba.njit dispatcher of a function, cached on disk.
+
+    Args:
+        func: the function to compile.
+        *args: the positional arguments of numba.njit, e.g. a signature.
+        **kwargs: the options of numba.njit, e.g. fastmath or parallel.
+
+    Returns:
+        The dispatcher of func, the same object for the same arguments
+        throughout the Python session.
+    """
+    key = (
+        func.__module__,
+        func.__qualname__,
+        repr(args),
+        tuple(sorted(kwargs.items())),
+    )
+    if key not in _dispatchers.keys():
+        import numba as nb
+
+        _dispatchers[key] = nb.njit(*args, cache=True, **kwargs)(func)
+
+    return _dispatchers[key]
+
+
+def print_jit_message(name: str, parallel: bool) -> None:
+    """Print that the kernels of name are jit compiled, once per session."""
+    if name in _jit_messages:
+        return
+    _jit_messages.add(name)
+    numba_msg = f"{name} jit compiling with numba "
+    if parallel:
+        numba_msg += f"and using {numba_num_threads} threads"
+    print(numba_msg, flush=True)
+    return
+
+
+def copy_to(dst: np.ndarray, src: np.ndarray) -> None:
+    """Copy the values of a 1-D array into another, dst[:] = src.
+
+    In numba compiled functions this is a loop over the elements, which
+    numba compiles to a several times faster copy than the slice assignment.
+    """
+    dst[:] = src
+    return
+
+
+@overload(copy_to, jit_options={"fastmath": True})
+def _copy_to_numba(dst, src):
+    def copy_to_impl(dst, src):
+        for ii in range(dst.shape[0]):
+            dst[ii] = src[ii]
+        return
+
+    return copy_to_impl
+
+
+@structref.register
+class TimestepStateType(types.StructRef):
+    """The numba type of a TimestepState, given by its fields."""
+
+    def preprocess_fields(self, fields):
+        return tuple((name, types.unliteral(typ)) for name, typ in fields)
+
+
+class TimestepState(structref.StructRefProxy):
+    """The timestep state of a Process as a numba structref.
+
+    A compiled object referring to the arrays (and holding the scalars) of
+    the timestep state of a Process (see Process.timestep_state), created
+    once with :func:`timestep_state_structref`. Passing it to a compiled
+    function only passes a pointer, while a tuple of the arrays is
+    converted element by element at each call.
+    """
+
+
+structref.define_boxing(TimestepStateType, TimestepState)
+
+
+@intrinsic
+def _structref_from_tuple(typingctx, values):
+    from numba.experimental.jitclass.base import imp_dtor
+
+    state_type = TimestepStateType(list(zip(values.fields, values)))
+
+    def codegen(context, builder, signature, args):
+        # as numba.experimental.structref.new, with the fields set
+        model = context.data_model_manager[state_type.get_data_type()]
+        alloc_type = model.get_value_type()
+        meminfo = context.nrt.meminfo_alloc_dtor(
+            builder,
+            context.get_constant(
+                types.uintp, context.get_abi_sizeof(alloc_type)
+            ),
+            imp_dtor(context, builder.module, state_type),
+        )
+        data_pointer = builder.bitcast(
+            context.nrt.meminfo_data(builder, meminfo),
+            alloc_type.as_pointer(),
+        )
+        builder.store(cgutils.get_null_value(alloc_type), data_pointer)
+        data = cgutils.create_struct_proxy(state_type.get_data_type())(
+            context, builder, ref=data_pointer
+        )
+        for ii, (name, typ) in enumerate(state_type.field_dict.items()):
+            value = builder.extract_value(args[0], ii)
+            context.nrt.incref(builder, typ, value)
+            setattr(data, name, value)
+
+        state = context.make_helper(builder, state_type)
+        state.meminfo = meminfo
+        return state._getvalue()
+
+    return state_type(values), codegen
+
+
+def _timestep_state_structref(values):
+    return _structref_from_tuple(values)
+
+
+def timestep_state_structref(values: tuple) -> TimestepState:
+    """A TimestepState of the fields and values of a namedtuple.
+
+    The structref refers to (and does not copy) the arrays of the tuple.
+
+    Args:
+        values: a namedtuple, e.g. Process.timestep_state.
+
+    Returns:
+        The TimestepState.
+    """
+    return njit_cached(_timestep_state_structref)(values)
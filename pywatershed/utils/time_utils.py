@@ -64,6 +64,53 @@ def datetime_epiweek(dt64: np.datetime64) -> int:
     return ew.Week.fromdate(dt64_to_dt(dt64)).week
 
 
+def calendar_table(times: np.ndarray) -> dict:
+    """Get the calendar of an array of np.datetime64
+
+    A vectorized version of the functions above, e.g. for all the times of a
+    simulation.
+
+    Args:
+        times: array of np.datetime64.
+
+    Returns:
+        A dictionary of int64 arrays with the shape of times: the "year",
+        "month" [1, 12], "day" of the month [1, 31], day of year "doy"
+        [1, 366], day of water year "dowy" [1, 366] and CDC "epiweek" [1, 53]
+        of each time.
+    """
+    days = np.asarray(times).astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    years = days.astype("datetime64[Y]")
+    year = years.astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months.astype("datetime64[D]")).astype(np.int64) + 1
+    doy = (days - years.astype("datetime64[D]")).astype(np.int64) + 1
+
+    # the water year starts on October 1 of the previous calendar year
+    # if the month is before October
+    wy_start = ((year - 1970 - (month < 10)) * 12 + 9).astype("datetime64[M]")
+    dowy = (days - wy_start.astype("datetime64[D]")).astype(np.int64) + 1
+
+    # CDC (MMWR) weeks run Sunday to Saturday and belong to the year of
+    # their Wednesday. 1970-01-01 was a Thursday.
+    days_int = days.astype(np.int64)
+    wednesday = days_int - (days_int + 4) % 7 + 3
+    wednesday_year = wednesday.astype("datetime64[D]").astype("datetime64[Y]")
+    epiweek = (
+        wednesday - wednesday_year.astype("datetime64[D]").astype(np.int64)
+    ) // 7 + 1
+
+    return {
+        "year": year,
+        "month": month,
+        "day": day,
+        "doy": doy,
+        "dowy": dowy,
+        "epiweek": epiweek,
+    }
+
+
 def _offset(zero_based: bool):
     if zero_based:
         return 0
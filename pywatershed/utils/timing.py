@@ -0,0 +1,114 @@
+import contextlib
+import json
+from time import perf_counter
+
+import pandas as pd
+
+from ..constants import fileish
+
+
+class PhaseTimer:
+    """Accumulate wall times and call counts of the phases of components.
+
+    Records are keyed by a component (e.g. a Process name, an input adapter
+    or an input file) and a phase (e.g. "advance", "calculate",
+    "budget_calculate", "output", "budget_output", "adapter", "read"). Timing
+    a phase is a pair of calls to time.perf_counter, so a PhaseTimer can be
+    left on for full runs.
+
+    Phases are inclusive: the time of a phase includes the time of any
+    phases timed within it. For a Model, a process's "advance" includes the
+    "adapter" time of its inputs (which includes the "read" time of their
+    files), "calculate" includes "budget_calculate" and "output" includes
+    "budget_output". Do not sum phases of a Model as if they were disjoint.
+
+    Examples:
+    ---------
+
+    >>> from pywatershed.utils.timing import PhaseTimer
+    >>> timer = PhaseTimer()
+    >>> with timer.time("PRMSCanopy", "calculate"):
+    ...     pass
+    >>> timer.to_dict()["PRMSCanopy"]["calculate"]["count"]
+    1
+    """
+
+    def __init__(self):
+        self._records = {}
+        return
+
+    def add(
+        self, component: str, phase: str, seconds: float, count: int = 1
+    ) -> None:
+        """Add time and calls to the record of a phase of a component.
+
+        Args:
+            component: the name of the component
+            phase: the name of the phase
+            seconds: the elapsed wall time
+            count: the number of calls
+        """
+        key = (component, phase)
+        if key not in self._records.keys():
+            self._records[key] = [0.0, 0]
+        record = self._records[key]
+        record[0] += seconds
+        record[1] += count
+        return
+
+    @contextlib.contextmanager
+    def time(self, component: str, phase: str):
+        """A context manager timing one call of a phase of a component."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(component, phase, perf_counter() - start)
+
+    def reset(self) -> None:
+        """Clear all records."""
+        self._records = {}
+        return
+
+    def to_dict(self) -> dict:
+        """The records as a dictionary.
+
+        Returns:
+            A dictionary of the form
+            {component: {phase: {"seconds": float, "count": int}}}.
+        """
+        result = {}
+        for (component, phase), (seconds, count) in self._records.items():
+            result.setdefault(component, {})[phase] = {
+                "seconds": seconds,
+                "count": count,
+            }
+        return result
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """The records as a pandas DataFrame.
+
+        Returns:
+            A DataFrame indexed by (component, phase) with columns seconds,
+            count, and seconds_per_call sorted by descending seconds.
+        """
+        index = pd.MultiIndex.from_tuples(
+            list(self._records.keys()), names=["component", "phase"]
+        )
+        df = pd.DataFrame(
+            list(self._records.values()),
+            index=index,
+            columns=["seconds", "count"],
+        )
+        df["seconds_per_call"] = df["seconds"] / df["count"]
+        return df.sort_values("seconds", ascending=False)
+
+    def to_json(self, json_file: fileish) -> None:
+        """Write the records from to_dict() to a JSON file.
+
+        Args:
+            json_file: the file to write
+        """
+        with open(json_file, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+        return